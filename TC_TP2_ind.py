@@ -103,7 +103,6 @@ den = np.array([1/w0, 1])
 FS.add_curve(1, [num, den, [1, 2E6, 1E5]], "Caso 3")
 '''
 
-# Si tarda es porque el Montecarlo tiene muchos puntos
 
 if param == "G":
     FS.change_title("Ganancia del Circuito " + circuit + " - Caso " + str(int(round((-1*(R2/1E3)**2 + 67 * R2/1E3 - 360)/210))))
@@ -0,0 +1,896 @@
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+########################################################################################################################
+# benchmarks: Mediciones de tiempo de las partes lentas de la graficadora
+# Uso: python benchmarks.py [nombre] [puntos]
+# Si no se especifica el nombre corre todos. Los archivos de prueba se generan en un directorio temporal.
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+########################################################################################################################
+# timeit: Corre fun repeat veces y devuelve el mejor tiempo en segundos
+# ----------------------------------------------------------------------------------------------------------------------
+def timeit(fun, repeat=3):
+    best = None
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fun()
+        dt = time.perf_counter() - t0
+        if best is None or dt < best:
+            best = dt
+    return best
+########################################################################################################################
+
+########################################################################################################################
+# report: Imprime la comparación entre la implementación anterior y la nueva
+# ----------------------------------------------------------------------------------------------------------------------
+def report(name, points, t_old, t_new):
+    print(f"{name:<24} {points:>10d} puntos   anterior: {t_old * 1E3:10.2f} ms   nuevo: {t_new * 1E3:10.2f} ms"
+          f"   speedup: {t_old / t_new:6.1f}x")
+########################################################################################################################
+
+########################################################################################################################
+# ac_lines: Devuelve las líneas de datos de una simulación AC de LTSpice (freq\t(xxxdB,yyy°)) con n puntos
+# ----------------------------------------------------------------------------------------------------------------------
+def ac_lines(n, fc=1E3):
+    f = np.logspace(1, 6, n)
+    mod = -20 * np.log10(np.sqrt(1 + (f / fc) ** 2))
+    ph = -np.degrees(np.arctan(f / fc))
+    return [f"{f[i]:.15e}\t({mod[i]:.15e}dB,{ph[i]:.15e}\xb0)\n".encode("latin-1") for i in range(n)]
+########################################################################################################################
+
+########################################################################################################################
+# write_ac: Genera un txt con el formato de una simulación AC de LTSpice con n puntos
+# ----------------------------------------------------------------------------------------------------------------------
+def write_ac(path, n):
+    with open(path, "wb") as file:
+        file.write(b"Freq.\tV(vo)\n")
+        file.writelines(ac_lines(n))
+    return path
+########################################################################################################################
+
+########################################################################################################################
+# write_ac_mc: Genera un txt con el formato de una simulación AC de Monte Carlo de LTSpice con runs corridas de n puntos
+# ----------------------------------------------------------------------------------------------------------------------
+def write_ac_mc(path, runs, n):
+    rng = np.random.default_rng(0)
+    with open(path, "wb") as file:
+        file.write(b"Freq.\tV(vo)\n")
+        for k in range(runs):
+            file.write(f"Step Information: Run={k + 1}  (Run: {k + 1}/{runs})\n".encode("latin-1"))
+            file.writelines(ac_lines(n, 1E3 * (1 + 0.05 * rng.standard_normal())))
+    return path
+########################################################################################################################
+
+########################################################################################################################
+# write_tran_mc: Genera un txt con el formato de una simulación transitoria de Monte Carlo de LTSpice
+# Cada corrida tiene entre n/2 y n puntos (LTSpice elige el paso de cada corrida)
+# ----------------------------------------------------------------------------------------------------------------------
+def write_tran_mc(path, runs, n):
+    rng = np.random.default_rng(0)
+    with open(path, "wb") as file:
+        file.write(b"time\tV(out)\n")
+        for k in range(runs):
+            file.write(f"Step Information: Run={k + 1}  (Run: {k + 1}/{runs})\n".encode("latin-1"))
+            t = np.sort(rng.uniform(0, 1E-2, rng.integers(n // 2, n + 1)))
+            y = 1 - np.exp(-t / (1E-3 * (1 + 0.05 * rng.standard_normal())))
+            file.writelines(f"{t[i]:.15e}\t{y[i]:.15e}\n".encode("latin-1") for i in range(len(t)))
+    return path
+########################################################################################################################
+
+########################################################################################################################
+# write_raw: Genera un .raw binario de LTSpice (encabezado UTF-16) con las variables dadas
+# Recibe un diccionario nombre -> arreglo (la primera es la variable independiente) y los flags del archivo
+# ----------------------------------------------------------------------------------------------------------------------
+def write_raw(path, variables, flags="real forward", plotname="Transient Analysis"):
+    names = list(variables.keys())
+    n = len(variables[names[0]])
+    header = "Title: * benchmarks.py\nDate: -\nPlotname: " + plotname + "\nFlags: " + flags + "\n"
+    header += "No. Variables: " + str(len(names)) + "\nNo. Points: " + str(n) + "\nOffset: 0\n"
+    header += "Command: Linear Technology Corporation LTspice XVII\nVariables:\n"
+    for i in range(len(names)):
+        header += "\t" + str(i) + "\t" + names[i] + "\tvoltage\n"
+    header += "Binary:\n"
+    if "complex" in flags:
+        types = ["<c16"] * len(names)
+    else:
+        types = ["<f8"] + ["<f4"] * (len(names) - 1)
+    points = np.empty(n, dtype=np.dtype({"names": names, "formats": types}))
+    for name in names:
+        points[name] = variables[name]
+    with open(path, "wb") as file:
+        file.write(header.encode("utf-16-le"))
+        file.write(points.tobytes())
+    return path
+########################################################################################################################
+
+########################################################################################################################
+# legacy_read_ac: Lector de Sim.check_data anterior (dos pasadas, línea por línea), se mantiene para comparar
+# ----------------------------------------------------------------------------------------------------------------------
+def legacy_read_ac(path):
+    from frecspace import get_unit
+    file = open(path, "r", encoding="latin-1")
+    file.readline()
+    aux = file.readline().split("\t")
+    aux_mod, aux_ph = aux[1][1:-2].split(",")
+    count = 2
+
+    mod_unit = get_unit(aux_mod)
+    ph_unit = get_unit(aux_ph)
+    for line in file:
+        if line != "\n":
+            count += 1
+    file.close()
+
+    w = np.zeros(count - 1)
+    mod = np.zeros(count - 1)
+    ph = np.zeros(count - 1)
+
+    l = open(path, "r", encoding="latin-1")
+
+    l.readline()
+    for i in range(count - 1):
+        aux = l.readline().split("\t")
+        w[i] = aux[0]
+        aux_mod, aux_ph = aux[1][1:-2].split(",")
+        mod[i] = aux_mod.replace(mod_unit, "")
+        ph[i] = aux_ph.replace(ph_unit, "")
+    l.close()
+    return w, mod, ph
+########################################################################################################################
+
+########################################################################################################################
+# legacy_read_ac_mc: Lector de MC.check_data anterior (busca la corrida 2 y después relee línea por línea)
+# ----------------------------------------------------------------------------------------------------------------------
+def legacy_read_ac_mc(path):
+    from frecspace import get_unit
+    file = open(path, "r", encoding="latin-1")
+    file.readline()
+    aux = file.readline()
+    j1 = aux.find("/")
+    j2 = aux.find(")")
+    runs = int(aux[j1 + 1: j2])
+    aux = file.readline().split("\t")
+    aux_mod, aux_ph = aux[1][1:-2].split(",")
+
+    count = 2
+    mod_unit = get_unit(aux_mod)
+    ph_unit = get_unit(aux_ph)
+    for line in file:
+        if line != 'Step Information: Run=2  (Run: 2/' + str(runs) + ')\n':
+            count += 1
+        else:
+            break
+    file.close()
+
+    w = np.zeros((runs, count - 1))
+    mod = np.zeros((runs, count - 1))
+    ph = np.zeros((runs, count - 1))
+
+    l = open(path, "r", encoding="latin-1")
+
+    l.readline()
+    for k in range(runs):
+        l.readline()
+        for i in range(count - 1):
+            aux = l.readline().split("\t")
+            w[k][i] = aux[0]
+            aux_mod, aux_ph = aux[1][1:-2].split(",")
+            mod[k][i] = aux_mod.replace(mod_unit, "")
+            ph[k][i] = aux_ph.replace(ph_unit, "")
+    l.close()
+    return w, mod, ph
+########################################################################################################################
+
+########################################################################################################################
+# legacy_read_tran_mc: Lector de tMC.check_data anterior (listas de listas, no lee la última corrida)
+# ----------------------------------------------------------------------------------------------------------------------
+def legacy_read_tran_mc(path):
+    file = open(path, "r")
+    file.readline()
+    aux = file.readline()
+    j1 = aux.find("/")
+    j2 = aux.find(")")
+    runs = int(aux[j1 + 1: j2])
+
+    aux = file.readline().split("\t")
+    n = len(aux)
+    file.close()
+
+    t = []
+    y = []
+    x = []
+
+    l = open(path, "r")
+
+    l.readline()
+    aux = l.readline()
+    for k in range(runs - 1):
+        t.append([])
+        y.append([])
+        x.append([])
+        aux = l.readline().split("\t")
+        while aux[0].find('Run') == -1:
+            t[k].append(float(aux[0]))
+            y[k].append(float(aux[1]))
+            if n == 3: x[k].append(float(aux[2]))
+            aux = l.readline().split("\t")
+    l.close()
+    return t, y, x
+########################################################################################################################
+
+########################################################################################################################
+# bench_sim: Compara el lector de simulaciones AC anterior con ltspice.read_ac
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_sim(tmp, points):
+    from ltspice import read_ac
+    path = write_ac(os.path.join(tmp, "sim.txt"), points)
+    w0, mod0, ph0 = legacy_read_ac(path)
+    w1, mod1, ph1, mod_unit, ph_unit = read_ac(path)
+    assert np.array_equal(w0, w1) and np.array_equal(mod0, mod1) and np.array_equal(ph0, ph1)
+    report("Sim.check_data", points, timeit(lambda: legacy_read_ac(path)), timeit(lambda: read_ac(path)))
+########################################################################################################################
+
+########################################################################################################################
+# bench_mc: Compara el lector de Monte Carlo AC anterior con ltspice.read_ac_mc (100 corridas)
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_mc(tmp, points):
+    from ltspice import read_ac_mc
+    runs = 100
+    path = write_ac_mc(os.path.join(tmp, "mc.txt"), runs, points // runs)
+    w0, mod0, ph0 = legacy_read_ac_mc(path)
+    w1, mod1, ph1, mod_unit, ph_unit = read_ac_mc(path)
+    assert np.array_equal(w0, w1) and np.array_equal(mod0, mod1) and np.array_equal(ph0, ph1)
+    report("MC.check_data", points, timeit(lambda: legacy_read_ac_mc(path)), timeit(lambda: read_ac_mc(path)))
+########################################################################################################################
+
+########################################################################################################################
+# bench_tmc: Compara el lector de Monte Carlo transitorio anterior con ltspice.read_tran_mc (100 corridas)
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_tmc(tmp, points):
+    from ltspice import read_tran_mc
+    runs = 100
+    path = write_tran_mc(os.path.join(tmp, "tmc.txt"), runs, 2 * points // (3 * runs))
+    t0, y0, x0 = legacy_read_tran_mc(path)
+    t1, y1, x1, offsets = read_tran_mc(path)
+    assert all(np.array_equal(t0[k], t1[offsets[k]:offsets[k + 1]]) and np.array_equal(y0[k], y1[offsets[k]:offsets[k + 1]])
+               for k in range(len(t0)))
+    report("tMC.check_data", points, timeit(lambda: legacy_read_tran_mc(path)), timeit(lambda: read_tran_mc(path)))
+########################################################################################################################
+
+########################################################################################################################
+# bench_raw: Compara leer un Monte Carlo AC exportado a txt (ltspice.read_ac_mc) con abrir el .raw equivalente
+# (curva Raw, incluye el cálculo de módulo y fase)
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_raw(tmp, points):
+    from ltspice import read_ac_mc
+    from frecspace import Raw
+    runs = 100
+    txt = write_ac_mc(os.path.join(tmp, "mc.txt"), runs, points // runs)
+    w, mod, ph, mod_unit, ph_unit = read_ac_mc(txt)
+    h = np.power(10, mod / 20) * np.exp(1j * np.radians(ph))
+    raw = write_raw(os.path.join(tmp, "mc.raw"), {"frequency": w.ravel(), "V(vo)": h.ravel()},
+                    "complex forward log stepped", "AC Analysis")
+    report("Raw (vs MC txt)", points, timeit(lambda: read_ac_mc(txt)), timeit(lambda: Raw(5, raw, "", "")))
+########################################################################################################################
+
+########################################################################################################################
+# bench_cache: Compara parsear un Monte Carlo AC con recargarlo del cache en disco (cache.cached)
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_cache(tmp, points):
+    import cache
+    from ltspice import read_ac_mc
+    runs = 100
+    path = write_ac_mc(os.path.join(tmp, "mc.txt"), runs, points // runs)
+    cache.set_cache(os.path.join(tmp, "cache"))
+    w0, mod0, ph0, mod_unit, ph_unit = cache.cached("ac_mc", path, read_ac_mc)
+    w1, mod1, ph1, mod_unit, ph_unit = cache.cached("ac_mc", path, read_ac_mc)
+    assert np.array_equal(w0, w1) and np.array_equal(mod0, mod1) and np.array_equal(ph0, ph1)
+    report("cache (vs MC txt)", points, timeit(lambda: read_ac_mc(path)),
+           timeit(lambda: cache.cached("ac_mc", path, read_ac_mc)))
+########################################################################################################################
+
+########################################################################################################################
+# render: Grafica con plot(ax) y guarda la figura en memoria, devuelve el tiempo total
+# ----------------------------------------------------------------------------------------------------------------------
+def render(plot, dpi=100):
+    import io
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(1)
+    plot(ax)
+    fig.savefig(io.BytesIO(), dpi=dpi)
+    plt.close(fig)
+########################################################################################################################
+
+########################################################################################################################
+# bench_render: Compara graficar un Monte Carlo AC de 1000 corridas con un semilogx por corrida (como antes) y con una
+# única LineCollection (curvespace.plot_runs), incluyendo el savefig
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_render(tmp, points):
+    from curvespace import plot_runs
+    runs = 1000
+    n = points // runs
+    w = np.tile(np.logspace(1, 6, n), (runs, 1))
+    mod = -20 * np.log10(np.abs(1 + 1j * w / (1E3 * (1 + 0.05 * np.random.default_rng(0).standard_normal((runs, 1))))))
+
+    def legacy(ax):
+        for i in range(len(w)):
+            ax.semilogx(w[i], mod[i], "silver", marker=",")
+
+    report("render MC", points, timeit(lambda: render(legacy), 1),
+           timeit(lambda: render(lambda ax: plot_runs(ax, w, mod, "silver", logx=True)), 1))
+########################################################################################################################
+
+########################################################################################################################
+# bench_envelope: Compara cargar un Monte Carlo AC entero y calcular percentiles con np.percentile contra calcular la
+# envolvente leyendo de a una corrida (ltspice.read_ac_mc_envelope). Imprime también el pico de memoria de cada uno.
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_envelope(tmp, points):
+    import tracemalloc
+    from ltspice import read_ac_mc, read_ac_mc_envelope
+    runs = 1000
+    path = write_ac_mc(os.path.join(tmp, "mc.txt"), runs, points // runs)
+
+    def full():
+        w, mod, ph, mod_unit, ph_unit = read_ac_mc(path)
+        return np.percentile(mod, [5, 95], axis=0), np.percentile(ph, [5, 95], axis=0)
+
+    peaks = []
+    for fun in (full, lambda: read_ac_mc_envelope(path, [5, 95])):
+        tracemalloc.start()
+        fun()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    report("envolvente MC", points, timeit(full, 1), timeit(lambda: read_ac_mc_envelope(path, [5, 95]), 1))
+    print(f"{'':<24} pico de memoria   anterior: {peaks[0] / 2 ** 20:8.1f} MB   nuevo: {peaks[1] / 2 ** 20:8.1f} MB")
+########################################################################################################################
+
+########################################################################################################################
+# bench_batch: Compara cargar cuatro curvas de archivo con add_curve de a una y con add_curves en procesos
+# (sin cache, para medir el parseo). Con varios núcleos el tiempo tiende al del archivo más lento.
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_batch(tmp, points):
+    import cache
+    from frecspace import Frecspace
+    cache.set_cache(enabled=False)
+    curves = [(4, write_ac_mc(os.path.join(tmp, "mc.txt"), 100, points // 100), "mc"),
+              (2, write_ac(os.path.join(tmp, "sim1.txt"), points), "sim1"),
+              (2, write_ac(os.path.join(tmp, "sim2.txt"), points), "sim2"),
+              (4, write_ac_mc(os.path.join(tmp, "mc2.txt"), 100, points // 100), "mc2")]
+
+    def sequential():
+        FS = Frecspace()
+        for c_type, path, name in curves:
+            FS.add_curve(c_type, path, name, "blue", "Hz")
+
+    import contextlib
+    with contextlib.redirect_stdout(None):
+        t_old = timeit(sequential, 1)
+    t_new = timeit(lambda: Frecspace().add_curves([c + ("blue", "Hz") for c in curves], processes=True), 1)
+    report("add_curves (4 curvas)", points, t_old, t_new)
+    cache.set_cache()
+########################################################################################################################
+
+########################################################################################################################
+# bench_workers: Compara parsear un Monte Carlo AC de 1000 corridas en el proceso actual y repartido por corridas en
+# todos los núcleos (ltspice.read_ac_mc con workers). El speedup tiende a la cantidad de núcleos.
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_workers(tmp, points):
+    from ltspice import read_ac_mc
+    runs = 1000
+    workers = os.cpu_count() or 1
+    path = write_ac_mc(os.path.join(tmp, "mc.txt"), runs, points // runs)
+    w0, mod0, ph0, mod_unit, ph_unit = read_ac_mc(path, 1)
+    w1, mod1, ph1, mod_unit, ph_unit = read_ac_mc(path, max(2, workers))
+    assert np.array_equal(w0, w1) and np.array_equal(mod0, mod1) and np.array_equal(ph0, ph1)
+    report(f"MC en {workers} procesos", points, timeit(lambda: read_ac_mc(path, 1)),
+           timeit(lambda: read_ac_mc(path, max(2, workers))))
+########################################################################################################################
+
+########################################################################################################################
+# bench_phase: Compara el while por muestra que acomodaba la fase en plot_curve_ph con frecspace.wrap_phase
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_phase(tmp, points):
+    from frecspace import wrap_phase
+    ph = np.linspace(0, -1000, points)
+
+    def legacy():
+        aux = ph.copy()
+        for i in range(len(aux)):
+            while aux[i] < -180.0:
+                aux[i] = aux[i] + 360.0
+        return aux
+
+    assert np.allclose(legacy(), wrap_phase(ph, "°", "wrap"))
+    report("fase (wrap)", points, timeit(legacy, 1), timeit(lambda: wrap_phase(ph, "°", "wrap")))
+########################################################################################################################
+
+########################################################################################################################
+# bench_units: Compara cambiar 10 veces de dB a veces y de Hz a rad/s un Monte Carlo AC (100 corridas) convirtiendo los
+# arreglos cada vez, como antes, con las vistas por unidad de FrecCurve
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_units(tmp, points):
+    from frecspace import MC
+    path = write_ac_mc(os.path.join(tmp, "mc.txt"), 100, points // 100)
+    mc = MC(4, path, "mc", "blue", "Hz")
+    w, mod = mc.w.copy(), mc.mod.copy()
+
+    def legacy():
+        aux_w, aux_mod = w, mod
+        for i in range(10):
+            aux_w, aux_mod = 2 * np.pi * aux_w, np.power(10, aux_mod / 20)
+            aux_w, aux_mod = aux_w / (2 * np.pi), 20 * np.log10(aux_mod)
+
+    def toggle():
+        for i in range(20):
+            mc.change_w_unit()
+            mc.change_mod_unit()
+            mc.w, mc.mod
+
+    report("cambio de unidades", points, timeit(legacy), timeit(toggle))
+########################################################################################################################
+
+########################################################################################################################
+# bench_teo: Compara ss.bode con transfer.freq_response para una transferencia de orden 4
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_teo(tmp, points):
+    import scipy.signal as ss
+    from transfer import freq_response
+    num, den = [1, 0, 1E6], [1, 300, 2E6, 1E8, 1E12]
+    w = np.logspace(0, 8, points)
+    w0, mod0, ph0 = ss.bode(ss.TransferFunction(num, den), w)
+    mod1, ph1 = freq_response(num, den, w)
+    assert np.allclose(mod0, mod1) and np.allclose(ph0, ph1)
+    report("Teo (vs ss.bode)", points, timeit(lambda: ss.bode(ss.TransferFunction(num, den), w)),
+           timeit(lambda: freq_response(num, den, w)))
+########################################################################################################################
+
+########################################################################################################################
+# bench_grid: Compara una curva teórica con una muesca angosta (Q = 1000) con grilla lineal de "puntos" puntos, como se
+# hacía en TC_TP2_ind.py, y con la grilla adaptiva (tol = 0.1 dB)
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_grid(tmp, points):
+    from frecspace import Teo
+    w0 = 2 * np.pi * 1E3
+    num, den = [1, w0 / 1000, w0 ** 2], [1, w0 / 10, w0 ** 2]
+    interval = [2 * np.pi, 2 * np.pi * 2E6]
+    lin = Teo(1, [num, den, interval + [points]], "", "", "rad/s")
+    ada = Teo(1, [num, den, interval], "", "", "rad/s")
+    report("grilla adaptiva", points, timeit(lambda: Teo(1, [num, den, interval + [points]], "", "", "rad/s")),
+           timeit(lambda: Teo(1, [num, den, interval], "", "", "rad/s")))
+    print(f"{'':<24} puntos   anterior: {len(lin.w):10d}      nuevo: {len(ada.w):10d}")
+    print(f"{'':<24} muesca   anterior: {lin.mod.min():10.2f} dB   nuevo: {ada.mod.min():10.2f} dB   "
+          f"(exacta: {20 * np.log10(10 / 1000):.2f} dB)")
+########################################################################################################################
+
+########################################################################################################################
+# bench_zoom: Compara hacer zoom 20 veces (Frecspace.set_interval) sobre 4 curvas teóricas sin y con el cache de
+# respuestas de transfer ("puntos" es la cantidad de puntos de la grilla lineal con la que se crean las curvas)
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_zoom(tmp, points):
+    import transfer
+    from frecspace import Frecspace
+    FS = Frecspace()
+    for k in range(4):
+        w0 = 2 * np.pi * 10 ** (k + 2)
+        FS.add_curve(1, [[1, w0 / 1000, w0 ** 2], [1, w0 / 10, w0 ** 2], [1, 1E7, points]], "H" + str(k), "blue", "Hz")
+    intervals = [[10 ** (1 + (i % 5) / 2), 10 ** (6 - (i % 3) / 2)] for i in range(20)]
+
+    def zoom():
+        for interval in intervals:
+            FS.set_interval(interval)
+
+    transfer.set_response_cache(0)
+    t_old = timeit(zoom, 1)
+    transfer.set_response_cache()
+    transfer.clear_response_cache()
+    zoom()
+    t_new = timeit(zoom, 1)
+    report("zoom (cache)", points, t_old, t_new)
+    print(f"{'':<24} {transfer.get_response_stats()}")
+########################################################################################################################
+
+########################################################################################################################
+# bench_sweep: Compara calcular la ganancia del no inversor de TC_TP2_ind.py para "puntos" valores de R2 con un
+# ss.bode por valor y con un barrido (transfer.sweep_coefs + freq_response), 1000 frecuencias
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_sweep(tmp, points):
+    import scipy.signal as ss
+    from transfer import sweep_coefs, freq_response
+    R1, Ao, fb = 1E3, 200E3, 15
+
+    def H(R2):
+        wo = 2 * np.pi * (Ao * fb) * R1 / (R1 + R2)
+        return [(R1 + R2) / R1], [1 / wo, 1]
+
+    R2 = np.linspace(1E3, 30E3, points)
+    w = np.logspace(0, 7, 1000)
+
+    def legacy():
+        return [ss.bode(ss.TransferFunction(*H(r)), w) for r in R2]
+
+    def sweep():
+        return freq_response(*sweep_coefs(H, {"R2": R2}), w)
+
+    old = legacy()
+    mod, ph = sweep()
+    assert all(np.allclose(old[i][1], mod[i]) and np.allclose(old[i][2], ph[i]) for i in range(points))
+    report("barrido (R2)", points, timeit(legacy, 1), timeit(sweep))
+########################################################################################################################
+
+########################################################################################################################
+# bench_tol: Compara un Monte Carlo de tolerancias del notch de graph.py con "puntos" corridas, haciendo un ss.bode por
+# corrida y evaluando todas juntas (transfer.sample_components + sweep_coefs + batch_response), 1000 frecuencias
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_tol(tmp, points):
+    import scipy.signal as ss
+    from transfer import sample_components, sweep_coefs, batch_response
+
+    def H(R1, R3, C1, C3):
+        num = [C1 ** 2 * R1 ** 2 * C3 * R3, 2 * C1 ** 2 * R3 * R1, 2 * C1 * R3, 1]
+        den = [C1 ** 2 * R1 ** 2 * C3 * R3, 2 * C1 ** 2 * R1 * R3 + R1 ** 2 * C1 * C3 + 2 * R1 * C1 * R3 * C3,
+               R1 * C3 + 2 * C1 * R3 + 2 * R1 * C1, 1]
+        return num, den
+
+    components = {"R1": (3.3E3, 0.05), "R3": (1.5E3, 0.05), "C1": (18E-9, 0.1, "gauss"), "C3": (39E-9, 0.1, "gauss")}
+    w = np.logspace(2, 6, 1000)
+
+    def legacy():
+        samples = sample_components(components, points)
+        return [ss.bode(ss.TransferFunction(*H(*(samples[k][i] for k in components))), w) for i in range(points)]
+
+    def tol():
+        return batch_response(*sweep_coefs(H, sample_components(components, points)), w)
+
+    old = legacy()
+    mod, ph = tol()
+    assert all(np.allclose(old[i][1], mod[i]) for i in range(points))
+    report("tolerancias (notch)", points, timeit(legacy, 1), timeit(tol))
+########################################################################################################################
+
+########################################################################################################################
+# bench_kernel: Compara calcular los coeficientes del notch de graph.py escrito como expresión de H(s) para "puntos"
+# valores de los componentes sacando los polinomios con sympy cada vez (make_kernel) y con el kernel compilado
+# guardado en memoria (transfer.compile_kernel)
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_kernel(tmp, points):
+    import transfer
+    expr = ("(C1**2*R1**2*C3*R3*s**3 + 2*C1**2*R3*R1*s**2 + 2*C1*R3*s + 1) / (C1**2*R1**2*C3*R3*s**3 + "
+            "(2*C1**2*R1*R3 + R1**2*C1*C3 + 2*R1*C1*R3*C3)*s**2 + (R1*C3 + 2*C1*R3 + 2*R1*C1)*s + 1)")
+    values = {"R1": np.linspace(1E3, 1E4, points), "R3": 1.5E3, "C1": 18E-9, "C3": 39E-9}
+
+    def legacy():
+        params, kernel = transfer.make_kernel(expr)
+        return kernel(*[values[p] for p in params])
+
+    transfer.clear_kernels()
+    old = legacy()
+    num, den = transfer.sweep_coefs(expr, values)
+    assert all(np.allclose(np.broadcast_to(old[0][i], (points,)), num[i]) for i in range(len(num)))
+    report("kernel (memoria)", points, timeit(legacy), timeit(lambda: transfer.sweep_coefs(expr, values)))
+########################################################################################################################
+
+########################################################################################################################
+# import_time: Corre "import modules" en un intérprete nuevo con -X importtime
+# Devuelve el tiempo acumulado de cada módulo de nivel superior en segundos ({módulo: tiempo}) y los módulos pesados
+# (scipy, sympy, matplotlib) que quedaron importados
+# ----------------------------------------------------------------------------------------------------------------------
+def import_time(modules):
+    import subprocess
+    code = "import sys, " + modules + "; print(*[m for m in ('scipy', 'sympy', 'matplotlib') if m in sys.modules])"
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+    times = {}
+    for line in p.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            self_us, cumulative, name = line[len("import time:"):].split("|")
+            if not name.startswith("  ") and cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) * 1E-6
+    return times, p.stdout.split()
+########################################################################################################################
+
+########################################################################################################################
+# bench_import: Tiempo de arranque de frecspace y timespace (lo que tarda un script antes de hacer nada) en un
+# intérprete nuevo, el mejor de "puntos" intentos. Se compara con importar además scipy.signal, sympy y matplotlib
+# como se hacía antes. Falla si alguno de esos se vuelve a importar al cargar los módulos
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_import(tmp, points):
+    for module in ["frecspace", "timespace"]:
+        t_old = min(sum(import_time("scipy.signal, sympy, matplotlib.lines, " + module)[0].values()) for i in range(points))
+        t_new = None
+        for i in range(points):
+            times, heavy = import_time(module)
+            assert heavy == [], module + " importa " + ", ".join(heavy)
+            if t_new is None or times[module] < t_new:
+                t_new = times[module]
+        report("import " + module, points, t_old, t_new)
+########################################################################################################################
+
+########################################################################################################################
+# bench_lsim: Compara la respuesta del notch de graph.py a un tren de pulsos de "puntos" muestras con ss.lsim y con
+# timeresp.time_response (filtro IIR con la discretización FOH exacta)
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_lsim(tmp, points):
+    import scipy.signal as ss
+    import transfer
+    from timeresp import time_response
+    R1, R3, C1, C3 = 3.3E3, 1.5E3, 18E-9, 39E-9
+    num = np.array([C1 ** 2 * R1 ** 2 * C3 * R3, 2 * C1 ** 2 * R3 * R1, 2 * C1 * R3, 1])
+    den = np.array([C1 ** 2 * R1 ** 2 * C3 * R3, 2 * C1 ** 2 * R1 * R3 + R1 ** 2 * C1 * C3 + 2 * R1 * C1 * R3 * C3,
+                    R1 * C3 + 2 * C1 * R3 + 2 * R1 * C1, 1])
+    t = np.linspace(0, 0.1, points)
+    x = ss.square(2 * np.pi * 500 * t)
+
+    def legacy():
+        return ss.lsim(ss.TransferFunction(num, den), x, t)[1]
+
+    def iir():
+        transfer.clear_response_cache()
+        return time_response(num, den, x, t)
+
+    y = legacy()
+    assert np.allclose(y, iir(), atol=1E-9)
+    t_old = timeit(legacy, 1)
+    report("tTeo (IIR)", points, t_old, timeit(iir))
+    report("tTeo (IIR, cache)", points, t_old, timeit(lambda: time_response(num, den, x, t)))
+########################################################################################################################
+
+########################################################################################################################
+# bench_step: Compara la respuesta al escalón del notch de graph.py en "puntos" tiempos con ss.lsim y con la respuesta
+# exacta (timeresp.closed_response). También muestra el error de lsim por el paso de tiempo
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_step(tmp, points):
+    import scipy.signal as ss
+    import transfer
+    from timeresp import closed_response
+    R1, R3, C1, C3 = 3.3E3, 1.5E3, 18E-9, 39E-9
+    num = np.array([C1 ** 2 * R1 ** 2 * C3 * R3, 2 * C1 ** 2 * R3 * R1, 2 * C1 * R3, 1])
+    den = np.array([C1 ** 2 * R1 ** 2 * C3 * R3, 2 * C1 ** 2 * R1 * R3 + R1 ** 2 * C1 * C3 + 2 * R1 * C1 * R3 * C3,
+                    R1 * C3 + 2 * C1 * R3 + 2 * R1 * C1, 1])
+    t = np.linspace(0, 0.02, points)
+    x = np.sign(t)
+
+    def legacy():
+        return ss.lsim(ss.TransferFunction(num, den), x, t)[1]
+
+    def closed():
+        transfer.clear_response_cache()
+        return closed_response(num, den, t, 1)
+
+    y = closed()
+    report("escalón (residuos)", points, timeit(legacy, 1), timeit(closed))
+    print(f"{'':<24} error máximo de lsim (sin t = 0): {np.max(np.abs(legacy()[1:] - y[1:])):.2e}")
+########################################################################################################################
+
+########################################################################################################################
+# bench_stimuli: Compara generar la rampa, la exponencial, el impulso y el tren de pulsos de timespace para "puntos"
+# tiempos con las versiones anteriores (un append por muestra, t.index(0) y ss.unit_impulse, ss.square) y con las
+# vectorizadas
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_stimuli(tmp, points):
+    import scipy.signal as ss
+    from timespace import ramp, exp, impulse, pulse_train
+    t = np.linspace(-1.0, 1.0, points - points % 2 + 1)
+
+    def legacy_ramp():
+        x = []
+        for sample in t:
+            if sample < 0.0:
+                x.append(0)
+            else:
+                x.append(1.0 * sample)
+        return np.array(x)
+
+    def legacy_exp():
+        x = []
+        for sample in t:
+            x.append(np.exp(-2.0 * sample))
+        return 3.0 * np.array(x)        # Antes era A * lista (repetía la lista en vez de escalarla)
+
+    def legacy_impulse():
+        return 2.0 * ss.unit_impulse(len(t), t.tolist().index(0))
+
+    cases = [("rampa", legacy_ramp, lambda: ramp(t, [1.0])),
+             ("exponencial", legacy_exp, lambda: exp(t, [3.0, -2.0])),
+             ("impulso", legacy_impulse, lambda: impulse(t, [2.0])),
+             ("tren de pulsos", lambda: 2.0 * ss.square(2 * np.pi * 5 * t, 0.3), lambda: pulse_train(t, [2.0, 5.0, 0.3]))]
+    for name, legacy, new in cases:
+        assert np.mean(np.isclose(legacy(), new())) > 0.9999     # El tren de pulsos puede diferir justo en los flancos
+        report(name, len(t), timeit(legacy, 1), timeit(new))
+########################################################################################################################
+
+########################################################################################################################
+# bench_steady: Compara obtener el régimen permanente del notch de graph.py para un tren de pulsos de 1 kHz en una
+# ventana de "puntos" muestras (1000 por período) simulando todo con ss.lsim y con el período calculado por FFT y
+# repetido (timeresp.steady_response)
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_steady(tmp, points):
+    import scipy.signal as ss
+    import transfer
+    from timeresp import steady_response, time_response
+    R1, R3, C1, C3 = 3.3E3, 1.5E3, 18E-9, 39E-9
+    num = np.array([C1 ** 2 * R1 ** 2 * C3 * R3, 2 * C1 ** 2 * R3 * R1, 2 * C1 * R3, 1])
+    den = np.array([C1 ** 2 * R1 ** 2 * C3 * R3, 2 * C1 ** 2 * R1 * R3 + R1 ** 2 * C1 * C3 + 2 * R1 * C1 * R3 * C3,
+                    R1 * C3 + 2 * C1 * R3 + 2 * R1 * C1, 1])
+    f = 1E3
+    t = np.arange(points) * (1 / f / 1000)
+
+    def fun(t):
+        return np.where(np.mod(np.round(f * t * 1000), 1000) < 300, 1.0, -1.0)       # Flancos justo en muestras
+
+    def legacy():
+        return ss.lsim(ss.TransferFunction(num, den), fun(t), t)[1]
+
+    def steady():
+        transfer.clear_response_cache()
+        return steady_response(num, den, fun, 1 / f, t)
+
+    y = steady()
+    last = t > t[-1] - 2 / f
+    assert np.allclose(time_response(num, den, fun(t), t)[last], y[last], atol=1E-6)
+    report("régimen permanente", points, timeit(legacy, 1), timeit(steady))
+########################################################################################################################
+
+########################################################################################################################
+# bench_stream: Compara simular "puntos" muestras del notch de graph.py con un tren de pulsos todo junto
+# (time_response) y por partes reduciendo la salida a 4000 intervalos (stream_response + stream_decimate). Además
+# del tiempo muestra la memoria máxima de cada uno (tracemalloc)
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_stream(tmp, points):
+    import tracemalloc
+    from timeresp import time_response, stream_response, stream_decimate
+    R1, R3, C1, C3 = 3.3E3, 1.5E3, 18E-9, 39E-9
+    num = np.array([C1 ** 2 * R1 ** 2 * C3 * R3, 2 * C1 ** 2 * R3 * R1, 2 * C1 * R3, 1])
+    den = np.array([C1 ** 2 * R1 ** 2 * C3 * R3, 2 * C1 ** 2 * R1 * R3 + R1 ** 2 * C1 * C3 + 2 * R1 * C1 * R3 * C3,
+                    R1 * C3 + 2 * C1 * R3 + 2 * R1 * C1, 1])
+    h = 1E-6
+
+    def fun(t):
+        return np.where(np.mod(500 * t, 1.0) < 0.3, 1.0, -1.0)
+
+    def full():
+        t = np.arange(points) * h
+        return time_response(num, den, fun(t), t)
+
+    def stream():
+        return stream_decimate(stream_response(num, den, fun, 0.0, (points - 1) * h, h), points, 4000)
+
+    memory = []
+    for f in [full, stream]:
+        tracemalloc.start()
+        f()
+        memory.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    y = full()
+    assert np.isclose(np.min(stream()[2]), np.min(y)) and np.isclose(np.max(stream()[2]), np.max(y))
+    report("por partes", points, timeit(full, 1), timeit(stream, 1))
+    print(f"{'':<24} memoria máxima: {memory[0] / 2 ** 20:.1f} MB todo junto, {memory[1] / 2 ** 20:.1f} MB por partes")
+########################################################################################################################
+
+########################################################################################################################
+# bench_lod: Compara graficar y guardar a 300 dpi un transitorio con ruido de "puntos" muestras y un Bode con marker
+# "," con todos los puntos y reducidos a lo que se ve (curvespace.plot_lod). Falla si la curva reducida pierde el pico o
+# la muesca
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_lod(tmp, points):
+    from curvespace import plot_lod
+    rng = np.random.default_rng(0)
+    t = np.linspace(0, 1, points)
+    y = np.sin(2 * np.pi * 50 * t) + 0.1 * rng.standard_normal(points)
+    y[points // 3], y[2 * points // 3] = 5, -7
+    w = np.logspace(1, 6, points)
+    mod = -20 * np.log10(np.abs(1 - (w / 1E4) ** 2 + 1j * w / 1E6))        # Notch en 10 kHz
+
+    for name, x, v, logx, kwargs in [("lod tiempo", t, y, False, {}), ("lod bode", w, mod, True, {"marker": ","})]:
+        def full(ax):
+            ax.plot(x, v, "blue", **kwargs)
+            if logx:
+                ax.set_xscale("log")
+
+        def lod(ax):
+            line = plot_lod(ax, x, v, "blue", logx=logx, **kwargs)
+            assert np.max(line.get_ydata()) == np.max(v) and np.min(line.get_ydata()) == np.min(v)
+
+        report(name, points, timeit(lambda: render(full, 300), 1), timeit(lambda: render(lod, 300), 1))
+########################################################################################################################
+
+########################################################################################################################
+# bench_replot: Compara el tiempo por cuadro de un ajuste interactivo con "puntos" curvas teóricas cargadas, cambiando
+# una por cuadro: graficar todo de vuelta (figura limpia, plot_mod y draw, como antes) contra volver a llamar a plot_mod
+# sobre el mismo eje (actualiza sólo esa curva con set_data y blitting, ver Curvespace.refresh)
+# ----------------------------------------------------------------------------------------------------------------------
+def bench_replot(tmp, points):
+    import contextlib
+    import io
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from frecspace import Frecspace
+    FS = Frecspace()
+
+    def data(w0):
+        return [[1, w0 / 100, w0 ** 2], [1, w0 / 5, w0 ** 2], [10, 1E6, 2000]]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for k in range(points):
+            FS.add_curve(1, data(2 * np.pi * 10 ** (2 + 3 * k / points)), "H" + str(k), "", "Hz")
+    fig = plt.figure()
+    frames = 10
+
+    def legacy():
+        for i in range(frames):
+            FS.update(0, data(2 * np.pi * (1E3 + 50 * i)))
+            fig.clf()
+            FS.plot_mod(fig.add_subplot())
+            fig.canvas.draw()
+
+    ax = fig.add_subplot()
+    FS.plot_mod(ax)
+    fig.canvas.draw()
+
+    def incremental():
+        for i in range(frames):
+            FS.update(0, data(2 * np.pi * (1E3 + 50 * i)))
+            FS.plot_mod(ax)
+        assert FS.plots[ax]["changed"] == ax.get_lines()[:1] and FS.plots[ax]["background"] is not None
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        t_old = timeit(legacy, 1) / frames
+        fig.clf()
+        ax = fig.add_subplot()
+        FS.plot_mod(ax)
+        fig.canvas.draw()
+        t_new = timeit(incremental, 1) / frames
+    plt.close(fig)
+    report("re-plot (por cuadro)", points, t_old, t_new)
+########################################################################################################################
+
+# SWITCH
+switch_benchmarks = {
+    "sim": (bench_sim, int(1E6)),
+    "mc": (bench_mc, int(1E6)),
+    "tmc": (bench_tmc, int(1E6)),
+    "raw": (bench_raw, int(1E6)),
+    "cache": (bench_cache, int(1E6)),
+    "render": (bench_render, int(2E5)),
+    "envelope": (bench_envelope, int(1E6)),
+    "batch": (bench_batch, int(1E6)),
+    "workers": (bench_workers, int(2E6)),
+    "phase": (bench_phase, int(1E5)),
+    "units": (bench_units, int(1E6)),
+    "teo": (bench_teo, int(1E6)),
+    "grid": (bench_grid, int(1E5)),
+    "zoom": (bench_zoom, int(1E5)),
+    "sweep": (bench_sweep, 1000),
+    "tol": (bench_tol, int(1E4)),
+    "kernel": (bench_kernel, 1000),
+    "import": (bench_import, 5),
+    "lsim": (bench_lsim, int(1E6)),
+    "step": (bench_step, int(1E6)),
+    "stimuli": (bench_stimuli, int(1E6)),
+    "steady": (bench_steady, int(1E6)),
+    "stream": (bench_stream, int(1E7)),
+    "lod": (bench_lod, int(1E6)),
+    "replot": (bench_replot, 30),
+}
+
+if __name__ == "__main__":
+    names = list(switch_benchmarks.keys())
+    if len(sys.argv) > 1:
+        names = [sys.argv[1]]
+    if names[0] not in switch_benchmarks:
+        print("Uso: python benchmarks.py [caso [puntos]]")
+        print("Los casos son: " + ", ".join(switch_benchmarks.keys()))
+        names = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            bench, points = switch_benchmarks.get(name)
+            if len(sys.argv) > 2:
+                points = int(float(sys.argv[2]))
+            bench(tmp, points)
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+########################################################################################################################
+# cache: Cache en disco de los datos ya parseados de las curvas que se leen de archivos
+# Cada entrada se identifica por el tipo de lector, el path, el tamaño y la fecha de modificación del archivo, así que
+# si el archivo cambia se vuelve a parsear. Los arreglos se guardan como .npy y al recargarlos se mapean en memoria
+# (copy-on-write, se pueden modificar sin tocar el cache). Cuando el cache supera cache_max_size se borran las
+# entradas usadas hace más tiempo.
+# ----------------------------------------------------------------------------------------------------------------------
+
+CACHE_VERSION = 2       # Cambiarlo si cambia lo que devuelve algún lector, invalida todas las entradas
+
+cache_dir = os.environ.get("GRAFICADORA_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "graficadora"))
+cache_max_size = 1024 * 1024 * 1024     # Tamaño máximo total del cache en bytes (1 GB)
+cache_enabled = True
+
+
+########################################################################################################################
+# set_cache: Configura el cache. Recibe:
+#   - path: directorio del cache ("" para no cambiarlo)
+#   - max_size: tamaño máximo en bytes (None para no cambiarlo)
+#   - enabled: False para desactivarlo
+# ----------------------------------------------------------------------------------------------------------------------
+def set_cache(path="", max_size=None, enabled=True):
+    global cache_dir, cache_max_size, cache_enabled
+    if path != "":
+        cache_dir = path
+    if max_size is not None:
+        cache_max_size = max_size
+    cache_enabled = enabled
+    return
+########################################################################################################################
+
+########################################################################################################################
+# clear_cache: Borra todas las entradas del cache
+# ----------------------------------------------------------------------------------------------------------------------
+def clear_cache():
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return
+########################################################################################################################
+
+########################################################################################################################
+# cached: Devuelve lo que devuelve parse(path), leyéndolo del cache si el archivo no cambió desde la última vez
+# parse debe devolver una tupla de arreglos o strings. Si el primer elemento está vacío se toma
+# como error y no se guarda.
+# ----------------------------------------------------------------------------------------------------------------------
+def cached(kind, path, parse):
+    if not cache_enabled:
+        return parse(path)
+    try:
+        r = load(get_key(kind, path))
+    except (OSError, ValueError):
+        r = None
+    if r is not None:
+        return r
+
+    r = parse(path)
+    if len(r[0]) != 0:
+        try:
+            store(get_key(kind, path), r)       # La clave se recalcula: el lector puede reescribir el archivo (fix_csv)
+            evict()
+        except OSError:
+            pass
+    return r
+########################################################################################################################
+
+########################################################################################################################
+# get_key: Clave de la entrada del cache para el archivo
+# ----------------------------------------------------------------------------------------------------------------------
+def get_key(kind, path):
+    st = os.stat(path)
+    s = str(CACHE_VERSION) + "|" + kind + "|" + os.path.abspath(path) + "|" + str(st.st_size) + "|" + str(st.st_mtime_ns)
+    return hashlib.sha1(s.encode("utf-8")).hexdigest()
+########################################################################################################################
+
+########################################################################################################################
+# load: Carga una entrada del cache, los arreglos quedan mapeados en memoria
+# Devuelve None si la entrada no existe
+# ----------------------------------------------------------------------------------------------------------------------
+def load(key):
+    entry = os.path.join(cache_dir, key)
+    meta_path = os.path.join(entry, "meta.json")
+    if not os.path.isfile(meta_path):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as file:
+        meta = json.load(file)
+    os.utime(meta_path)         # Marca la entrada como usada recién (para el desalojo)
+
+    r = []
+    for item in meta:
+        if item["type"] == "str":
+            r.append(item["value"])
+        elif item["type"] == "array":
+            r.append(np.load(os.path.join(entry, item["file"]), mmap_mode="c"))
+    return tuple(r)
+########################################################################################################################
+
+########################################################################################################################
+# store: Guarda una entrada en el cache
+# Se escribe en un directorio temporal y después se renombra, así otro proceso nunca ve una entrada a medio escribir
+# ----------------------------------------------------------------------------------------------------------------------
+def store(key, data):
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".tmp-", dir=cache_dir)
+    meta = []
+    for i in range(len(data)):
+        if isinstance(data[i], str):
+            meta.append({"type": "str", "value": data[i]})
+        else:
+            np.save(os.path.join(tmp, str(i) + ".npy"), np.asarray(data[i]))
+            meta.append({"type": "array", "file": str(i) + ".npy"})
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as file:
+        json.dump(meta, file)
+    try:
+        os.rename(tmp, os.path.join(cache_dir, key))
+    except OSError:             # Otro proceso ya la guardó
+        shutil.rmtree(tmp, ignore_errors=True)
+    return
+########################################################################################################################
+
+########################################################################################################################
+# evict: Borra las entradas usadas hace más tiempo hasta que el cache ocupe menos de cache_max_size
+# ----------------------------------------------------------------------------------------------------------------------
+def evict():
+    entries = []
+    total = 0
+    for key in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, key)
+        meta_path = os.path.join(entry, "meta.json")
+        if key.startswith(".") or not os.path.isfile(meta_path):
+            continue
+        size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+        entries.append((os.path.getmtime(meta_path), size, entry))
+        total += size
+    entries.sort()
+    for used, size, entry in entries:
+        if total <= cache_max_size:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+    return
+########################################################################################################################
@@ -1,6 +1,4 @@
 import numpy as np
-import scipy.signal as ss
-import sympy as sp
 
 ########################################################################################################################
 # draw_H: Dibuja la función transferencia provista
@@ -1,4 +1,13 @@
-from matplotlib.colors import is_color_like
+import contextlib
+import io
+import sys
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from decimate import decimate, lod_bins
+
+# SWITCH DE COLORES
+switch_colors = ["blue", "orange", "green", "red", "cyan", "magenta", "gold", "violet"]
 
 ########################################################################################################################
 # Clase Curvespace: Contiene la lista de curvas y métodos para modificarla (Template)
@@ -6,6 +15,8 @@ from matplotlib.colors import is_color_like
 class Curvespace:
     def __init__(self):
         self.curves = []        # Arreglo de curvas
+        self.plots = {}         # Por eje: artistas de cada curva y estado del gráfico (ver draw_curves)
+        self.capturing = False  # True mientras refresh dibuja para guardar el fondo
 
     # update: Método para actualizar los valores de la curva sin tener que borrarla y crearla de vuelta
     # OJO: En vez de recibir el tipo de curva, recibe el índice
@@ -23,20 +34,183 @@ class Curvespace:
                 if self.check_name(name):
                     print("Se tomará como nombre: " + name)
                     break
-        # SWITCH DE COLORES
-        switch_colors = ["blue", "orange", "green", "red", "cyan", "magenta", "gold", "violet"]
         if color == "":# and c_type != 4:
             color = switch_colors[len(self.curves) % 8]
             print("Para la curva", name, "se tomará el color: " + color)
         return
 
+    # add_curves: Carga varias curvas a la vez en paralelo. Recibe:
+    #   - curves: lista de tuplas con los mismos argumentos que add_curve: (c_type, data, name, color, unidades...)
+    #   - workers: cantidad de hilos/procesos (None para que lo elija concurrent.futures)
+    #   - processes: True para usar procesos en vez de hilos (conviene para parsear varios txt grandes, pero en Windows
+    #     el script tiene que estar protegido con if __name__ == "__main__")
+    # Los nombres y colores se asignan en el orden de la lista y las curvas se agregan en ese orden, así el orden en el
+    # gráfico y los colores no dependen de cuál termina primero.
+    # Devuelve una lista con un mensaje de error por curva ("" si se cargó bien), no imprime nada
+    def add_curves(self, curves, workers=None, processes=False):
+        names = self.get_names()
+        jobs = []
+        for i in range(len(curves)):
+            c_type, data, *rest = curves[i]
+            name = rest[0] if len(rest) > 0 else ""
+            color = rest[1] if len(rest) > 1 else ""
+            if name == "" or name in names:
+                k = len(self.curves) + i
+                while "Curve " + str(k) in names:
+                    k -= 1
+                name = "Curve " + str(k)
+            names.append(name)
+            if color == "":
+                color = switch_colors[(len(self.curves) + i) % 8]
+            jobs.append(self.get_curve(c_type, data, name, color, *rest[2:]))
+
+        if processes:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(build_curve, jobs))
+        else:
+            stdout = sys.stdout
+            sys.stdout = ThreadStdout(stdout)       # Cada hilo junta sus mensajes por separado
+            try:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(build_curve, jobs))
+            finally:
+                sys.stdout = stdout
+
+        errors = []
+        for curve, error in results:
+            if curve is not None:
+                self.curves.append(curve)
+            errors.append(error)
+        return errors
+
+    # get_curve: Devuelve la clase y los argumentos para crear una curva del tipo c_type (método virtual)
+    def get_curve(self, c_type, data, name, color, *units):
+        return None, ()
+
     # delCurve: Saca la curva del Curvespace y la destruye
     # Recibe la curva (elemento) (Lo puedo cambiar al índice o nombre, lo que resulte más cómodo)
     def del_curve(self, c):
         self.curves.remove(c)
+        for state in self.plots.values():
+            if c in state["curves"]:
+                remove_artists(state["curves"].pop(c)[2])
+                state["structural"] = True
         del c
         return
 
+    # draw_curves: Grafica las curvas visibles en ax reutilizando los artistas de la vez anterior. Recibe:
+    #   - plot(curve): grafica la curva en ax, devuelve False si hubo error (la curva deja de ser visible)
+    #   - update(curve, artists): pasa los datos actuales a los artistas de la curva (set_data), devuelve False si no
+    #     se puede y hay que graficarla de vuelta
+    #   - data(curve): tupla con los arreglos que se grafican (si son los mismos objetos que la vez anterior no cambió)
+    # La primera vez grafica todo. Después las curvas que no cambiaron sólo se muestran u ocultan (set_visible) y se les
+    # cambia el color, las que cambiaron de datos se actualizan con update y sólo se grafican de vuelta las nuevas y las
+    # que no se pueden actualizar. Los límites de los ejes no se recalculan al actualizar datos.
+    # Devuelve los handles para la leyenda (ver draw_legend), refresh dibuja los cambios
+    def draw_curves(self, ax, plot, update, data):
+        from matplotlib.lines import Line2D
+        state = self.plots.get(ax)
+        if state is None:
+            for old in [a for a in self.plots if a not in a.figure.axes]:     # Ejes que ya no están en su figura
+                del self.plots[old]
+            state = {"curves": {}, "legend": None, "view": None, "background": None, "active": None, "new": True}
+            ax.figure.canvas.mpl_connect("draw_event", lambda event: self.drawn(ax))
+            self.plots[ax] = state
+        state["changed"] = []
+        h = []
+        for curve in self.curves:
+            entry = state["curves"].get(curve)          # (datos, color, artistas)
+            if not curve.visibility:
+                if entry is not None and any(a.get_visible() for a in entry[2]):
+                    for a in entry[2]:
+                        a.set_visible(False)
+                    state["structural"] = True
+                continue
+            d = data(curve)
+            if entry is not None and entry[1] != curve.color and not recolor(entry[2], entry[1], curve.color):
+                entry = None
+            if entry is not None and not all(a.get_visible() for a in entry[2]):
+                for a in entry[2]:
+                    a.set_visible(True)
+                state["structural"] = True
+            if entry is not None and entry[1] != curve.color:
+                state["structural"] = True
+            if entry is not None and (len(d) != len(entry[0]) or any(u is not v for u, v in zip(d, entry[0]))):
+                if update(curve, entry[2]):
+                    state["changed"] += entry[2]
+                else:
+                    entry = None
+            if entry is None:
+                if curve in state["curves"]:
+                    remove_artists(state["curves"].pop(curve)[2])
+                before = set(ax.get_children())
+                state["structural"] = True
+                if not plot(curve):
+                    curve.visibility = False
+                    continue
+                entry = (d, curve.color, [a for a in ax.get_children() if a not in before])
+            state["curves"][curve] = (d, curve.color, entry[2])
+            h.append(Line2D([], [], color=curve.color, label=curve.name))
+        for curve in [c for c in state["curves"] if c not in self.curves]:
+            remove_artists(state["curves"].pop(curve)[2])
+            state["structural"] = True
+        return h
+
+    # draw_legend: Arma la leyenda de ax con los handles de draw_curves, sólo si cambió algún nombre o color
+    def draw_legend(self, ax, h):
+        state = self.plots[ax]
+        key = [(l.get_label(), l.get_color()) for l in h]
+        if key != state["legend"]:
+            ax.legend(handles=h)
+            state["legend"] = key
+            state["structural"] = True
+        return
+
+    # refresh: Dibuja lo que cambió en ax desde la última vez (la primera vez no dibuja nada, eso lo hace show/savefig)
+    # Si sólo cambiaron datos de curvas y el backend permite blitting, se restaura el fondo guardado (el eje sin esas
+    # curvas) y se dibujan sólo sus artistas. El fondo se guarda de nuevo cuando cambian las curvas que se actualizan.
+    # Si cambió algo más (curvas nuevas o borradas, visibilidad, colores, leyenda, límites, textos) se redibuja todo
+    def refresh(self, ax):
+        state = self.plots[ax]
+        view = axes_view(ax)
+        structural = state.pop("structural", False) or view != state["view"]
+        state["view"] = view
+        if state["new"]:
+            state["new"] = False
+            return
+        changed = state["changed"]
+        canvas = ax.figure.canvas
+        if structural or not canvas.supports_blit:
+            canvas.draw_idle()
+            return
+        if len(changed) == 0:
+            return
+        active = [id(a) for a in changed]
+        if state["background"] is None or state["active"] != active:
+            for a in changed:
+                a.set_visible(False)
+            self.capturing = True
+            try:
+                canvas.draw()
+            finally:
+                self.capturing = False
+                for a in changed:
+                    a.set_visible(True)
+            state["background"] = canvas.copy_from_bbox(ax.bbox)
+            state["active"] = active
+        canvas.restore_region(state["background"])
+        for a in changed:
+            ax.draw_artist(a)
+        canvas.blit(ax.bbox)
+        return
+
+    # drawn: Se llama cada vez que se dibuja la figura de ax, el fondo guardado deja de servir (salvo que lo dibuje
+    # refresh para guardarlo)
+    def drawn(self, ax):
+        if not self.capturing and ax in self.plots:
+            self.plots[ax]["background"] = None
+        return
+
     # get_names: Devuelve un arreglo con los nombres de las curvas
     # Si se especifica el parámetro v=True, sólo devolverá los nombres de las curvas visibles
     def get_names(self, v=False):
@@ -72,6 +246,7 @@ class Curvespace:
     #   - color: color nuevo para la curva
     # Devuelve False en caso de error
     def change_curve_color(self, index, color):
+        from matplotlib.colors import is_color_like
         r = True
         if color == "" or not is_color_like(color):
             print("Se mantendrá el color " + self.curves[index].color)
@@ -103,6 +278,10 @@ class Curve:
         self.visibility = not self.visibility
         return
 
+    # is_valid: Devuelve True si la curva se pudo cargar (método virtual)
+    def is_valid(self):
+        return False
+
     # check_data: Método para la verificación de datos (método virtual)
     def check_data(self, data):
         return
@@ -112,4 +291,168 @@ class Curve:
         return
 ########################################################################################################################
 
+########################################################################################################################
+# plot_runs: Grafica todas las corridas de un Monte Carlo como un único artista (LineCollection) en vez de una línea
+# por corrida. Recibe:
+#   - x, y: arreglos de (corridas, puntos), o arreglos con las corridas una atrás de otra si se pasa offsets
+#   - offsets: límites de cada corrida en x, y (None si x, y son de (corridas, puntos))
+#   - logx: True para usar escala logarítmica en x (Bode)
+# Devuelve la LineCollection
+# ----------------------------------------------------------------------------------------------------------------------
+def plot_runs(ax, x, y, color, offsets=None, logx=False, label=""):
+    from matplotlib.collections import LineCollection
+    if offsets is None:
+        segments = np.stack((x, y), axis=-1)
+    else:
+        segments = np.split(np.column_stack((x, y)), offsets[1:-1])
+    lc = LineCollection(segments, colors=color, label=label)
+    if logx:
+        ax.set_xscale("log")
+    ax.add_collection(lc)
+    ax.autoscale_view()
+    return lc
+########################################################################################################################
+
+########################################################################################################################
+# plot_envelope: Grafica la envolvente estadística de un Monte Carlo como bandas sombreadas. Recibe:
+#   - x: frecuencias o tiempos
+#   - env: arreglo de (filas, puntos) con media, mínimo, máximo y percentiles (ver stats.Envelope)
+#   - percentiles: percentiles de las filas de env, se sombrea entre pares simétricos (el primero con el último, etc.)
+#     y si queda uno en el medio (ej: la mediana) se grafica punteado
+#   - logx: True para usar escala logarítmica en x (Bode)
+# Devuelve la lista de artistas
+# ----------------------------------------------------------------------------------------------------------------------
+def plot_envelope(ax, x, env, color, percentiles, logx=False, label=""):
+    artists = [ax.fill_between(x, env[1], env[2], color=color, alpha=0.2, linewidth=0)]      # Mínimo a máximo
+    n = len(percentiles)
+    for i in range(n // 2):
+        artists.append(ax.fill_between(x, env[3 + i], env[3 + n - 1 - i], color=color, alpha=0.2, linewidth=0))
+    if n % 2 == 1:
+        artists += ax.plot(x, env[3 + n // 2], color=color, linestyle="--")
+    artists += ax.plot(x, env[0], color=color, label=label)                                 # Media
+    if logx:
+        ax.set_xscale("log")
+    return artists
+########################################################################################################################
 
+########################################################################################################################
+# plot_lod: Grafica una curva reducida a lo que se puede ver en el eje (ver decimate.py) y la vuelve a reducir cada vez
+# que cambian los límites de x (zoom, desplazamiento o set_xlim). Recibe lo mismo que ax.plot (x, y, fmt y kwargs) más:
+#   - logx: True para usar escala logarítmica en x y reducir con intervalos logarítmicos (Bode)
+#   - method: "minmax" o "lttb" (None para el de decimate.lod_method)
+# Las curvas chicas se grafican enteras. La línea guarda el id del callback en lod_cid (para desconectarlo al borrarla)
+# Devuelve la Line2D
+# ----------------------------------------------------------------------------------------------------------------------
+def plot_lod(ax, x, y, fmt="", logx=False, method=None, **kwargs):
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if logx:
+        ax.set_xscale("log")
+    xlim = None if ax.get_autoscalex_on() else ax.get_xlim()    # Con límites fijos sólo importa lo visible
+    line, = ax.plot(*decimate(x, y, lod_bins(ax), xlim, logx, method), fmt, **kwargs)
+    line.lod = (x, y, logx, method)         # Datos completos, set_lod_data los cambia
+
+    def update(axes):
+        x, y, logx, method = line.lod
+        line.set_data(*decimate(x, y, lod_bins(axes), axes.get_xlim(), logx, method))
+
+    line.lod_cid = ax.callbacks.connect("xlim_changed", update)
+    return line
+# ----------------------------------------------------------------------------------------------------------------------
+# set_lod_data: Cambia los datos completos de una línea de plot_lod y la vuelve a reducir para los límites actuales
+# Devuelve False si la línea no es de plot_lod
+def set_lod_data(line, x, y):
+    if not hasattr(line, "lod"):
+        return False
+    line.lod = (np.asarray(x), np.asarray(y)) + line.lod[2:]
+    line.set_data(*decimate(line.lod[0], line.lod[1], lod_bins(line.axes), line.axes.get_xlim(), *line.lod[2:]))
+    return True
+########################################################################################################################
+
+########################################################################################################################
+# remove_artists: Saca los artistas del gráfico (y desconecta el callback de zoom de las líneas de plot_lod)
+# ----------------------------------------------------------------------------------------------------------------------
+def remove_artists(artists):
+    for a in artists:
+        if hasattr(a, "lod_cid"):
+            a.axes.callbacks.disconnect(a.lod_cid)
+        a.remove()
+########################################################################################################################
+
+########################################################################################################################
+# recolor: Cambia el color de las líneas de una curva que tienen el color old (la entrada de una curva de tiempo tiene
+# su propio color). Devuelve False si alguno de los artistas no es una línea y hay que graficar la curva de vuelta
+# ----------------------------------------------------------------------------------------------------------------------
+def recolor(artists, old, new):
+    from matplotlib.colors import same_color
+    from matplotlib.lines import Line2D
+    if not all(isinstance(a, Line2D) for a in artists):
+        return False
+    for a in artists:
+        if same_color(a.get_color(), old):
+            a.set_color(new)
+    return True
+########################################################################################################################
+
+########################################################################################################################
+# axes_view: Lo que cambia el fondo del eje además de las curvas (límites, ticks y textos)
+# ----------------------------------------------------------------------------------------------------------------------
+def axes_view(ax):
+    return (ax.get_xlim(), ax.get_ylim(), tuple(ax.get_yticks()), ax.get_title(), ax.get_xlabel(), ax.get_ylabel(),
+            ax.get_xscale(), tuple(ax.figure.get_size_inches()))
+########################################################################################################################
+
+########################################################################################################################
+# build_curve: Crea una curva (para Curvespace.add_curves, corre en un hilo o proceso aparte)
+# Recibe la clase y los argumentos que devuelve get_curve
+# Devuelve la curva (None si hubo error) y lo que se hubiera impreso como mensaje de error ("" si no hubo error)
+# ----------------------------------------------------------------------------------------------------------------------
+def build_curve(job):
+    cls, args = job
+    if cls is None:
+        return None, "Tipo de curva inválido"
+    out = io.StringIO()
+    curve = None
+    with capture_stdout(out):
+        try:
+            curve = cls(*args)
+        except Exception as e:
+            print(repr(e))
+    if curve is not None and curve.is_valid():
+        return curve, ""
+    return None, out.getvalue().strip() or "Los datos ingresados no son válidos"
+########################################################################################################################
+
+########################################################################################################################
+# Clase ThreadStdout: Reemplazo de sys.stdout que manda lo que imprime cada hilo a su propio buffer si tiene uno
+# (contextlib.redirect_stdout cambia sys.stdout para todos los hilos a la vez)
+# ----------------------------------------------------------------------------------------------------------------------
+class ThreadStdout:
+    def __init__(self, out):
+        self.out = out                      # Salida original
+        self.local = threading.local()      # local.buffer: buffer del hilo (None si imprime en la salida original)
+
+    def write(self, s):
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer if buffer is not None else self.out).write(s)
+
+    def flush(self):
+        self.out.flush()
+########################################################################################################################
+
+########################################################################################################################
+# capture_stdout: Junta en out todo lo que se imprima dentro del with (sólo en el hilo actual si sys.stdout es un
+# ThreadStdout)
+# ----------------------------------------------------------------------------------------------------------------------
+@contextlib.contextmanager
+def capture_stdout(out):
+    if isinstance(sys.stdout, ThreadStdout):
+        sys.stdout.local.buffer = out
+        try:
+            yield out
+        finally:
+            sys.stdout.local.buffer = None
+    else:
+        with contextlib.redirect_stdout(out):
+            yield out
+########################################################################################################################
@@ -0,0 +1,131 @@
+import numpy as np
+
+########################################################################################################################
+# decimate: Reducción de curvas grandes a lo que el eje puede mostrar (nivel de detalle)
+# Un transitorio de 10^6 puntos se dibuja en unos pocos miles de pixeles, así que matplotlib (y savefig) recorre
+# muchísimos más puntos de los que se ven. Acá la parte visible de la curva se reduce a unos puntos por pixel:
+#   - minmax: el mínimo y el máximo de cada intervalo de x (del ancho de un pixel), en el orden en que aparecen. El
+#     dibujo es el mismo que con todos los puntos y no se pierde ningún pico ni ninguna muesca.
+#   - lttb: Largest Triangle Three Buckets (Steinarsson, 2013), un punto por intervalo elegido para conservar la forma
+#     (queda más suave que minmax con ruido). Además se agregan el mínimo y el máximo de la parte visible.
+# Con logx los intervalos son del mismo ancho en log10(x), como los pixeles de un Bode.
+# Siempre se devuelven muestras de la curva original (no se promedia nada). Si x no es creciente no se reduce.
+# ----------------------------------------------------------------------------------------------------------------------
+lod_method = "minmax"       # Método por defecto (ver switch_decimators)
+lod_oversample = 2          # Intervalos por pixel (más de uno para que savefig con más dpi no pierda detalle)
+
+
+########################################################################################################################
+# decimate: Reduce la parte visible de la curva x, y. Recibe:
+#   - bins: cantidad de intervalos (normalmente el ancho del eje en pixeles por lod_oversample, ver plot_lod)
+#   - xlim: límites visibles de x (None para toda la curva), se agrega un punto de cada lado para que la línea llegue
+#     a los bordes
+#   - logx: True para intervalos logarítmicos
+#   - method: "minmax" o "lttb" (por defecto lod_method)
+# Devuelve x, y reducidos (los mismos arreglos si no hace falta reducir)
+# ----------------------------------------------------------------------------------------------------------------------
+def decimate(x, y, bins, xlim=None, logx=False, method=None):
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(x)
+    if n < 3 or y.shape != x.shape or not is_sorted(x):
+        return x, y
+    i0, i1 = 0, n
+    if xlim is not None:
+        a, b = sorted(xlim)
+        i0 = max(int(np.searchsorted(x, a, "left")) - 1, 0)
+        i1 = min(int(np.searchsorted(x, b, "right")) + 1, n)
+    bins = max(1, int(bins))
+    if i1 - i0 <= 2 * bins:
+        return (x, y) if i1 - i0 == n else (x[i0:i1], y[i0:i1])
+    u = log_scale(x[i0:i1]) if logx else x[i0:i1]
+    ends = u[[0, -1]]
+    if xlim is not None:
+        lim = np.asarray(sorted(xlim), dtype=np.float64)
+        ends = np.clip(log_scale(lim) if logx else lim, u[0], u[-1])
+    decimator = switch_decimators.get(method if method is not None else lod_method)
+    if decimator is None:
+        print("Método de reducción inválido, se usará minmax")
+        decimator = minmax
+    k = i0 + decimator(u, y[i0:i1], bins, ends)
+    return x[k], y[k]
+########################################################################################################################
+
+########################################################################################################################
+# minmax: Índices del mínimo y el máximo de y en cada uno de los bins intervalos de u entre ends[0] y ends[1] (las
+# muestras de afuera van al primer o último intervalo), más la primera y la última muestra, ordenados
+# ----------------------------------------------------------------------------------------------------------------------
+def minmax(u, y, bins, ends):
+    n = len(u)
+    if ends[1] <= ends[0]:
+        return np.arange(n)
+    b = np.clip(((u - ends[0]) * (bins / (ends[1] - ends[0]))).astype(np.int64), 0, bins - 1)
+    starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+    counts = np.diff(np.r_[starts, n])
+    k = [np.array([0, n - 1])]
+    for reduce in [np.minimum, np.maximum]:
+        hits = np.flatnonzero(y == np.repeat(reduce.reduceat(y, starts), counts))
+        k.append(hits[np.unique(b[hits], return_index=True)[1]])    # Primera muestra con el extremo de cada intervalo
+    return np.unique(np.concatenate(k))
+########################################################################################################################
+
+########################################################################################################################
+# lttb: Índices elegidos por Largest Triangle Three Buckets con bins intervalos de u entre ends[0] y ends[1] (los vacíos
+# se saltean). En cada intervalo se queda con el punto que forma el triángulo más grande con el último elegido y el
+# promedio del intervalo siguiente. Se agregan la primera y la última muestra y el mínimo y el máximo de y
+# ----------------------------------------------------------------------------------------------------------------------
+def lttb(u, y, bins, ends):
+    n = len(u)
+    edges = np.unique(np.r_[1, np.searchsorted(u, np.linspace(ends[0], ends[1], bins + 1)[1:-1]), n - 1])
+    edges = edges[(edges >= 1) & (edges <= n - 1)]
+    if len(edges) < 2:
+        return np.arange(n)
+    counts = np.diff(np.r_[edges, n])                               # El último "intervalo" es la última muestra
+    mu = np.add.reduceat(u, edges) / counts
+    my = np.add.reduceat(y, edges) / counts
+    k = np.empty(len(edges) + 1, dtype=np.int64)
+    k[0] = a = 0
+    for i in range(len(edges) - 1):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((u[a] - mu[i + 1]) * (y[lo:hi] - y[a]) - (u[a] - u[lo:hi]) * (my[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        k[i + 1] = a
+    k[-1] = n - 1
+    return np.unique(np.r_[k, np.nanargmin(y), np.nanargmax(y)])
+########################################################################################################################
+
+# SWITCH DE MÉTODOS: Reciben u (x en la escala del eje), y, bins y los extremos visibles de u. Devuelven índices ordenados
+switch_decimators = {"minmax": minmax, "lttb": lttb}
+
+########################################################################################################################
+# set_lod: Configura el método por defecto ("minmax" o "lttb") y los intervalos por pixel de decimate/plot_lod
+# Devuelve False en caso de error
+# ----------------------------------------------------------------------------------------------------------------------
+def set_lod(method="minmax", oversample=2):
+    global lod_method, lod_oversample
+    if method not in switch_decimators or oversample <= 0:
+        print("El método tiene que ser " + " o ".join(switch_decimators) + " y los intervalos por pixel positivos")
+        return False
+    lod_method = method
+    lod_oversample = oversample
+    return True
+########################################################################################################################
+
+########################################################################################################################
+# Funciones auxiliares
+# ----------------------------------------------------------------------------------------------------------------------
+# lod_bins: Cantidad de intervalos para el eje ax (su ancho en pixeles por lod_oversample)
+def lod_bins(ax):
+    return max(1, int(ax.get_window_extent().width * lod_oversample))
+# ----------------------------------------------------------------------------------------------------------------------
+# is_sorted: True si x es no decreciente (sólo en ese caso se pueden buscar los límites visibles y armar intervalos)
+def is_sorted(x):
+    return x.ndim == 1 and bool(np.all(x[1:] >= x[:-1]))
+# ----------------------------------------------------------------------------------------------------------------------
+# log_scale: log10(x), los valores no positivos se llevan al menor positivo (como hace el eje logarítmico)
+def log_scale(x):
+    positive = x > 0
+    if not positive.any():
+        return x
+    return np.log10(np.where(positive, x, np.min(x[positive])))
+########################################################################################################################
@@ -1,9 +1,10 @@
+import numbers
 import numpy as np
-import scipy.signal as ss
 import os
-from matplotlib.lines import Line2D
-from curvespace import Curvespace, Curve
-from sympy import Float
+from curvespace import Curvespace, Curve, plot_runs, plot_envelope, plot_lod, set_lod_data, switch_colors
+from cache import cached
+from ltspice import read_ac, read_ac_mc, read_ac_mc_envelope, read_raw, raw_steps, split_raw_data
+from transfer import default_grid, adaptive_response, grid_response, batch_response, sweep_coefs, sample_components
 
 ########################################################################################################################
 # Clase Frecspace: Contiene la lista de curvas de frecuencias y métodos para modificarla
@@ -42,8 +43,6 @@ class Frecspace(Curvespace):
                 if self.check_name(name):
                     print("Se tomará como nombre: " + name)
                     break
-        # SWITCH DE COLORES
-        switch_colors = ["blue", "orange", "green", "red", "cyan", "magenta", "gold", "violet"]
         if color == "":# and c_type != 4:
             color = switch_colors[len(self.curves) % 8]
             print("Para la curva", name, "se tomará el color: " + color)
@@ -52,46 +51,40 @@ class Frecspace(Curvespace):
             print("Error creando la curva")
 
     # plot_mod: grafica el módulo del conjunto de curvas visibles, si alguna da error deja de ser visible
+    # Si ya se graficó en ax sólo actualiza lo que cambió (ver Curvespace.draw_curves y refresh)
     def plot_mod(self, ax):
         self.fix_units()
-        h = []
         if self.interval != [None, None]:
             ax.set_xlim(self.interval)
-        for i in range(len(self.curves)):
-            if self.curves[i].visibility:
-                if self.curves[i].plot_curve_mod(ax):  # Grafico módulo
-                    h.append(Line2D([], [], color=self.curves[i].color, label=self.curves[i].name))
-                else: self.curves[i].visibility = False
-        ax.legend(handles=h)
+        h = self.draw_curves(ax, lambda c: c.plot_curve_mod(ax), lambda c, a: c.update_curve_mod(a),
+                             lambda c: (c.w, c.mod))
+        self.draw_legend(ax, h)
         ax.set_title(self.mod_title)
         ax.set_xlabel(self.x_mod_label + " $\\left[" + self.curves[0].w_unit + "\\right]$")
         ax.set_ylabel(self.y_mod_label + " $\\left[" + self.curves[0].mod_unit + "\\right]$")
-        ax.grid()
+        ax.grid(True)
+        self.refresh(ax)
         return
 
     # plot_ph: grafica la fase del conjunto de curvas visibles, si alguna da error deja de ser visible
+    # Si ya se graficó en ax sólo actualiza lo que cambió (ver Curvespace.draw_curves y refresh)
     def plot_ph(self, ax):
         self.fix_units()
-        h = []
         phi = 180.0
         phf = -180.0
         if self.interval != [None, None]:
             ax.set_xlim(self.interval)
+        h = self.draw_curves(ax, lambda c: c.plot_curve_ph(ax), lambda c, a: c.update_curve_ph(a),
+                             lambda c: (c.w, c.get_ph()))
         for i in range(len(self.curves)):
             if self.curves[i].visibility:
-                if self.curves[i].plot_curve_ph(ax):  # Grafico fase
-                    h.append(Line2D([], [], color=self.curves[i].color, label=self.curves[i].name))
-                    if self.curves[i].type != 4 and phi > self.curves[i].ph.min():
-                        phi = self.curves[i].ph.min()
-                    elif self.curves[i].type == 4 and phi > self.curves[i].ph.min():
-                        phi = self.curves[i].ph.min()
-                    if self.curves[i].type != 4 and phf < self.curves[i].ph.max():
-                        phf = self.curves[i].ph.max()
-                    elif self.curves[i].type == 4 and phf < self.curves[i].ph.max():
-                        phf = self.curves[i].ph.max()
-                else: self.curves[i].visibility = False
-
-        ax.legend(handles=h)
+                ph = self.curves[i].get_ph()            # La fase como se graficó
+                if phi > ph.min():
+                    phi = ph.min()
+                if phf < ph.max():
+                    phf = ph.max()
+
+        self.draw_legend(ax, h)
         if self.ph_unit == "°":
             yticks_grad = [-180, -135, -90, -45, 0, 45, 90, 135, 180]
             yticks = self.scale_ph(phi, phf, yticks_grad)
@@ -113,7 +106,8 @@ class Frecspace(Curvespace):
         ax.set_title(self.ph_title)
         ax.set_xlabel(self.x_ph_label + " $\\left[" + self.curves[0].w_unit + "\\right]$")
         ax.set_ylabel(self.y_ph_label + " $\\left[" + self.curves[0].ph_unit + "\\right]$")
-        ax.grid()
+        ax.grid(True)
+        self.refresh(ax)
         return
 
     # set_interval: Permite definir el intervalo en el que se graficará el eje x
@@ -125,13 +119,10 @@ class Frecspace(Curvespace):
                     r = True
         if r:
             self.interval = intervalo
+            wi, wf = to_canonical("w", np.array(self.interval[:2], dtype=np.float64), self.w_unit)
             for i in range(len(self.curves)):
-                if self.curves[i].type == 1:
-                    wi = 2 * np.pi * self.interval[0]
-                    wf = 2 * np.pi * self.interval[1]
-                    num = self.curves[i].rawdata[0]
-                    den = self.curves[i].rawdata[1]
-                    self.curves[i].change_data([num, den, [wi, wf]])
+                if self.curves[i].type == 1 and self.curves[i].is_valid():
+                    self.curves[i].set_range(wi, wf)
         return r
 
     def scale_ph(self, phi, phf, yticks):
@@ -239,6 +230,12 @@ class Frecspace(Curvespace):
                 self.ph_unit = "°"
         return
 
+    # set_ph_mode: Configura cómo se grafica la fase de todas las curvas (ver FrecCurve.set_ph_mode)
+    def set_ph_mode(self, mode="wrap", branch=-180.0):
+        for i in range(len(self.curves)):
+            self.curves[i].set_ph_mode(mode, branch)
+        return
+
     # fix_units: Revisa las unidades de cada curva visible para que todas tengan las especificadas y tenga sentido graficarlas
     def fix_units(self):
         for i in range(len(self.curves)):
@@ -251,7 +248,7 @@ class Frecspace(Curvespace):
         # print("teórica")
         r = True
         t = Teo(1, data, name, color, w_unit, mod_unit, ph_unit)
-        if t.H is not None:
+        if t.is_valid():
             self.curves.append(t)
         else:
             print("Los datos ingresados no son válidos")
@@ -262,7 +259,7 @@ class Frecspace(Curvespace):
         # print("simulada")
         r = True
         s = Sim(2, data, name, color, w_unit, mod_unit, ph_unit)
-        if s.w != [] and s.mod != [] and s.ph != []:
+        if s.is_valid():
             self.curves.append(s)
         else:
             print("Los datos ingresados no son válidos")
@@ -273,7 +270,7 @@ class Frecspace(Curvespace):
         # print("medida")
         r = True
         m = Med(3, data, name, color, w_unit, mod_unit, ph_unit)
-        if m.w != [] and m.mod != [] and m.ph != []:
+        if m.is_valid():
             self.curves.append(m)
         else:
             print("Los datos ingresados no son válidos")
@@ -284,13 +281,62 @@ class Frecspace(Curvespace):
         # print("montecarlo")
         r = True
         mc = MC(4, data, name, color, w_unit, mod_unit, ph_unit)
-        if mc.w != [] and mc.mod != [] and mc.ph != []:
+        if mc.is_valid():
             self.curves.append(mc)
         else:
             print("Los datos ingresados no son válidos")
             r = False
         return r
 
+    def raw(self, data, name, color, w_unit="Hz", mod_unit="dB", ph_unit="°"):
+        # print("raw")
+        r = True
+        rw = Raw(5, data, name, color, w_unit, mod_unit, ph_unit)
+        if rw.is_valid():
+            self.curves.append(rw)
+        else:
+            print("Los datos ingresados no son válidos")
+            r = False
+        return r
+
+    def envolvente(self, data, name, color, w_unit="Hz", mod_unit="dB", ph_unit="°"):
+        # print("envolvente")
+        r = True
+        env = MCEnv(6, data, name, color, w_unit, mod_unit, ph_unit)
+        if env.is_valid():
+            self.curves.append(env)
+        else:
+            print("Los datos ingresados no son válidos")
+            r = False
+        return r
+
+    def barrido(self, data, name, color, w_unit="Hz", mod_unit="dB", ph_unit="°"):
+        # print("barrido")
+        r = True
+        sw = Sweep(7, data, name, color, w_unit, mod_unit, ph_unit)
+        if sw.is_valid():
+            self.curves.append(sw)
+        else:
+            print("Los datos ingresados no son válidos")
+            r = False
+        return r
+
+    def tolerancias(self, data, name, color, w_unit="Hz", mod_unit="dB", ph_unit="°"):
+        # print("tolerancias")
+        r = True
+        tol = Tol(8, data, name, color, w_unit, mod_unit, ph_unit)
+        if tol.is_valid():
+            self.curves.append(tol)
+        else:
+            print("Los datos ingresados no son válidos")
+            r = False
+        return r
+
+    # get_curve: Devuelve la clase y los argumentos para crear una curva del tipo c_type (ver Curvespace.add_curves)
+    def get_curve(self, c_type, data, name, color, w_unit="rad/s", mod_unit="dB", ph_unit="°"):
+        switch_classes = {1: Teo, 2: Sim, 3: Med, 4: MC, 5: Raw, 6: MCEnv, 7: Sweep, 8: Tol}
+        return switch_classes.get(c_type), (c_type, data, name, color, w_unit, mod_unit, ph_unit)
+
     def c_type_error(self):
         print("Si llegó hasta acá es porque se rompió algo")
         return False
@@ -301,6 +347,10 @@ class Frecspace(Curvespace):
         2: simulada,
         3: medida,
         4: montecarlo,
+        5: raw,
+        6: envolvente,
+        7: barrido,
+        8: tolerancias,
     }
 ########################################################################################################################
 
@@ -310,6 +360,10 @@ class Frecspace(Curvespace):
 #                     - 2 si es simulada (LTSpice)
 #                     - 3 si es medida (Digilent)
 #                     - 4 si es monte carlo (LTSpice)
+#                     - 5 si es un .raw binario de LTSpice (una vez leído queda como 2 o 4 según tenga una o varias corridas)
+#                     - 6 si es la envolvente estadística de un monte carlo (LTSpice)
+#                     - 7 si es un barrido de parámetros de una función transferencia
+#                     - 8 si es un monte carlo de tolerancias de una función transferencia
 #                     - 0 si es otra cosa (error)
 #    - Raw Data: Dependerán del tipo de curva, en cada caso se especifica mejor (mirar funciones)
 #    - Nombre: Si no se especifica, se le asignará uno según el orden
@@ -327,23 +381,97 @@ class FrecCurve(Curve):
     def __init__(self, c_type, data, name, color, w_unit="rad/seg", mod_unit="dB", ph_unit="°"):
         super().__init__(c_type, data, name, color)
 
-        self.w = []
-        self.mod = []
-        self.ph = []
+        if w_unit == "rad/seg" or w_unit == "rad/s":
+            w_unit = "\\frac{rad}{s}"
         self.w_unit = w_unit        # Unidad de la frecuencia, se asume Hz
         self.mod_unit = mod_unit    # Unidad del módulo, se asume dB
         self.ph_unit = ph_unit      # Unidad de la fase, se asume °
+        self.units = {}             # Unidad en la que se cargó cada dato ("w", "mod", "ph")
+        self.views = {}             # Cada dato convertido a las unidades en que se pidió (None: canónica)
+        self.w = []
+        self.mod = []
+        self.ph = []
+        self.ph_mode = default_ph_mode(c_type)  # Cómo se grafica la fase: "wrap", "unwrap" o "" (ver set_ph_mode)
+        self.ph_branch = -180.0     # Límite inferior (abierto) de la rama de la fase en grados (ver set_ph_mode)
+        self.ph_view = None         # Fase ya acomodada para graficar: (fase original, unidad, modo, rama, resultado)
+
+    # w, mod, ph: Datos de la curva en sus unidades actuales (w_unit, mod_unit, ph_unit)
+    # Cada dato se guarda una sola vez en la unidad en que se cargó; cambiar de unidad sólo cambia w_unit, mod_unit o
+    # ph_unit y la conversión se calcula la primera vez que se pide (ver get_values), así los datos no se reescriben
+    # ni acumulan error al cambiar de unidad varias veces
+    @property
+    def w(self):
+        return self.get_values("w", self.w_unit)
+
+    @w.setter
+    def w(self, w):
+        self.set_values("w", w, self.w_unit)
+
+    @property
+    def mod(self):
+        return self.get_values("mod", self.mod_unit)
+
+    @mod.setter
+    def mod(self, mod):
+        self.set_values("mod", mod, self.mod_unit)
+
+    @property
+    def ph(self):
+        return self.get_values("ph", self.ph_unit)
+
+    @ph.setter
+    def ph(self, ph):
+        self.set_values("ph", ph, self.ph_unit)
+
+    # set_values: Guarda un dato ("w", "mod" o "ph") expresado en unit y descarta las conversiones anteriores
+    def set_values(self, name, values, unit):
+        self.units[name] = unit
+        self.views[name] = {unit: np.asarray(values)}
+        return
+
+    # get_values: Devuelve un dato ("w", "mod" o "ph") en la unidad unit
+    # Se convierte a la unidad canónica (rad/s, veces, rad) y de ahí a unit sólo la primera vez, después se reutiliza
+    def get_values(self, name, unit):
+        views = self.views[name]
+        if unit not in views:
+            if None not in views:
+                views[None] = to_canonical(name, views[self.units[name]], self.units[name])
+            views[unit] = from_canonical(name, views[None], unit)
+        return views[unit]
+
+    # is_valid: Devuelve True si la curva se pudo cargar
+    def is_valid(self):
+        return len(self.w) != 0 and len(self.mod) != 0 and len(self.ph) != 0
+
+    # set_ph_mode: Configura cómo se grafica la fase (no modifica self.ph). Recibe:
+    #   - mode: "wrap" para llevarla a la rama (branch, branch + 360°], "unwrap" para que sea continua (empezando en esa
+    #     rama), "" para graficarla como está
+    #   - branch: límite inferior (abierto) de la rama en grados (se convierte si la fase está en rad)
+    # Por defecto es ("wrap", -180°), salvo los Monte Carlo y sus envolventes (ver default_ph_mode)
+    def set_ph_mode(self, mode="wrap", branch=-180.0):
+        self.ph_mode = mode
+        self.ph_branch = branch
+        return
+
+    # get_ph: Devuelve la fase como se grafica según set_ph_mode
+    # El resultado se guarda y se reutiliza mientras no cambien la fase, su unidad o el modo
+    def get_ph(self):
+        key = (self.ph_unit, self.ph_mode, self.ph_branch)
+        if self.ph_view is None or self.ph_view[0] is not self.ph or self.ph_view[1:4] != key:
+            self.ph_view = (self.ph,) + key + (wrap_phase(self.ph, self.ph_unit, self.ph_mode, self.ph_branch),)
+        return self.ph_view[4]
 
     def plot_curve_mod(self, ax):
         ls = get_ls(self.type)
         if ls == '':
             print("Hubo un error, no se puede graficar la curva")
             return False
-        if self.type != 4:
-            ax.semilogx(self.w, self.mod, self.color, marker=ls)  # Grafico el módulo de la transferencia
+        if self.type == 6:
+            plot_envelope(ax, self.w, self.mod, self.color, self.percentiles, logx=True)  # Grafico la envolvente
+        elif self.type != 4 and self.type != 7 and self.type != 8:
+            plot_lod(ax, self.w, self.mod, self.color, logx=True, marker=ls)  # Grafico el módulo de la transferencia
         else:
-            for i in range(len(self.w)):
-                ax.semilogx(self.w[i], self.mod[i], self.color, marker=ls)  # Grafico el módulo de la transferencia
+            plot_runs(ax, self.w, self.mod, self.color, logx=True)  # Grafico el módulo de todas las corridas o parámetros
         return True
 
     def plot_curve_ph(self, ax):
@@ -351,19 +479,22 @@ class FrecCurve(Curve):
         if ls == '':
             print("Hubo un error, no se puede graficar la curva")
             return False
-        if self.type != 4:
-            for i in range(len(self.ph)):
-                while (self.ph_unit == "°" and self.ph[i] < -180.0) or (self.ph_unit == "rad" and self.ph[i] < -np.pi):
-                    if self.ph_unit == "°":
-                        self.ph[i] = self.ph[i] + 360.0
-                    elif self.ph_unit == "rad":
-                        self.ph[i] = self.ph[i] + 2 * np.pi
-            ax.semilogx(self.w, self.ph, self.color, marker=ls)  # Grafico el módulo de la transferencia
+        if self.type == 6:
+            plot_envelope(ax, self.w, self.get_ph(), self.color, self.percentiles, logx=True)  # Grafico la envolvente
+        elif self.type != 4 and self.type != 7 and self.type != 8:
+            plot_lod(ax, self.w, self.get_ph(), self.color, logx=True, marker=ls)  # Grafico la fase de la transferencia
         else:
-            for i in range(len(self.w)):
-                ax.semilogx(self.w[i], self.ph[i], self.color, marker=ls)  # Grafico la fase de la transferencia
+            plot_runs(ax, self.w, self.get_ph(), self.color, logx=True)  # Grafico la fase de todas las corridas o parámetros
         return True
 
+    # update_curve_mod, update_curve_ph: Pasan el módulo o la fase actuales a los artistas que graficó plot_curve_mod o
+    # plot_curve_ph sin volver a graficar. Devuelven False si no se puede (Monte Carlo, envolvente, barridos)
+    def update_curve_mod(self, artists):
+        return self.type not in (4, 6, 7, 8) and len(artists) == 1 and set_lod_data(artists[0], self.w, self.mod)
+
+    def update_curve_ph(self, artists):
+        return self.type not in (4, 6, 7, 8) and len(artists) == 1 and set_lod_data(artists[0], self.w, self.get_ph())
+
     # change_w_unit: Cambia la unidad de la frecuencia de Hz a rad/s o viceversa
     # Si no se especifica la unidad a la que se quiere cambiar o es una que no existe, hace un switch
     def change_w_unit(self, unit=""):
@@ -372,10 +503,8 @@ class FrecCurve(Curve):
         if self.w_unit != unit:
             if self.w_unit == "Hz":
                 self.w_unit = "\\frac{rad}{s}"
-                self.w = 2*np.pi*self.w
             else:
                 self.w_unit = "Hz"
-                self.w = self.w/(2*np.pi)
         return
 
     # change_mod_unit: Cambia la unidad del módulo de dB a ?? o viceversa
@@ -384,10 +513,8 @@ class FrecCurve(Curve):
         if self.mod_unit != unit:
             if self.mod_unit == "dB":
                 self.mod_unit = "veces"
-                self.mod = np.power(10, self.mod/20)
             else:
                 self.mod_unit = "dB"
-                self.mod = 20*np.log10(self.mod)
         return
 
     # change_ph_unit: Cambia la unidad de la fase de ° a rad o viceversa
@@ -396,35 +523,83 @@ class FrecCurve(Curve):
         if self.ph_unit != unit:
             if self.ph_unit == "°":
                 self.ph_unit = "rad"
-                self.ph = np.pi*self.ph/180
             else:
                 self.ph_unit = "°"
-                self.ph = 180*self.ph/np.pi
         return
 ########################################################################################################################
 
 ########################################################################################################################
 # Clase Teo: Curva teórica, hija de la clase Curve
 # Tiene algunos parámetros extra:
-#       - H: Función Transferencia (scipy)
+#       - num, den: Coeficientes del numerador y denominador
+#       - H: Función Transferencia (scipy, se usa para las respuestas temporales). Se arma cuando se pide, así
+#         scipy.signal no se importa si sólo se grafica el Bode
+#       - adaptive: True si la grilla de frecuencias es adaptiva (ver transfer.adaptive_grid)
+#       - tol: Error máximo del módulo en dB de la grilla adaptiva
+# La respuesta en frecuencia se calcula directamente de num y den (ver transfer.freq_response), sin pasar por ss.bode
+# Si se especifica el intervalo sin cantidad de puntos ([wi, wf]) o no se especifica, la grilla es adaptiva: se
+# refina sólo cerca de los polos y ceros hasta que el error sea menor a tol. Con [wi, wf, puntos] es lineal.
 # ----------------------------------------------------------------------------------------------------------------------
 class Teo(FrecCurve):
     def __init__(self, c_type, data, name, color, w_unit="rad/seg", mod_unit="dB", ph_unit="°"):
         super().__init__(1, data, name, color, w_unit, mod_unit, ph_unit)
+        self.adaptive = True
+        self.tol = 0.1
         num, den = self.check_data(self.rawdata)
-        self.H = None
+        self.num = None
+        self.den = None
         if num is not None and den is not None:         # Si están en orden, hace la modificación
-            self.H = ss.TransferFunction(num, den)
+            self.num = np.asarray(num, dtype=np.float64)
+            self.den = np.asarray(den, dtype=np.float64)
             if len(self.w) == 0:
-                self.w, self.mod, self.ph = ss.bode(self.H)
+                w = default_grid(self.num, self.den)
+                self.set_values("w", [w[0], w[-1]], None)
+                self.evaluate()
                 self.wi = self.w[0]
                 self.wf = self.w[-1]
                 self.points = len(self.w)
             else:
-                self.w, self.mod, self.ph = ss.bode(self.H, self.w)
-            if self.w_unit == "Hz":
-                self.w = self.w / (2 * np.pi)
-                self.w, self.mod, self.ph = ss.bode(self.H, self.w)
+                self.evaluate()
+
+    # is_valid: Devuelve True si la función transferencia es válida
+    def is_valid(self):
+        return self.num is not None
+
+    # H: Función transferencia de scipy armada con num y den (None si la curva no es válida)
+    @property
+    def H(self):
+        if self.num is None or self.den is None:
+            return None
+        import scipy.signal as ss
+        return ss.TransferFunction(self.num, self.den)
+
+    # evaluate: Calcula la respuesta en frecuencia en el intervalo (o la grilla) actual y la guarda (w en rad/s, módulo
+    # en dB y fase en °). Las respuestas quedan en el cache de transfer, así que si ya se calculó la misma H en el mismo
+    # intervalo no se vuelve a evaluar, y si el intervalo se superpone con uno anterior sólo se calcula lo nuevo
+    def evaluate(self):
+        w = self.get_values("w", None)
+        if self.adaptive and len(w) != 0 and w[0] > 0:
+            w, mod, ph = adaptive_response(self.num, self.den, w[0], w[-1], self.tol)
+        else:
+            mod, ph = grid_response(self.num, self.den, w)
+        self.set_values("w", w, None)
+        self.set_values("mod", mod, "dB")
+        self.set_values("ph", ph, "°")
+        return
+
+    # set_range: Cambia el intervalo de frecuencias a [wi, wf] (en rad/s) con grilla adaptiva y recalcula la curva
+    def set_range(self, wi, wf):
+        self.adaptive = True
+        self.set_values("w", [wi, wf], None)
+        self.evaluate()
+        return
+
+    # set_tolerance: Cambia el error máximo en dB de la grilla adaptiva y la vuelve a calcular
+    def set_tolerance(self, tol):
+        self.tol = tol
+        if self.is_valid() and self.adaptive:
+            self.evaluate()
+        return
 
     # change_data: Revisa la validez de los datos nuevos.
     # Devuelve False si hubo error.
@@ -433,8 +608,9 @@ class Teo(FrecCurve):
         num, den = self.check_data(data)        # Revisa los datos nuevos
         if num is not None and den is not None:         # Si están en orden, hace la modificación
             self.rawdata = data
-            self.H = ss.TransferFunction(num, den)
-            self.w, self.mod, self.ph = ss.bode(self.H, self.w)
+            self.num = np.asarray(num, dtype=np.float64)
+            self.den = np.asarray(den, dtype=np.float64)
+            self.evaluate()
         else:
             print("Los datos ingresados no son válidos")
             r = False
@@ -443,33 +619,159 @@ class Teo(FrecCurve):
     # check_data: Procesa los datos de la función transferencia, asume que se recibe un arreglo con el numerador y denominador como strings
     # Ej data = ["1, 2,1, ,5", "3, 4, 1,3"]
     # Los espacios de más se eliminan y los números racionales se ingresan con punto (1.5)
+    # También se puede pasar H(s) como expresión (de sympy o string) con los valores de los demás símbolos:
+    # Ej data = [R / (R*C*s + 1), {"R": 1E3, "C": 1E-6}] o ["R / (R*C*s + 1)", {"R": 1E3, "C": 1E-6}, [1, 1E6]]
+    # La expresión se compila una sola vez (ver transfer.compile_kernel)
     # Devuelve num = None y den = None si hubo error
     def check_data(self, data):
         aux = []
         num = None
         den = None
-        if isinstance(data[0], str) and isinstance(data[1], str):
+        if len(data) >= 2 and isinstance(data[1], dict):
+            num, den = sweep_coefs(data[0], data[1])
+            if num is not None and den is not None:
+                num, den = num[:, 0], den[:, 0]
+            if len(data) == 3:
+                aux = data[2]
+        elif isinstance(data[0], str) and isinstance(data[1], str):
             num = fix_coefs(data[0])
             den = fix_coefs(data[1])
             if len(data) == 3 and isinstance(data[2], str):     # Si se especifica la w
                 aux = fix_coefs(data[2])
-        elif all(isinstance(x, (float, int, Float)) for x in data[0]) and all(isinstance(x, (float, int, Float)) for x in data[1]):
-            if len(data) == 3 and all(isinstance(x, (float, int, Float, np.ndarray)) for x in data[2]):
+        elif all(isinstance(x, numbers.Real) for x in data[0]) and all(isinstance(x, numbers.Real) for x in data[1]):
+            if len(data) == 3 and all(isinstance(x, (numbers.Real, np.ndarray)) for x in data[2]):
                 num, den, aux = data
             else:
                 num, den = data
 
         if len(aux) == 2:
             self.wi, self.wf = aux
-            self.w = np.linspace(self.wi, self.wf, 1000)
+            self.adaptive = self.wi > 0
+            self.w = [self.wi, self.wf] if self.adaptive else np.linspace(self.wi, self.wf, 1000)
         elif len(aux) == 3:
             self.wi, self.wf, self.points = aux
             self.points = round(self.points)
+            self.adaptive = False
             self.w = np.linspace(self.wi, self.wf, self.points)
 
         return num, den
 ########################################################################################################################
 
+########################################################################################################################
+# Clase Sweep: Barrido de parámetros de una función transferencia, hija de la clase Curve
+# En data recibe [fun, params] o [fun, params, intervalo]:
+#       - fun: función que recibe los parámetros por nombre y devuelve num, den. Tiene que funcionar con arreglos de
+#         numpy, ej: def H(R2): return [-R2 / R1], [R2 * C, 1]. También puede ser una expresión de sympy en s
+#       - params: diccionario {nombre: valores}, ej: {"R2": np.linspace(1E3, 30E3, 1000)}
+#       - intervalo: [wi, wf] o [wi, wf, puntos] (por defecto 1000 puntos), la grilla es logarítmica
+# Toda la familia se evalúa a la vez (ver transfer.sweep_coefs), así que 1000 valores cuestan lo mismo que una sola
+# evaluación vectorizada. w, mod y ph son de (parámetros, puntos) como en MC y se grafica como una sola curva.
+# ----------------------------------------------------------------------------------------------------------------------
+class Sweep(FrecCurve):
+    curve_type = 7                  # Tol lo redefine
+
+    def __init__(self, c_type, data, name, color, w_unit="rad/seg", mod_unit="dB", ph_unit="°"):
+        super().__init__(self.curve_type, data, name, color, w_unit, mod_unit, ph_unit)
+        self.params = {}            # Valores de cada parámetro
+        self.grid = []              # Frecuencias en rad/s (una sola vez, w es esta grilla repetida por parámetro)
+        self.num = None
+        self.den = None
+        num, den = self.check_data(self.rawdata)
+        if num is not None and den is not None:
+            self.num, self.den = num, den
+            self.evaluate()
+
+    # change_data: Revisa la validez de los datos nuevos.
+    # Devuelve False si hubo error.
+    def change_data(self, data):
+        r = True
+        num, den = self.check_data(data)
+        if num is not None and den is not None:
+            self.rawdata = data
+            self.num, self.den = num, den
+            self.evaluate()
+        else:
+            print("Los datos ingresados no son válidos")
+            r = False
+        return r
+
+    # sample: Separa data en la función, los valores de cada parámetro y el intervalo ([] para el de por defecto)
+    # Devuelve None, None, None si hubo error (Tol lo redefine para generar los valores de los componentes)
+    def sample(self, data):
+        if not isinstance(data, (list, tuple)) or len(data) < 2 or not isinstance(data[1], dict):
+            print("El barrido se especifica como [función, {parámetro: valores}] o [función, {parámetro: valores}, intervalo]")
+            return None, None, None
+        return data[0], data[1], data[2] if len(data) == 3 else []
+
+    # check_data: Revisa los datos y calcula los coeficientes de toda la familia
+    # Devuelve num, den de (coeficientes, parámetros), o None, None si hubo error
+    def check_data(self, data):
+        fun, values, aux = self.sample(data)
+        if values is None:
+            return None, None
+        num, den = sweep_coefs(fun, values)
+        if num is None:
+            return None, None
+        self.params = {k: np.broadcast_to(np.asarray(v, dtype=np.float64), (num.shape[1],)) for k, v in values.items()}
+
+        if len(aux) == 2 or len(aux) == 3:
+            self.wi, self.wf = aux[0], aux[1]
+            points = round(aux[2]) if len(aux) == 3 else 1000
+            wi, wf = to_canonical("w", np.array([self.wi, self.wf], dtype=np.float64), self.w_unit)
+            self.grid = np.logspace(np.log10(wi), np.log10(wf), points)
+        elif len(self.grid) == 0:          # Cubre los polos y ceros del primer y último parámetro
+            w = np.concatenate((default_grid(num[:, 0], den[:, 0]), default_grid(num[:, -1], den[:, -1])))
+            self.grid = np.logspace(np.log10(w.min()), np.log10(w.max()), 1000)
+        return num, den
+
+    # evaluate: Calcula la respuesta en frecuencia de toda la familia y la guarda (w en rad/s, módulo en dB y fase en °)
+    def evaluate(self):
+        mod, ph = batch_response(self.num, self.den, self.grid)
+        self.set_values("w", np.broadcast_to(self.grid, mod.shape), None)
+        self.set_values("mod", mod, "dB")
+        self.set_values("ph", ph, "°")
+        return
+
+    # get_member: Devuelve los parámetros y w, mod, ph de la curva i de la familia
+    def get_member(self, i):
+        return {k: v[i] for k, v in self.params.items()}, self.w[i], self.mod[i], self.ph[i]
+########################################################################################################################
+
+########################################################################################################################
+# Clase Tol: Monte Carlo de tolerancias de una función transferencia analítica, hija de la clase Sweep
+# En data recibe [fun, componentes, corridas], [fun, componentes, corridas, intervalo] o
+# [fun, componentes, corridas, intervalo, semilla]:
+#       - fun: como en Sweep (función de los componentes o expresión de sympy)
+#       - componentes: diccionario {nombre: valor} o {nombre: (nominal, tolerancia[, distribución])}, ej:
+#         {"R1": (3.3E3, 0.05), "C1": (18E-9, 0.1, "gauss"), "R3": 1.5E3} (ver transfer.sample_components)
+#       - intervalo: como en Sweep ([] para el de por defecto)
+#       - semilla: del generador de números aleatorios (por defecto 0, así el resultado se puede repetir)
+# Las corridas se evalúan todas juntas sin simulador (ver transfer.batch_response, que las puede repartir en
+# procesos), y w, mod y ph son de (corridas, puntos) como en MC, así que se grafica igual.
+# En params quedan los valores de los componentes de cada corrida
+# ----------------------------------------------------------------------------------------------------------------------
+class Tol(Sweep):
+    curve_type = 8
+
+    def __init__(self, c_type, data, name, color, w_unit="rad/seg", mod_unit="dB", ph_unit="°"):
+        self.runs = 0
+        self.seed = 0
+        super().__init__(c_type, data, name, color, w_unit, mod_unit, ph_unit)
+
+    # sample: Genera los valores de los componentes de todas las corridas
+    # Devuelve la función, los valores y el intervalo, o None, None, None si hubo error
+    def sample(self, data):
+        if not isinstance(data, (list, tuple)) or len(data) < 3 or not isinstance(data[1], dict):
+            print("El Monte Carlo se especifica como [función, {componente: (nominal, tolerancia)}, corridas]")
+            return None, None, None
+        self.runs = int(data[2])
+        self.seed = data[4] if len(data) == 5 else 0
+        samples = sample_components(data[1], self.runs, self.seed)
+        if samples is None:
+            return None, None, None
+        return data[0], samples, data[3] if len(data) >= 4 else []
+########################################################################################################################
+
 ########################################################################################################################
 # Clase Sim: Curva simulada, hija de la clase Curve
 # Tiene unos parámetros extra: - Mentira por ahora no tiene
@@ -492,38 +794,10 @@ class Sim(FrecCurve):
         return r
 
     # check_data: Parsea el txt de la simulación de LTSpice, asume que tiene el formato de los ejemplos
+    # Lee el archivo en una sola pasada (ver ltspice.read_ac), o del cache si ya se leyó y no cambió
     # Devuelve w, mod, ph
     def check_data(self, path):
-        file = open(path, "r")
-        file.readline()
-        aux = file.readline().split("\t")
-        aux_mod, aux_ph = aux[1][1:-2].split(",")
-        count = 2
-
-        mod_unit = get_unit(aux_mod)
-        ph_unit = get_unit(aux_ph)
-        for line in file:
-            if line != "\n":
-                count += 1
-        file.close()
-
-        w = np.zeros(count - 1)
-        mod = np.zeros(count - 1)
-        ph = np.zeros(count - 1)
-
-        l = open(path, "r")
-
-        l.readline()
-        for i in range(count - 1):
-            aux = l.readline().split("\t")
-            w[i] = aux[0]
-            aux_mod, aux_ph = aux[1][1:-2].split(",")
-            mod[i] = aux_mod.replace(mod_unit, "")
-            ph[i] = aux_ph.replace(ph_unit, "")
-        l.close()
-
-        #if self.ph_unit == 'Â°': self.ph_unit = '°'
-
+        w, mod, ph, mod_unit, ph_unit = cached("ac", path, read_ac)
         return w, mod, ph
 
     # check_file: Revisa que el archivo exista, que sea .txt y que tenga el formato adecuado
@@ -543,10 +817,10 @@ class Sim(FrecCurve):
                 print("El archivo no es legible")
                 r = False
             else:
-                file = open(path, "r")
-                if len(file.readline().split("\t")) != 2:
-                    print("El archivo no cumple con el formato adecuado")
-                    r = False
+                with open(path, "rb") as file:
+                    if len(file.readline().split(b"\t")) != 2:
+                        print("El archivo no cumple con el formato adecuado")
+                        r = False
         return r
 ########################################################################################################################
 
@@ -570,9 +844,14 @@ class Med(FrecCurve):
             r = True
         return r
 
-    # check_data: Parsea el csv de la medición de la Digilent, asume que tiene el formato de los ejemplos
+    # check_data: Parsea el csv de la medición de la Digilent, o lo lee del cache si ya se leyó y no cambió
     # Devuelve w, mod, ph
     def check_data(self, path):
+        return cached("med", path, self.parse_file)
+
+    # parse_file: Parsea el csv de la medición de la Digilent, asume que tiene el formato de los ejemplos
+    # Devuelve w, mod, ph
+    def parse_file(self, path):
         fix_csv(path)
         file = open(path, "r")
         count = 0
@@ -650,43 +929,13 @@ class MC(FrecCurve):
         return r
 
     # check_data: Parsea el txt de la simulación de LTSpice, asume que tiene el formato de los ejemplos
+    # Indexa las corridas en una pasada sobre el archivo mapeado en memoria (ver ltspice.read_ac_mc), o las lee del cache
+    # si ya se leyó y no cambió
     # Devuelve w, mod, ph
     def check_data(self, path):
-        file = open(path, "r")
-        file.readline()
-        aux = file.readline()
-        j1 = aux.find("/")
-        j2 = aux.find(")")
-        runs = int(aux[j1 + 1: j2])
-        aux = file.readline().split("\t")
-        aux_mod, aux_ph = aux[1][1:-2].split(",")
-
-        count = 2
-        self.mod_unit = get_unit(aux_mod)
-        self.ph_unit = get_unit(aux_ph)
-        for line in file:
-            if line != 'Step Information: Run=2  (Run: 2/' + str(runs) + ')\n':
-                count += 1
-            else:
-                break
-        file.close()
-
-        w = np.zeros((runs, count - 1))
-        mod = np.zeros((runs, count - 1))
-        ph = np.zeros((runs, count - 1))
-
-        l = open(path, "r")
-
-        l.readline()
-        for k in range(runs):
-            l.readline()
-            for i in range(count - 1):
-                aux = l.readline().split("\t")
-                w[k][i] = aux[0]
-                aux_mod, aux_ph = aux[1][1:-2].split(",")
-                mod[k][i] = aux_mod.replace(self.mod_unit, "")
-                ph[k][i] = aux_ph.replace(self.ph_unit, "")
-        l.close()
+        w, mod, ph, mod_unit, ph_unit = cached("ac_mc", path, read_ac_mc)
+        if mod_unit != "": self.mod_unit = mod_unit
+        if ph_unit != "": self.ph_unit = ph_unit
 
         if self.ph_unit == 'Â°': self.ph_unit = '°'
 
@@ -709,13 +958,129 @@ class MC(FrecCurve):
                 print("El archivo no es legible")
                 r = False
             else:
-                file = open(path, "r")
-                if len(file.readline().split("\t")) != 2:
-                    print("El archivo no cumple con el formato adecuado")
-                    r = False
-                elif file.readline().find('Step Information: Run=1') == -1:
-                    print("El archivo no cumple con el formato adecuado")
-                    r = False
+                with open(path, "rb") as file:
+                    if len(file.readline().split(b"\t")) != 2:
+                        print("El archivo no cumple con el formato adecuado")
+                        r = False
+                    elif file.readline().find(b'Step Information: Run=1') == -1:
+                        print("El archivo no cumple con el formato adecuado")
+                        r = False
+        return r
+########################################################################################################################
+
+########################################################################################################################
+# Clase MCEnv: Envolvente estadística de una simulación de Monte Carlo, hija de la clase MC
+# En data recibe el path al txt o un arreglo [path, percentiles] (por defecto los percentiles 5 y 95)
+# Las corridas se leen de a una y sólo se guardan las estadísticas (ver stats.Envelope), así que la memoria no depende
+# de la cantidad de corridas. w tiene un valor por punto y mod y ph son de (filas, puntos) con las filas:
+# media, mínimo, máximo y los percentiles en orden (ver get_stat)
+# ----------------------------------------------------------------------------------------------------------------------
+class MCEnv(MC):
+    def __init__(self, c_type, data, name, color, w_unit="Hz", mod_unit="dB", ph_unit="°"):
+        FrecCurve.__init__(self, 6, data, name, color, w_unit, mod_unit, ph_unit)
+        self.percentiles = [5, 95]
+        if self.check_file(data):
+            self.w, self.mod, self.ph = self.check_data(self.rawdata)
+
+    # check_data: Lee el Monte Carlo calculando la envolvente (ver ltspice.read_ac_mc_envelope), o la lee del cache si
+    # ya se calculó y el archivo no cambió
+    # Devuelve w, mod, ph
+    def check_data(self, data):
+        path, percentiles = (data[0], data[1]) if isinstance(data, (list, tuple)) else (data, [5, 95])
+        self.percentiles = sorted(percentiles)
+        w, mod, ph, mod_unit, ph_unit = cached("ac_mc_env" + str(self.percentiles), path,
+                                               lambda p: read_ac_mc_envelope(p, self.percentiles))
+        if mod_unit != "": self.mod_unit = mod_unit
+        if ph_unit != "": self.ph_unit = ph_unit
+        return w, mod, ph
+
+    # check_file: Revisa el archivo igual que MC
+    def check_file(self, data):
+        path = data[0] if isinstance(data, (list, tuple)) else data
+        return super().check_file(path)
+
+    # get_stat: Devuelve w, mod, ph de una estadística: "mean", "min", "max" o uno de los percentiles
+    def get_stat(self, stat):
+        i = {"mean": 0, "min": 1, "max": 2}.get(stat)
+        if i is None:
+            i = 3 + self.percentiles.index(stat)
+        return self.w, self.mod[i], self.ph[i]
+########################################################################################################################
+
+########################################################################################################################
+# Clase Raw: Simulación AC leída directamente del .raw binario de LTSpice, hija de la clase Curve
+# En data recibe el path al .raw o un arreglo [path, traza] (si no se especifica la traza se toma la primera)
+# Si el .raw tiene varias corridas (Monte Carlo o .step) queda como tipo 4 con w, mod y ph de (corridas, puntos),
+# si no queda como tipo 2
+# w, mod y ph serán [] si hubo error
+# ----------------------------------------------------------------------------------------------------------------------
+class Raw(FrecCurve):
+    def __init__(self, c_type, data, name, color, w_unit="Hz", mod_unit="dB", ph_unit="°"):
+        super().__init__(5, data, name, color, w_unit, mod_unit, ph_unit)
+        if self.check_file(data):
+            self.w, self.mod, self.ph = self.check_data(self.rawdata)
+
+    # change_data: Setter para los datos
+    # Devuelve False si hubo error
+    def change_data(self, data):
+        r = False
+        if self.check_file(data):
+            self.rawdata = data
+            self.w, self.mod, self.ph = self.check_data(self.rawdata)
+            r = True
+        return r
+
+    # check_data: Lee la traza del .raw (ver ltspice.read_raw), el archivo queda mapeado en memoria
+    # Devuelve w, mod, ph en Hz, dB y °
+    def check_data(self, data):
+        path, trace = split_raw_data(data)
+        header, raw = read_raw(path)
+        if header is None:
+            return [], [], []
+        names = header["vars"]
+        if "complex" not in header["flags"] or len(names) < 2:
+            print("El archivo no es de una simulación AC")
+            return [], [], []
+        if trace == "":
+            trace = names[1]
+        elif trace not in names:
+            print("La traza " + trace + " no está en el archivo")
+            return [], [], []
+
+        w = raw[names[0]].real
+        h = raw[trace]
+        offsets = raw_steps(w) if "stepped" in header["flags"] else np.array([0, len(w)])
+        if len(offsets) > 2:
+            n = offsets[1]
+            if np.any(np.diff(offsets) != n):
+                print("Las corridas no tienen la misma cantidad de puntos")
+                return [], [], []
+            w = w.reshape(len(offsets) - 1, n)
+            h = h.reshape(len(offsets) - 1, n)
+            self.type = 4
+        else:
+            self.type = 2
+        self.ph_mode = default_ph_mode(self.type)
+
+        self.w_unit = "Hz"
+        self.mod_unit = "dB"
+        self.ph_unit = "°"
+        return w, 20 * np.log10(np.abs(h)), np.angle(h, deg=True)
+
+    # check_file: Revisa que el archivo exista, que sea .raw y que sea legible
+    # Devuelve False en caso de error
+    def check_file(self, data):
+        r = True
+        path, trace = split_raw_data(data)
+        if not isinstance(path, str) or os.path.splitext(path)[1] != ".raw":
+            print("El archivo de la simulación no está en formato .raw")
+            r = False
+        elif not os.path.isfile(path):
+            print("El archivo " + path + "no existe")
+            r = False
+        elif not os.access(path, os.R_OK):
+            print("El archivo no es legible")
+            r = False
         return r
 ########################################################################################################################
 
@@ -759,10 +1124,67 @@ def get_unit(s):
     return unit
 ########################################################################################################################
 
+########################################################################################################################
+# to_canonical, from_canonical: Convierten un dato de curva de frecuencia ("w", "mod" o "ph") de la unidad unit a la
+# canónica (rad/s, veces, rad) y viceversa. Con cualquier otra unidad (rad/s, veces, rad, None) lo devuelven como está
+# ----------------------------------------------------------------------------------------------------------------------
+def to_canonical(name, values, unit):
+    switch_conversions = {
+        ("w", "Hz"): lambda x: 2 * np.pi * x,
+        ("mod", "dB"): lambda x: np.power(10, x / 20),
+        ("ph", "°"): np.radians,
+    }
+    conversion = switch_conversions.get((name, unit))
+    return values if conversion is None else conversion(values)
+
+
+def from_canonical(name, values, unit):
+    switch_conversions = {
+        ("w", "Hz"): lambda x: x / (2 * np.pi),
+        ("mod", "dB"): lambda x: 20 * np.log10(x),
+        ("ph", "°"): np.degrees,
+    }
+    conversion = switch_conversions.get((name, unit))
+    return values if conversion is None else conversion(values)
+########################################################################################################################
+
+########################################################################################################################
+# wrap_phase: Acomoda la fase para graficarla, sin modificar el arreglo original. Recibe:
+#   - ph: fase (un arreglo, o uno de (corridas, puntos) para los Monte Carlo)
+#   - unit: unidad de la fase ("°" o "rad", con cualquier otra se devuelve como está)
+#   - mode: "wrap" para llevarla a la rama (branch, branch + 360°] (con -180° los valores en (-180°, 180°] quedan como
+#     están), "unwrap" para que cada corrida sea continua y empiece en esa rama, "" para devolverla como está
+#   - branch: límite inferior (abierto) de la rama en grados
+# ----------------------------------------------------------------------------------------------------------------------
+def wrap_phase(ph, unit, mode, branch=-180.0):
+    switch_periods = {"°": 360.0, "rad": 2 * np.pi}
+    period = switch_periods.get(unit)
+    ph = np.asarray(ph)
+    if period is None or ph.size == 0:
+        return ph
+    high = branch * period / 360.0 + period
+    if mode == "wrap":
+        return high - np.mod(high - ph, period)
+    elif mode == "unwrap":
+        ph = np.unwrap(ph, period=period, axis=-1)
+        return ph + period * np.floor((high - ph[..., :1]) / period)
+    return ph
+########################################################################################################################
+
+########################################################################################################################
+# default_ph_mode: Modo de fase por defecto de cada tipo de curva (ver FrecCurve.set_ph_mode). Los Monte Carlo (4) y las
+# envolventes (6) se grafican como están: acomodar cada corrida o cada fila de la envolvente por separado podría
+# mezclarlas. El resto se lleva a la rama (-180°, 180°]
+# ----------------------------------------------------------------------------------------------------------------------
+def default_ph_mode(c_type):
+    switch_ph_modes = {4: "", 6: ""}
+    return switch_ph_modes.get(c_type, "wrap")
+########################################################################################################################
+
 ########################################################################################################################
 # get_ls: Obtiene el linestyle correcto para graficar según el tipo de curva
 def get_ls(type):
-    if type == 2 or type == 1 or type == 4:
+    if type == 2 or type == 1 or type == 4 or type == 6 or type == 7 or type == 8:
         ls = ','
     elif type == 3:
         ls = '.'
@@ -1,6 +1,5 @@
 import matplotlib.pyplot as plt
 import numpy as np
-import sympy as sp
 from frecspace import Frecspace
 from timespace import Timespace
 from calculate_H import draw_H, normalize_H
@@ -23,7 +22,6 @@ f0 = (den[0]/den[-1]) ** (-1 / (len(den)-1)) / (2 * np.pi)
 #GRÁFICOS
 TS = Timespace()        # Crea espacio de curvas de tiempo
 TS.change_title("Prueba Montecarlo")
-# Si tarda es porque el Montecarlo tiene muchos puntos
 TS.add_curve(7, "D:\Documentos\Materias\\22.11 - E1\TP1\Montecarlo_IS.txt", "Simulación de Montecarlo", "silver", "Hz")     # Montecarlo siempre primero así queda al fondo
 TS.set_interval([0, 0.1])
 # FS.add_curve(1, [num, den, [10E2, 10E5, 10000]], "Teórica", "blue")
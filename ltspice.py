@@ -0,0 +1,511 @@
+import mmap
+import os
+import sys
+import threading
+import warnings
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from stats import Envelope
+
+########################################################################################################################
+# ltspice: Lectores de los archivos exportados por LTSpice
+# Trabajan directamente sobre los bytes del archivo: en vez de partir cada línea con split y convertir muestra por
+# muestra, se reemplaza todo lo que no es parte de un número por espacios y se convierte el buffer entero de una vez.
+# ----------------------------------------------------------------------------------------------------------------------
+
+# Tabla de traducción: los bytes que pueden formar parte de un número quedan igual, el resto pasa a ser un espacio
+# (tabs, paréntesis, comas, unidades como dB o °, fines de línea, etc.)
+_NUM_BYTES = b"0123456789+-.eE"
+_NUM_TABLE = bytes(c if c in _NUM_BYTES else ord(" ") for c in range(256))
+
+_STEP = b"Step Information"      # Encabezado de cada corrida en los archivos de Monte Carlo / .step
+
+parse_workers = 1                # Procesos para parsear los Monte Carlo (1: se parsean en el proceso actual)
+shared_lock = threading.Lock()   # Protege el reemplazo de resource_tracker.register en attach_shared
+
+
+########################################################################################################################
+# set_workers: Configura cuántos procesos se usan para parsear los Monte Carlo (read_ac_mc, read_tran_mc)
+#   - workers: cantidad de procesos (0 o None para usar todos los núcleos, 1 para no usar procesos)
+# En Windows el script tiene que estar protegido con if __name__ == "__main__"
+# ----------------------------------------------------------------------------------------------------------------------
+def set_workers(workers=1):
+    global parse_workers
+    parse_workers = workers if workers else os.cpu_count() or 1
+    return
+########################################################################################################################
+
+
+########################################################################################################################
+# parse_numbers: Convierte un bloque de bytes con datos numéricos en un arreglo de cols columnas
+# Devuelve None si no se leyeron exactamente cols números por cada línea de datos del bloque (el bloque no tiene el
+# formato esperado: np.fromstring corta en el primer valor que no entiende, y valores como inf o nan pierden las letras
+# al traducir y se juntan con el siguiente o desaparecen)
+# ----------------------------------------------------------------------------------------------------------------------
+def parse_numbers(block, cols):
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)    # Si corta antes del final se detecta abajo
+            values = np.fromstring(block.translate(_NUM_TABLE), sep=" ")
+    except ValueError:                                              # Las versiones nuevas de numpy ya no avisan
+        return None
+    if len(values) != count_rows(block) * cols:
+        return None
+    return values.reshape(-1, cols)
+########################################################################################################################
+
+########################################################################################################################
+# get_ac_units: Obtiene las unidades de módulo y fase de una línea de datos con formato freq\t(xxxdB,yyy°)
+# Las unidades se decodifican en utf-8 y si falla en latin-1 (LTSpice exporta en cualquiera de los dos)
+# ----------------------------------------------------------------------------------------------------------------------
+def get_ac_units(line):
+    aux = line.split(b"\t")
+    if len(aux) < 2:
+        return "", ""
+    units = []
+    for s in aux[1].strip().strip(b"()").split(b","):
+        i = len(s)
+        while i > 0 and s[i - 1] not in _NUM_BYTES:
+            i -= 1
+        units.append(decode(s[i:]))
+    if len(units) != 2:
+        return "", ""
+    return units[0], units[1]
+########################################################################################################################
+
+########################################################################################################################
+# read_ac: Parsea el txt de una simulación AC de LTSpice (formato freq\t(xxxdB,yyy°)) en una sola pasada
+# Devuelve w, mod, ph, mod_unit, ph_unit (arreglos vacíos si el archivo no tiene el formato adecuado)
+# ----------------------------------------------------------------------------------------------------------------------
+def read_ac(path):
+    with open(path, "rb") as file:
+        file.readline()                         # Header (Freq.\tV(vo))
+        body = file.read()
+
+    first = body[:body.find(b"\n")]
+    mod_unit, ph_unit = get_ac_units(first)
+
+    data = parse_numbers(body, 3)
+    if data is None:
+        print("El archivo no cumple con el formato adecuado")
+        return np.array([]), np.array([]), np.array([]), mod_unit, ph_unit
+
+    w = np.ascontiguousarray(data[:, 0])
+    mod = np.ascontiguousarray(data[:, 1])
+    ph = np.ascontiguousarray(data[:, 2])
+    return w, mod, ph, mod_unit, ph_unit
+########################################################################################################################
+
+########################################################################################################################
+# decode: Decodifica un texto del archivo, primero como utf-8 y si no se puede como latin-1
+# ----------------------------------------------------------------------------------------------------------------------
+def decode(s):
+    try:
+        return s.decode("utf-8")
+    except UnicodeDecodeError:
+        return s.decode("latin-1")
+########################################################################################################################
+
+########################################################################################################################
+# index_runs: Recorre el archivo una sola vez buscando los encabezados "Step Information" de cada corrida
+# Recibe el buffer del archivo (bytes o mmap)
+# Devuelve una lista con los offsets (en bytes) donde empieza y termina el bloque de datos de cada corrida
+# ----------------------------------------------------------------------------------------------------------------------
+def index_runs(buf):
+    heads = []
+    i = buf.find(_STEP)
+    while i != -1:
+        heads.append(i)
+        i = buf.find(_STEP, i + len(_STEP))
+    blocks = []
+    for k in range(len(heads)):
+        start = buf.find(b"\n", heads[k]) + 1
+        end = heads[k + 1] if k + 1 < len(heads) else len(buf)
+        if start == 0:          # El último encabezado no tiene datos
+            start = end
+        blocks.append((start, end))
+    return blocks
+########################################################################################################################
+
+########################################################################################################################
+# map_file: Abre el archivo como memory-map de sólo lectura (no se decodifica nunca el archivo entero)
+# ----------------------------------------------------------------------------------------------------------------------
+def map_file(path):
+    with open(path, "rb") as file:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+########################################################################################################################
+
+########################################################################################################################
+# iter_runs: Generador que convierte de a una las corridas indexadas con index_runs, así nunca está todo el Monte Carlo
+# en memoria a la vez
+# Devuelve (yield) un arreglo de (puntos, cols) por corrida, o None si la corrida no tiene el formato adecuado
+# ----------------------------------------------------------------------------------------------------------------------
+def iter_runs(mm, blocks, cols):
+    for k in range(len(blocks)):
+        start, end = blocks[k]
+        data = parse_numbers(mm[start:end], cols)
+        if data is None:
+            print("La corrida " + str(k + 1) + " no cumple con el formato adecuado")
+        yield data
+########################################################################################################################
+
+########################################################################################################################
+# get_cols: Cantidad de columnas de la línea de datos que empieza en start
+# ----------------------------------------------------------------------------------------------------------------------
+def get_cols(mm, start):
+    return len(mm[start:mm.find(b"\n", start)].split(b"\t"))
+########################################################################################################################
+
+########################################################################################################################
+# count_rows: Cantidad de filas de datos de un bloque (líneas, sin contar las vacías del final)
+# ----------------------------------------------------------------------------------------------------------------------
+def count_rows(block):
+    block = block.rstrip()
+    return block.count(b"\n") + 1 if len(block) != 0 else 0
+########################################################################################################################
+
+########################################################################################################################
+# count_runs: Cuenta las filas de cada corrida de un rango (corre en un proceso aparte, ver read_runs_parallel)
+# Recibe el path y la lista de bloques (start, end) del rango
+# Devuelve la lista con la cantidad de filas de cada corrida
+# ----------------------------------------------------------------------------------------------------------------------
+def count_runs(job):
+    path, blocks = job
+    mm = map_file(path)
+    try:
+        return [count_rows(mm[start:end]) for start, end in blocks]
+    finally:
+        mm.close()
+########################################################################################################################
+
+########################################################################################################################
+# parse_runs: Parsea un rango de corridas y las escribe directamente en el arreglo en memoria compartida (corre en un
+# proceso aparte, ver read_runs_parallel). Recibe:
+#   - path: archivo
+#   - name, shape: nombre y dimensión (columnas, filas totales) de la memoria compartida
+#   - first: índice de la primera corrida del rango
+#   - blocks: bloques (start, end) de las corridas del rango
+#   - offsets: fila donde empieza cada corrida del rango en el arreglo compartido (una más al final)
+# Devuelve la lista de índices de las corridas que no cumplen con el formato (vacía si no hubo errores)
+# ----------------------------------------------------------------------------------------------------------------------
+def parse_runs(job):
+    path, name, shape, first, blocks, offsets = job
+    shm = attach_shared(name)
+    bad = []
+    try:
+        out = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        mm = map_file(path)
+        try:
+            for k in range(len(blocks)):
+                start, end = blocks[k]
+                data = parse_numbers(mm[start:end], shape[0])
+                if data is None or len(data) != offsets[k + 1] - offsets[k]:
+                    bad.append(first + k)
+                    continue
+                out[:, offsets[k]:offsets[k + 1]] = data.T
+        finally:
+            mm.close()
+        del out                     # Si queda alguna referencia al buffer no se puede cerrar la memoria compartida
+    finally:
+        shm.close()
+    return bad
+########################################################################################################################
+
+########################################################################################################################
+# attach_shared: Se conecta a una memoria compartida creada por otro proceso
+# El proceso que la crea es el único que la borra, así que no se registra en el resource_tracker (hasta Python 3.12
+# no se puede pedir con track=False; si se registra, el tracker la borra o avisa que "se perdió" cuando termina el
+# proceso que se conecta, y con fork el tracker es el mismo que el del proceso que la creó)
+# Antes de 3.13 se reemplaza un rato resource_tracker.register, que es global del proceso: shared_lock evita que dos
+# hilos (ej: Curvespace.add_curves) se pisen el reemplazo y dejen instalada la función equivocada. No se usa unregister
+# después de conectarse porque con fork el tracker es el del creador y le borraría su propio registro
+# ----------------------------------------------------------------------------------------------------------------------
+def attach_shared(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    from multiprocessing import resource_tracker
+    with shared_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+########################################################################################################################
+
+########################################################################################################################
+# read_runs_parallel: Parsea las corridas indexadas con index_runs en varios procesos
+# El archivo se reparte en rangos de corridas consecutivas; cada proceso mapea el archivo por su cuenta, así que a los
+# procesos sólo se les pasan offsets y lo único que vuelve son las cantidades de filas y los errores.
+# Primero se cuentan las filas de cada corrida (en paralelo) para saber dónde va cada una, y después cada proceso
+# escribe sus corridas directamente en un arreglo en memoria compartida de (cols, filas totales).
+# Devuelve el arreglo y los offsets de cada corrida (como en read_tran_mc), o None, None si alguna corrida no cumple
+# con el formato
+# ----------------------------------------------------------------------------------------------------------------------
+def read_runs_parallel(path, blocks, cols, workers):
+    ranges = np.array_split(np.arange(len(blocks)), min(len(blocks), 4 * workers))      # Varios rangos por proceso
+    ranges = [(int(r[0]), int(r[-1]) + 1) for r in ranges if len(r) != 0]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rows = []
+        for r in pool.map(count_runs, [(path, blocks[a:b]) for a, b in ranges]):
+            rows += r
+        offsets = np.zeros(len(blocks) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(rows)
+
+        shape = (cols, int(offsets[-1]))
+        shm = shared_memory.SharedMemory(create=True, size=max(1, 8 * shape[0] * shape[1]))
+        try:
+            jobs = [(path, shm.name, shape, a, blocks[a:b], offsets[a:b + 1]) for a, b in ranges]
+            bad = []
+            for r in pool.map(parse_runs, jobs):
+                bad += r
+            data = None
+            if len(bad) == 0:
+                data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    for k in bad:
+        print("La corrida " + str(k + 1) + " no cumple con el formato adecuado")
+    if data is None:
+        return None, None
+    return data, offsets
+########################################################################################################################
+
+########################################################################################################################
+# read_ac_mc: Parsea el txt de una simulación AC de Monte Carlo de LTSpice
+# Indexa las corridas en una pasada y convierte el bloque de cada una directamente en su fila del arreglo
+# Si parse_workers > 1 las corridas se parsean en varios procesos (ver read_runs_parallel)
+# Devuelve w, mod, ph de dimensión (corridas, puntos), mod_unit y ph_unit (arreglos vacíos si hubo error)
+# ----------------------------------------------------------------------------------------------------------------------
+def read_ac_mc(path, workers=None):
+    workers = parse_workers if workers is None else workers
+    mm = map_file(path)
+    try:
+        blocks = index_runs(mm)
+        if len(blocks) == 0:
+            print("El archivo no cumple con el formato adecuado")
+            return np.array([]), np.array([]), np.array([]), "", ""
+        start, end = blocks[0]
+        mod_unit, ph_unit = get_ac_units(mm[start:mm.find(b"\n", start)])
+
+        if workers > 1 and len(blocks) > 1:
+            data, offsets = read_runs_parallel(path, blocks, 3, workers)
+            if data is None or np.any(np.diff(offsets) != offsets[1]):
+                return np.array([]), np.array([]), np.array([]), mod_unit, ph_unit
+            w, mod, ph = data.reshape(3, len(blocks), -1)
+            return w, mod, ph, mod_unit, ph_unit
+
+        w = mod = ph = None
+        k = 0
+        for data in iter_runs(mm, blocks, 3):
+            if data is None or (w is not None and len(data) != w.shape[1]):
+                return np.array([]), np.array([]), np.array([]), mod_unit, ph_unit
+            if w is None:
+                w = np.empty((len(blocks), len(data)))
+                mod = np.empty((len(blocks), len(data)))
+                ph = np.empty((len(blocks), len(data)))
+            w[k], mod[k], ph[k] = data.T
+            k += 1
+    finally:
+        mm.close()
+    return w, mod, ph, mod_unit, ph_unit
+########################################################################################################################
+
+########################################################################################################################
+# read_tran_mc: Parsea el txt de una simulación transitoria de Monte Carlo de LTSpice
+# Acepta 2 formatos: t|y o t|y|x. Cada corrida puede tener distinta cantidad de puntos, así que las corridas se guardan
+# una atrás de otra en un único arreglo por señal y offsets marca dónde empieza cada una (la corrida k es
+# t[offsets[k]:offsets[k + 1]])
+# Si parse_workers > 1 las corridas se parsean en varios procesos (ver read_runs_parallel)
+# Devuelve t, y, x, offsets (x vacío si no hay entrada, todo vacío si hubo error)
+# ----------------------------------------------------------------------------------------------------------------------
+def read_tran_mc(path, workers=None):
+    workers = parse_workers if workers is None else workers
+    mm = map_file(path)
+    try:
+        blocks = index_runs(mm)
+        start, end = blocks[0] if len(blocks) != 0 else (0, 0)
+        cols = get_cols(mm, start)
+
+        if workers > 1 and len(blocks) > 1:
+            data, offsets = read_runs_parallel(path, blocks, cols, workers)
+            if data is None:
+                return np.array([]), np.array([]), np.array([]), np.array([], dtype=np.int64)
+            return data[0], data[1], data[2] if cols == 3 else np.array([]), offsets
+        runs = []
+        for data in iter_runs(mm, blocks, cols):
+            if data is None:
+                return np.array([]), np.array([]), np.array([]), np.array([], dtype=np.int64)
+            runs.append(data)
+    finally:
+        mm.close()
+
+    offsets = np.zeros(len(runs) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(data) for data in runs])
+    t = np.empty(offsets[-1])
+    y = np.empty(offsets[-1])
+    x = np.empty(offsets[-1] if cols == 3 else 0)
+    for k in range(len(runs)):
+        t[offsets[k]:offsets[k + 1]] = runs[k][:, 0]
+        y[offsets[k]:offsets[k + 1]] = runs[k][:, 1]
+        if cols == 3: x[offsets[k]:offsets[k + 1]] = runs[k][:, 2]
+        runs[k] = None
+    return t, y, x, offsets
+########################################################################################################################
+
+########################################################################################################################
+# read_ac_mc_envelope: Calcula la envolvente estadística de una simulación AC de Monte Carlo de LTSpice sin cargar las
+# corridas: se leen de a una y se acumulan en un stats.Envelope
+# Devuelve w (puntos), mod y ph de (filas, puntos) con las filas de stats.Envelope, mod_unit y ph_unit
+# (arreglos vacíos si hubo error)
+# ----------------------------------------------------------------------------------------------------------------------
+def read_ac_mc_envelope(path, percentiles):
+    mm = map_file(path)
+    try:
+        blocks = index_runs(mm)
+        if len(blocks) == 0:
+            print("El archivo no cumple con el formato adecuado")
+            return np.array([]), np.array([]), np.array([]), "", ""
+        start, end = blocks[0]
+        mod_unit, ph_unit = get_ac_units(mm[start:mm.find(b"\n", start)])
+
+        w = None
+        mod = Envelope(percentiles)
+        ph = Envelope(percentiles)
+        for data in iter_runs(mm, blocks, 3):
+            if data is None or (w is not None and len(data) != len(w)):
+                return np.array([]), np.array([]), np.array([]), mod_unit, ph_unit
+            if w is None:
+                w = data[:, 0].copy()
+            mod.add(data[:, 1])
+            ph.add(data[:, 2])
+    finally:
+        mm.close()
+    return w, mod.result(), ph.result(), mod_unit, ph_unit
+########################################################################################################################
+
+########################################################################################################################
+# read_tran_mc_envelope: Calcula la envolvente estadística de una simulación transitoria de Monte Carlo de LTSpice sin
+# cargar las corridas. Como cada corrida tiene su propio paso, todas se interpolan sobre el tiempo de la primera.
+# Devuelve t (puntos) e y de (filas, puntos) con las filas de stats.Envelope (vacíos si hubo error)
+# ----------------------------------------------------------------------------------------------------------------------
+def read_tran_mc_envelope(path, percentiles):
+    mm = map_file(path)
+    try:
+        blocks = index_runs(mm)
+        start, end = blocks[0] if len(blocks) != 0 else (0, 0)
+        t = None
+        y = Envelope(percentiles)
+        for data in iter_runs(mm, blocks, get_cols(mm, start)):
+            if data is None:
+                return np.array([]), np.array([])
+            if t is None:
+                t = data[:, 0].copy()
+                y.add(data[:, 1])
+            else:
+                y.add(np.interp(t, data[:, 0], data[:, 1]))
+    finally:
+        mm.close()
+    if t is None:
+        return np.array([]), np.array([])
+    return t, y.result()
+########################################################################################################################
+
+########################################################################################################################
+# read_raw_header: Decodifica el encabezado de un .raw binario de LTSpice (UTF-16 en LTSpice XVII, ASCII en versiones
+# anteriores)
+# Devuelve un diccionario con plotname, flags, points, vars (lista de nombres) y data (offset del bloque binario)
+# o None si el archivo no es un .raw binario
+# ----------------------------------------------------------------------------------------------------------------------
+def read_raw_header(buf):
+    encoding = "utf-16-le" if buf[1:2] == b"\x00" else "latin-1"
+    marker = "Binary:\n".encode(encoding)
+    end = buf.find(marker)
+    if end == -1:
+        return None
+    header = {"plotname": "", "flags": set(), "points": 0, "vars": [], "data": end + len(marker)}
+    lines = bytes(buf[:end]).decode(encoding).replace("\r", "").split("\n")
+    for i in range(len(lines)):
+        key, _, value = lines[i].partition(":")
+        if key == "Plotname":
+            header["plotname"] = value.strip()
+        elif key == "Flags":
+            header["flags"] = set(value.split())
+        elif key == "No. Points":
+            header["points"] = int(value)
+        elif key == "Variables":
+            for line in lines[i + 1:]:
+                aux = line.split()
+                if len(aux) >= 2:
+                    header["vars"].append(aux[1])
+    return header
+########################################################################################################################
+
+########################################################################################################################
+# read_raw: Abre un .raw binario de LTSpice sin copiar los datos
+# El bloque binario se mapea con np.memmap: en los archivos normales cada punto tiene todas las variables seguidas
+# (dtype estructurado), en los fastaccess cada variable ocupa un bloque contiguo.
+#   - complex: todas las variables son complex128
+#   - real: la variable independiente es float64 y el resto float32 (float64 si tiene el flag double)
+# Devuelve el encabezado y un diccionario nombre -> arreglo (vistas del memmap), o None, None si hubo error
+# ----------------------------------------------------------------------------------------------------------------------
+def read_raw(path):
+    mm = map_file(path)
+    try:
+        header = read_raw_header(mm)
+    finally:
+        mm.close()
+    if header is None or len(header["vars"]) == 0:
+        print("El archivo no es un .raw binario de LTSpice")
+        return None, None
+
+    flags = header["flags"]
+    names = header["vars"]
+    n = header["points"]
+    if "complex" in flags:
+        types = ["<c16"] * len(names)
+    elif "double" in flags:
+        types = ["<f8"] * len(names)
+    else:
+        types = ["<f8"] + ["<f4"] * (len(names) - 1)
+
+    data = {}
+    if "fastaccess" in flags:
+        offset = header["data"]
+        for i in range(len(names)):
+            data[names[i]] = np.memmap(path, dtype=types[i], mode="r", offset=offset, shape=(n,))
+            offset += n * np.dtype(types[i]).itemsize
+    else:
+        points = np.memmap(path, dtype=np.dtype({"names": names, "formats": types}), mode="r",
+                           offset=header["data"], shape=(n,))
+        for i in range(len(names)):
+            data[names[i]] = points[names[i]]
+    return header, data
+########################################################################################################################
+
+########################################################################################################################
+# raw_steps: Obtiene los límites de cada corrida de un .raw con el flag stepped
+# Las corridas se detectan donde la variable independiente (tiempo o frecuencia) vuelve a empezar
+# Devuelve los offsets de las corridas (la corrida k va de offsets[k] a offsets[k + 1])
+# ----------------------------------------------------------------------------------------------------------------------
+def raw_steps(x):
+    bounds = np.flatnonzero(np.diff(x) < 0) + 1
+    return np.concatenate(([0], bounds, [len(x)])).astype(np.int64)
+########################################################################################################################
+
+########################################################################################################################
+# split_raw_data: Separa los datos de una curva .raw en path y traza(s)
+# Recibe el path o un arreglo [path, traza, ...]. Devuelve el path y las trazas ("" si no se especifican)
+# ----------------------------------------------------------------------------------------------------------------------
+def split_raw_data(data, n=1):
+    if isinstance(data, (list, tuple)):
+        traces = list(data[1:n + 1]) + [""] * (n + 1 - len(data))
+        path = data[0] if len(data) != 0 else ""
+    else:
+        traces = [""] * n
+        path = data
+    return (path, *traces)
+########################################################################################################################
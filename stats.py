@@ -0,0 +1,98 @@
+import numpy as np
+
+########################################################################################################################
+# Clase Envelope: Acumula estadísticas punto a punto de un conjunto de corridas que se agregan de a una
+# Para cada punto (frecuencia o tiempo) guarda mínimo, máximo, media y los percentiles pedidos sin guardar las corridas,
+# así la memoria es O(puntos) sin importar cuántas corridas haya.
+# Los percentiles se estiman con el algoritmo P² (Jain & Chlamtac, 1985) vectorizado sobre todos los puntos: por cada
+# percentil se mantienen 5 marcadores (alturas y posiciones) que se ajustan con cada corrida nueva.
+# Si hay 5 corridas o menos los percentiles son exactos.
+# result() devuelve un arreglo de (filas, puntos) con las filas: media, mínimo, máximo y los percentiles en orden
+# ----------------------------------------------------------------------------------------------------------------------
+class Envelope:
+    def __init__(self, percentiles=(5, 95)):
+        self.percentiles = sorted(percentiles)     # Percentiles a estimar (entre 0 y 100)
+        self.count = 0                              # Cantidad de corridas agregadas
+        self.sum = None
+        self.min = None
+        self.max = None
+        self.first = []                             # Primeras 5 corridas, P² arranca con ellas
+        self.q = []                                 # Alturas de los marcadores de cada percentil (5, puntos)
+        self.pos = []                               # Posiciones de los marcadores de cada percentil (5, puntos)
+        self.des = []                               # Posiciones deseadas de los marcadores de cada percentil (5,)
+        self.inc = []                               # Incremento de las posiciones deseadas por corrida (5,)
+
+    # add: Agrega una corrida (arreglo con un valor por punto)
+    def add(self, v):
+        v = np.asarray(v, dtype=np.float64)
+        if self.count == 0:
+            self.sum = v.copy()
+            self.min = v.copy()
+            self.max = v.copy()
+        else:
+            self.sum += v
+            np.minimum(self.min, v, out=self.min)
+            np.maximum(self.max, v, out=self.max)
+        self.count += 1
+
+        if self.count <= 5:
+            self.first.append(v.copy())
+            if self.count == 5:
+                self.start_markers()
+        else:
+            for j in range(len(self.percentiles)):
+                self.update_markers(j, v)
+        return
+
+    # start_markers: Inicializa los marcadores de P² con las primeras 5 corridas
+    def start_markers(self):
+        first = np.sort(np.stack(self.first), axis=0)
+        for percentile in self.percentiles:
+            p = percentile / 100
+            self.q.append(first.copy())
+            self.pos.append(np.tile(np.arange(5.0)[:, None], (1, first.shape[1])))
+            self.des.append(np.array([0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]))
+            self.inc.append(np.array([0.0, p / 2, p, (1 + p) / 2, 1.0]))
+        return
+
+    # update_markers: Ajusta los marcadores del percentil j con una corrida nueva
+    def update_markers(self, j, v):
+        q = self.q[j]
+        pos = self.pos[j]
+
+        # Celda en la que cae cada valor y actualización de los extremos
+        k = np.sum(v >= q[1:4], axis=0)
+        np.minimum(q[0], v, out=q[0])
+        np.maximum(q[4], v, out=q[4])
+        pos += np.arange(5)[:, None] > k
+        self.des[j] += self.inc[j]
+
+        # Los marcadores del medio que quedaron lejos de su posición deseada se mueven un lugar
+        for i in range(1, 4):
+            d = self.des[j][i] - pos[i]
+            up = (d >= 1) & (pos[i + 1] - pos[i] > 1)
+            down = (d <= -1) & (pos[i - 1] - pos[i] < -1)
+            move = up | down
+            if not move.any():
+                continue
+            s = np.where(up, 1.0, -1.0)
+            qp = q[i] + s / (pos[i + 1] - pos[i - 1]) * ((pos[i] - pos[i - 1] + s) * (q[i + 1] - q[i]) / (pos[i + 1] - pos[i])
+                                                         + (pos[i + 1] - pos[i] - s) * (q[i] - q[i - 1]) / (pos[i] - pos[i - 1]))
+            parabolic = (q[i - 1] < qp) & (qp < q[i + 1])
+            qn = np.where(up, q[i + 1], q[i - 1])
+            pn = np.where(up, pos[i + 1], pos[i - 1])
+            ql = q[i] + s * (qn - q[i]) / (pn - pos[i])
+            q[i] = np.where(move, np.where(parabolic, qp, ql), q[i])
+            pos[i] += np.where(move, s, 0.0)
+        return
+
+    # result: Devuelve el arreglo de (3 + percentiles, puntos) con media, mínimo, máximo y los percentiles
+    def result(self):
+        rows = [self.sum / self.count, self.min, self.max]
+        for j in range(len(self.percentiles)):
+            if self.count <= 5:
+                rows.append(np.percentile(np.stack(self.first), self.percentiles[j], axis=0))
+            else:
+                rows.append(self.q[j][2].copy())
+        return np.stack(rows)
+########################################################################################################################
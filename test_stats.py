@@ -0,0 +1,21 @@
+import numpy as np
+from stats import Envelope
+
+
+# Con 5 corridas o menos los percentiles de Envelope tienen que ser los exactos (los de np.percentile), y con más la
+# media, el mínimo y el máximo siguen siendo exactos
+def test_envelope_exact():
+    rng = np.random.default_rng(0)
+    percentiles = (5, 50, 95)
+    for n in range(1, 7):
+        runs = -3 + 0.5 * rng.standard_normal((n, 200))
+        env = Envelope(percentiles)
+        for v in runs:
+            env.add(v)
+        result = env.result()
+        assert result.shape == (3 + len(percentiles), 200)
+        assert np.allclose(result[0], runs.mean(axis=0))
+        assert np.array_equal(result[1], runs.min(axis=0))
+        assert np.array_equal(result[2], runs.max(axis=0))
+        if n <= 5:
+            assert np.allclose(result[3:], np.percentile(runs, percentiles, axis=0))
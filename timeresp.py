@@ -0,0 +1,415 @@
+import numpy as np
+from transfer import cache_get, cache_put, coef_key
+
+########################################################################################################################
+# timeresp: Respuesta temporal de funciones transferencia H(s) = num(s) / den(s) a una entrada x(t)
+# Da lo mismo que ss.lsim (estado inicial nulo), pero en vez de avanzar el estado muestra por muestra en Python:
+#   - Con t uniforme H se discretiza en forma exacta para el paso h (ZOH: la entrada se mantiene constante entre
+#     muestras, FOH: la entrada se interpola linealmente, que es lo que hace lsim) y la salida se calcula con un filtro
+#     IIR (secciones de segundo orden, ss.sosfilt), una sola pasada lineal en C sobre toda la entrada.
+#   - Con t no uniforme se avanza el estado con la discretización de cada paso (las de pasos repetidos se reutilizan).
+# Las discretizaciones se guardan en el cache de transfer por coeficientes, paso y método, así calcular otra entrada
+# con la misma H y el mismo t no vuelve a discretizar.
+# Para el impulso, el escalón y la rampa que arrancan en t = 0 además está la respuesta exacta (closed_response), a
+# partir de los residuos y polos de H, y para entradas periódicas el régimen permanente por FFT (steady_response).
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+########################################################################################################################
+# time_response: Calcula la salida de H para la entrada x en los tiempos t. Recibe:
+#   - num, den: coeficientes de H (el grado del numerador no puede ser mayor que el del denominador)
+#   - x: entrada (un valor por tiempo)
+#   - t: tiempos (crecientes)
+#   - method: "foh" (como ss.lsim) o "zoh"
+# Devuelve la salida y (None si hubo error)
+# ----------------------------------------------------------------------------------------------------------------------
+def time_response(num, den, x, t, method="foh"):
+    x = np.asarray(x, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+    if len(x) != len(t):
+        print("La entrada y el vector de tiempos no tienen el mismo largo")
+        return None
+    if len(t) < 2:
+        return x * 0.0
+    num = np.trim_zeros(np.atleast_1d(np.asarray(num, dtype=np.float64)), "f")
+    den = np.trim_zeros(np.atleast_1d(np.asarray(den, dtype=np.float64)), "f")
+    if len(num) > len(den):
+        print("La función transferencia no es propia, no se puede calcular la respuesta temporal")
+        return None
+    if len(den) == 1:           # H es una constante
+        return x * (num[0] / den[0] if len(num) != 0 else 0.0)
+    h = (t[-1] - t[0]) / (len(t) - 1)
+    if np.allclose(np.diff(t), h, rtol=1E-6, atol=0):
+        return filter_response(num, den, x, h, method)
+    return step_response(num, den, x, t, method)
+########################################################################################################################
+
+########################################################################################################################
+# filter_response: Salida de H para la entrada x con paso uniforme h (filtro IIR con la discretización de H)
+# ----------------------------------------------------------------------------------------------------------------------
+def filter_response(num, den, x, h, method="foh"):
+    r = discretize(num, den, h, method)
+    y = run_filter(r[0], r[1], x)
+    if len(r) > 2 and x[0] != 0:
+        # Con FOH el estado del filtro arranca en -Bd1 x[0] en vez de 0 (ver discretize), se suma su respuesta libre
+        # hasta que se extingue (después el filtro sólo haría cuentas con números desnormalizados, que son lentas)
+        n = min(len(x), int(r[4][0]))
+        impulse = np.zeros(n)
+        impulse[0] = -x[0]
+        y[:n] += run_filter(r[2], r[3], impulse)
+    return y
+########################################################################################################################
+
+########################################################################################################################
+# run_filter: Filtra x con las secciones sos y retrasa la salida delay muestras (ver iir_filter)
+# ----------------------------------------------------------------------------------------------------------------------
+def run_filter(sos, delay, x):
+    import scipy.signal as ss
+    y = ss.sosfilt(np.array(sos), x)        # sosfilt no acepta arreglos de sólo lectura (los del cache)
+    d = int(delay[0])
+    if d > 0:
+        y[d:] = y[:-d].copy()
+        y[:d] = 0.0
+    return y
+########################################################################################################################
+
+########################################################################################################################
+# discretize: Discretización exacta de H para el paso h como filtro IIR (secciones de segundo orden de ss.sosfilt)
+# Con el espacio de estados (A, B, C, D) de H:
+#   - ZOH: x[k+1] = Ad x[k] + Bd u[k]                       con Ad = e^(A h) y Bd = ∫ e^(A τ) B dτ
+#   - FOH: x[k+1] = Ad x[k] + Bd0 u[k] + Bd1 u[k+1]         (como ss.lsim)
+#     Con ξ[k] = x[k] - Bd1 u[k] queda un sistema discreto común (Ad, Ad Bd1 + Bd0, C, D + C Bd1) que arranca en
+#     ξ[0] = -Bd1 u[0], así que además se devuelve el filtro cuya respuesta al impulso es C Ad^k Bd1 (respuesta libre)
+#     y cuántas muestras tarda en caer por debajo de la precisión de un float (todas si H no es estable)
+# Devuelve (sos, retardo) o con FOH (sos, retardo, sos0, retardo0, largo) con los de la respuesta libre (ver iir_filter)
+# ----------------------------------------------------------------------------------------------------------------------
+def discretize(num, den, h, method="foh"):
+    key = (method, coef_key(num), coef_key(den), float(h))
+    r = cache_get(key)
+    if r is not None:
+        return r
+    Ad, Bd0, Bd1, C, D = state_matrices(num, den, h, method)
+    if Bd1 is None:
+        r = iir_filter(Ad, Bd0, C, D)
+    else:
+        rho = np.max(np.abs(np.linalg.eigvals(Ad)))
+        length = np.log(1E-17) / np.log(rho) + Ad.shape[0] + 1 if rho < 1 else np.inf
+        r = iir_filter(Ad, Ad @ Bd1 + Bd0, C, D + C @ Bd1) + iir_filter(Ad, Ad @ Bd1, C, C @ Bd1)
+        r += (np.array([min(length, 2 ** 62)]),)
+    return cache_put(key, r)
+########################################################################################################################
+
+########################################################################################################################
+# iir_filter: Convierte el sistema discreto (A, B, C, D) en secciones de segundo orden
+# Los polos son los autovalores de A y los ceros los de A - B C / D (los polos del sistema inverso), sin pasar por los
+# polinomios de ss.ss2tf: con pasos chicos los polos quedan todos cerca de z = 1 y los coeficientes pierden precisión.
+# Si D = 0 (ej: con ZOH la salida no depende de la entrada actual) se usa que H(z) = z^-1 (C B + C A (zI - A)^-1 B) y
+# se devuelve el retardo en muestras aparte
+# Devuelve sos y el retardo (como arreglo, para el cache)
+# ----------------------------------------------------------------------------------------------------------------------
+def iir_filter(A, B, C, D):
+    import scipy.signal as ss
+    delay = 0
+    d = D[0, 0]
+    while d == 0 and delay < A.shape[0]:
+        C, d = C @ A, (C @ B)[0, 0]
+        delay += 1
+    if d == 0:
+        return np.array([[0.0, 0.0, 0.0, 1.0, 0.0, 0.0]]), np.array([0])
+    return ss.zpk2sos(np.linalg.eigvals(A - B @ C / d), np.linalg.eigvals(A), d), np.array([delay])
+########################################################################################################################
+
+########################################################################################################################
+# state_matrices: Matrices de la discretización de H para el paso h con ZOH o FOH (ver discretize)
+# Devuelve Ad, Bd0, Bd1 (None con ZOH), C, D
+# ----------------------------------------------------------------------------------------------------------------------
+def state_matrices(num, den, h, method="foh"):
+    import scipy.signal as ss
+    from scipy.linalg import expm
+    A, B, C, D = ss.tf2ss(num, den)
+    n = A.shape[0]
+    if method == "zoh":
+        M = np.zeros((n + 1, n + 1))
+        M[:n, :n] = A * h
+        M[:n, n:] = B * h
+        E = expm(M)
+        return E[:n, :n], E[:n, n:], None, C, D
+    M = np.zeros((n + 2, n + 2))
+    M[:n, :n] = A * h
+    M[:n, n:n + 1] = B * h
+    M[n, n + 1] = 1.0
+    E = expm(M)
+    Bd1 = E[:n, n + 1:]
+    return E[:n, :n], E[:n, n:n + 1] - Bd1, Bd1, C, D
+########################################################################################################################
+
+########################################################################################################################
+# step_response: Salida de H para la entrada x con t no uniforme, avanzando el estado paso a paso
+# Las matrices de cada paso distinto se calculan una sola vez (los pasos se comparan redondeados a 9 cifras)
+# ----------------------------------------------------------------------------------------------------------------------
+def step_response(num, den, x, t, method="foh"):
+    steps = np.diff(t)
+    keys = np.round(steps / np.max(np.abs(steps)), 9)
+    matrices = {}
+    Ad, Bd0, Bd1, C, D = state_matrices(num, den, steps[0], method)
+    state = np.zeros(Ad.shape[0])
+    y = np.empty(len(t))
+    y[0] = D[0, 0] * x[0]
+    for k in range(len(steps)):
+        m = matrices.get(keys[k])
+        if m is None:
+            m = matrices[keys[k]] = state_matrices(num, den, steps[k], method)
+        Ad, Bd0, Bd1 = m[0], m[1][:, 0], m[2]
+        state = Ad @ state + Bd0 * x[k]
+        if Bd1 is not None:
+            state += Bd1[:, 0] * x[k + 1]
+        y[k + 1] = C[0] @ state + D[0, 0] * x[k + 1]
+    return y
+########################################################################################################################
+
+########################################################################################################################
+# closed_response: Respuesta exacta de H a la entrada t^k / k! (k = 0: impulso, 1: escalón, 2: rampa) que arranca en
+# t = 0, en los tiempos t (pueden ser no uniformes). Recibe:
+#   - num, den: coeficientes de H
+#   - t: tiempos (y = 0 para t < 0)
+#   - k: potencia de s en la transformada de la entrada (X(s) = 1 / s^k)
+# Y(s) = H(s) / s^k se separa en fracciones simples (ver partial_fractions) y y(t) es la suma de los términos
+# r t^(m-1) / (m-1)! e^(p t), sin paso de tiempo: el costo es O(puntos * orden). Los términos directos de la
+# separación (el δ(t) de la respuesta al impulso si H no es estrictamente propia) no se pueden graficar y se ignoran
+# Devuelve la salida y (None si hubo error)
+# ----------------------------------------------------------------------------------------------------------------------
+def closed_response(num, den, t, k=1):
+    t = np.asarray(t, dtype=np.float64)
+    r = partial_fractions(num, den, k)
+    if r is None:
+        return None
+    residues, poles, powers = r
+    y = np.zeros(len(t), dtype=np.complex128)
+    tp = np.maximum(t, 0.0)
+    for i in range(len(poles)):
+        term = residues[i] * np.exp(poles[i] * tp)
+        if powers[i] > 1:
+            term *= tp ** (powers[i] - 1) / np.prod(np.arange(1.0, powers[i]))
+        y += term
+    y = y.real
+    y[t < 0] = 0.0
+    return y
+########################################################################################################################
+
+########################################################################################################################
+# partial_fractions: Separa H(s) / s^k en fracciones simples con ss.residue (se guarda en el cache de transfer,
+# así se calcula una sola vez por H)
+# Devuelve los residuos, los polos y la potencia de cada término r / (s - p)^m (None si H no es propia)
+# ----------------------------------------------------------------------------------------------------------------------
+def partial_fractions(num, den, k=1):
+    num = np.trim_zeros(np.atleast_1d(np.asarray(num, dtype=np.float64)), "f")
+    den = np.trim_zeros(np.atleast_1d(np.asarray(den, dtype=np.float64)), "f")
+    if len(num) > len(den):
+        print("La función transferencia no es propia, no se puede calcular la respuesta temporal")
+        return None
+    key = ("residue", coef_key(num), coef_key(den), k)
+    r = cache_get(key)
+    if r is not None:
+        return r
+    import scipy.signal as ss
+    residues, poles, direct = ss.residue(num, np.concatenate((den, np.zeros(k))))
+    powers = np.ones(len(poles), dtype=np.int64)
+    for i in range(1, len(poles)):      # ss.residue devuelve los polos repetidos juntos y con potencias crecientes
+        if poles[i] == poles[i - 1]:
+            powers[i] = powers[i - 1] + 1
+    return cache_put(key, (residues.astype(np.complex128), poles.astype(np.complex128), powers))
+########################################################################################################################
+
+########################################################################################################################
+# steady_response: Régimen permanente de H para una entrada periódica, sin simular el transitorio. Recibe:
+#   - num, den: coeficientes de H (tiene que ser estable)
+#   - fun: función fun(t) que devuelve la entrada en los tiempos t
+#   - T: período de la entrada
+#   - t: tiempos en los que se quiere la salida (pueden ser muchos períodos o no uniformes)
+#   - method: como en time_response
+# Se calcula un solo período con periodic_response y se repite sobre t: si t es uniforme y el período tiene un número
+# entero de pasos se toma el período sobre la misma grilla y se repite tal cual, si no se toma con al menos 1024
+# puntos y se interpola. El costo es O(P log P) por el período más O(puntos) para repetirlo
+# Devuelve la salida y (None si H no tiene régimen permanente)
+# ----------------------------------------------------------------------------------------------------------------------
+def steady_response(num, den, fun, T, t, method="foh"):
+    t = np.asarray(t, dtype=np.float64)
+    num = np.trim_zeros(np.atleast_1d(np.asarray(num, dtype=np.float64)), "f")
+    den = np.trim_zeros(np.atleast_1d(np.asarray(den, dtype=np.float64)), "f")
+    if len(num) > len(den):
+        print("La función transferencia no es propia, no se puede calcular la respuesta temporal")
+        return None
+    if len(den) > 1 and np.max(np.roots(den).real) >= 0:
+        print("La función transferencia no es estable, no tiene régimen permanente")
+        return None
+    h = (t[-1] - t[0]) / (len(t) - 1) if len(t) > 1 else T
+    P = T / h
+    if np.allclose(np.diff(t), h, rtol=1E-6, atol=0) and abs(P - round(P)) < 1E-6 * P and round(P) >= 2:
+        P = round(P)
+        y = periodic_response(num, den, fun(t[0] + np.arange(P) * h), T, method)
+        return y[np.arange(len(t)) % P]
+    P = max(1024, 2 ** int(np.ceil(np.log2(P))))
+    tp = np.arange(P) * (T / P)
+    y = periodic_response(num, den, fun(t[0] + tp), T, method)
+    return np.interp(t - t[0], tp, y, period=T)
+########################################################################################################################
+
+########################################################################################################################
+# periodic_response: Salida en régimen permanente de H para un período de la entrada
+# x son P muestras equiespaciadas de un período T: se pasa a frecuencia con la FFT, cada armónico k se multiplica por
+# la respuesta en frecuencia de H discretizada con el paso T / P (ver discretize) y se vuelve con la FFT inversa.
+# Usar la discretización en vez de H(j k 2π / T) da el régimen permanente exacto de la entrada interpolada entre
+# muestras como en time_response: con H(jω) una entrada discontinua (ej: el tren de pulsos) tendría aliasing y
+# oscilaciones de Gibbs en los flancos. Para una senoide las dos coinciden salvo por O((ωh)²)
+# ----------------------------------------------------------------------------------------------------------------------
+def periodic_response(num, den, x, T, method="foh"):
+    P = len(x)
+    if len(den) == 1:           # H es una constante
+        return x * (num[0] / den[0] if len(num) != 0 else 0.0)
+    r = discretize(num, den, T / P, method)
+    X = np.fft.rfft(x)
+    X *= sos_response(r[0], r[1], 2 * np.pi / P * np.arange(len(X)))
+    return np.fft.irfft(X, n=P)
+########################################################################################################################
+
+########################################################################################################################
+# sos_response: Respuesta en frecuencia de un filtro de secciones de segundo orden con retardo (ver iir_filter) en las
+# frecuencias digitales wd (rad/muestra)
+# ----------------------------------------------------------------------------------------------------------------------
+def sos_response(sos, delay, wd):
+    z1 = np.exp(-1j * wd)       # z^-1
+    z2 = z1 * z1
+    H = z1 ** int(delay[0])
+    for b0, b1, b2, a0, a1, a2 in sos:
+        H *= (b0 + b1 * z1 + b2 * z2) / (a0 + a1 * z1 + a2 * z2)
+    return H
+########################################################################################################################
+
+########################################################################################################################
+# stream_response: Respuesta de H por partes, para simulaciones que no entran en memoria (ej: 10 minutos a 1 MHz)
+# Recibe:
+#   - num, den: coeficientes de H
+#   - fun: función fun(t) que devuelve la entrada en los tiempos t (ver los estímulos de timespace)
+#   - t0, tf, h: tiempo inicial, final y paso
+#   - chunk: muestras por parte
+#   - method: como en time_response
+# Es un generador que devuelve tuplas (t, x, y) de chunk muestras (la última puede ser más corta). Cada parte se
+# filtra como en filter_response pero el estado del filtro pasa de una parte a la otra (ver StreamFilter), así que el
+# resultado es el mismo que con todo el intervalo junto y la memoria depende sólo de chunk. Los tiempos se calculan
+# como t0 + k h, sin acumular error de redondeo
+# ----------------------------------------------------------------------------------------------------------------------
+def stream_response(num, den, fun, t0, tf, h, chunk=65536, method="foh"):
+    num = np.trim_zeros(np.atleast_1d(np.asarray(num, dtype=np.float64)), "f")
+    den = np.trim_zeros(np.atleast_1d(np.asarray(den, dtype=np.float64)), "f")
+    if len(num) > len(den):
+        print("La función transferencia no es propia, no se puede calcular la respuesta temporal")
+        return
+    n = int(np.floor((tf - t0) / h + 1E-9)) + 1
+    r = discretize(num, den, h, method) if len(den) > 1 else None
+    main = StreamFilter(r[0], r[1]) if r is not None else None
+    free = StreamFilter(r[2], r[3]) if r is not None and len(r) > 2 else None
+    length = int(r[4][0]) if free is not None else 0
+    x0 = None
+    for a in range(0, n, chunk):
+        t = t0 + np.arange(a, min(n, a + chunk)) * h
+        x = np.asarray(fun(t), dtype=np.float64)
+        if main is None:            # H es una constante
+            y = x * (num[0] / den[0] if len(num) != 0 else 0.0)
+        else:
+            y = main.process(x)
+            if x0 is None:
+                x0 = x[0]
+            if free is not None and x0 != 0 and a < length:
+                impulse = np.zeros(min(len(x), length - a))
+                if a == 0:
+                    impulse[0] = -x0
+                y[:len(impulse)] += free.process(impulse)
+        yield t, x, y
+    return
+########################################################################################################################
+
+########################################################################################################################
+# Clase StreamFilter: Filtro de secciones de segundo orden con retardo (ver iir_filter) que se aplica por partes
+# Guarda el estado de ss.sosfilt y las últimas salidas que quedaron retrasadas para la parte siguiente
+# ----------------------------------------------------------------------------------------------------------------------
+class StreamFilter:
+    def __init__(self, sos, delay):
+        self.sos = np.array(sos)                    # Copia, sosfilt no acepta los arreglos de sólo lectura del cache
+        self.zi = np.zeros((len(self.sos), 2))      # Estado de cada sección
+        self.tail = np.zeros(int(delay[0]))         # Salidas retrasadas que todavía no se devolvieron
+
+    # process: Filtra la parte x y devuelve la salida (del mismo largo)
+    def process(self, x):
+        import scipy.signal as ss
+        y, self.zi = ss.sosfilt(self.sos, x, zi=self.zi)
+        if len(self.tail) != 0:
+            y = np.concatenate((self.tail, y))
+            self.tail = y[len(x):].copy()
+            y = y[:len(x)]
+        return y
+########################################################################################################################
+
+########################################################################################################################
+# Consumidores de stream_response: procesan las partes a medida que llegan sin guardar la señal completa
+# ----------------------------------------------------------------------------------------------------------------------
+# stream_decimate: Reduce la señal a bins intervalos guardando el mínimo y el máximo de cada uno (en el orden en que
+# aparecen, así al graficarlos se ve la misma envolvente que con todas las muestras). Recibe las partes y la cantidad
+# total de muestras n
+# Devuelve t, x, y de 2 bins puntos (x e y se reducen por separado, t es el de las muestras de y), vacíos si no hubo
+# partes
+def stream_decimate(chunks, n, bins=4000):
+    bins = max(1, min(bins, n))
+    ty = np.full((2, bins), np.nan)
+    y = np.stack((np.full(bins, np.inf), np.full(bins, -np.inf)))
+    ky = np.zeros((2, bins), dtype=np.int64)                        # Índice de cada extremo (para ordenarlos)
+    x = np.stack((np.full(bins, np.inf), np.full(bins, -np.inf)))
+    a = 0
+    for t, xc, yc in chunks:
+        k = np.arange(a, a + len(t))
+        b = k * bins // n                                           # Intervalo de cada muestra
+        starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+        ids = b[starts]
+        for row, reduce, better in [(0, np.minimum, np.less), (1, np.maximum, np.greater)]:
+            x[row, ids] = reduce(x[row, ids], reduce.reduceat(xc, starts))
+            extreme = reduce.reduceat(yc, starts)
+            hits = np.flatnonzero(yc == np.repeat(extreme, np.diff(np.r_[starts, len(yc)])))
+            arg = hits[np.unique(b[hits], return_index=True)[1]]      # Primera muestra con el extremo de cada intervalo
+            new = better(yc[arg], y[row, ids])
+            y[row, ids[new]] = yc[arg[new]]
+            ty[row, ids[new]] = t[arg[new]]
+            ky[row, ids[new]] = k[arg[new]]
+        a += len(t)
+    if a == 0:                                                      # No hubo partes (ej: H no propia)
+        return np.array([]), np.array([]), np.array([])
+    order = np.argsort(ky, axis=0, kind="stable")                  # Mínimo y máximo de cada intervalo en orden
+    y = np.take_along_axis(y, order, axis=0)
+    ty = np.take_along_axis(ty, order, axis=0)
+    return ty.T.ravel(), x.T.ravel(), y.T.ravel()
+# ----------------------------------------------------------------------------------------------------------------------
+# stream_stats: Devuelve un diccionario con la cantidad de muestras y el mínimo, máximo, media y valor eficaz de y
+def stream_stats(chunks):
+    n, total, squares = 0, 0.0, 0.0
+    lo, hi = np.inf, -np.inf
+    for t, x, y in chunks:
+        n += len(y)
+        total += np.sum(y)
+        squares += np.dot(y, y)
+        lo = min(lo, np.min(y))
+        hi = max(hi, np.max(y))
+    return {"n": n, "min": float(lo), "max": float(hi), "mean": float(total / max(n, 1)),
+            "rms": float(np.sqrt(squares / max(n, 1)))}
+# ----------------------------------------------------------------------------------------------------------------------
+# stream_write: Guarda las partes en un .npy de (n, 3) con columnas t, x, y (se escribe mapeado en memoria, así que
+# nunca se tiene el archivo entero en RAM). Recibe las partes, el path y la cantidad total de muestras n
+def stream_write(chunks, path, n):
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=(n, 3))
+    a = 0
+    for t, x, y in chunks:
+        out[a:a + len(t), 0] = t
+        out[a:a + len(t), 1] = x
+        out[a:a + len(t), 2] = y
+        a += len(t)
+    out.flush()
+    del out
+    return a
+########################################################################################################################
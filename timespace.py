@@ -1,8 +1,9 @@
 import numpy as np
-import scipy.signal as ss
 import os
-from matplotlib.lines import Line2D
-from curvespace import Curvespace, Curve
+from curvespace import Curvespace, Curve, plot_runs, plot_envelope, plot_lod, set_lod_data, switch_colors
+from cache import cached
+from timeresp import time_response, closed_response, steady_response, stream_response, stream_decimate
+from ltspice import read_tran_mc, read_tran_mc_envelope, read_raw, raw_steps, split_raw_data
 
 ########################################################################################################################
 # Calse Timespace: Contiene la lista de curvas de tiempo y métodos para modificarla
@@ -41,8 +42,6 @@ class Timespace(Curvespace):
                 if self.check_name(name):
                     print("Se tomará como nombre: " + name)
                     break
-        # SWITCH DE COLORES
-        switch_colors = ["blue", "orange", "green", "red", "cyan", "magenta", "gold", "violet"]
         if color == "":# and c_type != 4:
             color = switch_colors[len(self.curves) % 8]
             print("Para la curva", name, "se tomará el color: " + color)
@@ -51,18 +50,19 @@ class Timespace(Curvespace):
             self.simulada(c_type, data, name, color, t_unit, y_unit, x_unit)
         elif c_type == 7:
             self.mc(c_type, data, name, color, t_unit, y_unit, x_unit)
-        elif 1 <= c_type <= 6:
+        elif c_type == 8:
+            self.raw(c_type, data, name, color, t_unit, y_unit, x_unit)
+        elif c_type == 9:
+            self.mc_env(c_type, data, name, color, t_unit, y_unit, x_unit)
+        elif c_type in switch_rta_types:
             self.teorica(c_type, data, name, color, t_unit, y_unit, x_unit)
 
     # plot_time: grafica la curvas de respuesta temporal, si alguna da error deja de ser visible
+    # Si ya se graficó en ax sólo actualiza lo que cambió (ver Curvespace.draw_curves y refresh)
     def plot_time(self, ax, graphx=False):
         self.fix_units()
-        h = []
-        for i in range(len(self.curves)):
-            if self.curves[i].visibility:
-                if self.curves[i].plot_timecurve(ax, graphx):  # Grafico fase
-                    h.append(Line2D([], [], color=self.curves[i].color, label=self.curves[i].name))
-                else: self.curves[i].visibility = False
+        h = self.draw_curves(ax, lambda c: c.plot_timecurve(ax, graphx), lambda c, a: c.update_timecurve(a, graphx),
+                             lambda c: (c.t, c.y, c.x) if graphx else (c.t, c.y))
 
         if self.t0 != None and self.tf != None: ax.set_xlim([self.t0, self.tf])
         elif self.t0 != None:
@@ -78,11 +78,12 @@ class Timespace(Curvespace):
                     tf = self.curves[i].t[0]
             ax.set_xlim([t0, self.tf])
 
-        ax.legend(handles=h)
+        self.draw_legend(ax, h)
         ax.set_title(self.title)
         ax.set_xlabel(self.t_label + " $\\left [" + self.t_unit + "\\right ]$")
         ax.set_ylabel(self.y_label + " $\\left [" + self.y_unit + "\\right ]$")
-        ax.grid()
+        ax.grid(True)
+        self.refresh(ax)
         return
 
     def set_t0(self, t0):
@@ -184,11 +185,18 @@ class Timespace(Curvespace):
             r = True
         return r
 
+    # get_curve: Devuelve la clase y los argumentos para crear una curva del tipo c_type (ver Curvespace.add_curves)
+    # Igual que en add_curve las curvas se crean siempre en s y V
+    def get_curve(self, c_type, data, name, color, t_unit="s", y_unit="V", x_unit="V"):
+        switch_classes = {0: tSim, 7: tMC, 8: tRaw, 9: tMCEnv}
+        cls = tTeo if c_type in switch_rta_types else switch_classes.get(c_type)
+        return cls, (c_type, data, name, color, "s", "V", "V")
+
     def simulada(self, r_type, data, name, color, t_unit="s", y_unit="V", x_unit="V"):
         # print("simulada")
         r = True
         s = tSim(0, data, name, color, t_unit="s", y_unit="V", x_unit="V")
-        if s.t != [] and s.y != []:
+        if s.is_valid():
             self.curves.append(s)
         else:
             print("Los datos ingresados no son válidos")
@@ -199,7 +207,7 @@ class Timespace(Curvespace):
         # print("teorica")
         r = True
         s = tTeo(r_type, data, name, color, t_unit="s", y_unit="V", x_unit="V")
-        if s.t != [] and s.y != [] and s.x != []:
+        if s.is_valid():
             self.curves.append(s)
         else:
             print("Los datos ingresados no son válidos")
@@ -210,7 +218,29 @@ class Timespace(Curvespace):
         # print("simulada")
         r = True
         s = tMC(7, data, name, color, t_unit="s", y_unit="V", x_unit="V")
-        if s.t != [] and s.y != []:
+        if s.is_valid():
+            self.curves.append(s)
+        else:
+            print("Los datos ingresados no son válidos")
+            r = False
+        return r
+
+    def mc_env(self, r_type, data, name, color, t_unit="s", y_unit="V", x_unit="V"):
+        # print("envolvente")
+        r = True
+        s = tMCEnv(9, data, name, color, t_unit="s", y_unit="V", x_unit="V")
+        if s.is_valid():
+            self.curves.append(s)
+        else:
+            print("Los datos ingresados no son válidos")
+            r = False
+        return r
+
+    def raw(self, r_type, data, name, color, t_unit="s", y_unit="V", x_unit="V"):
+        # print("raw")
+        r = True
+        s = tRaw(8, data, name, color, t_unit="s", y_unit="V", x_unit="V")
+        if s.is_valid():
             self.curves.append(s)
         else:
             print("Los datos ingresados no son válidos")
@@ -227,6 +257,10 @@ class Timespace(Curvespace):
 #                     - 4 si es respuesta al impulso (teórica)
 #                     - 5 si es respuesta a la rampa (teórica)
 #                     - 6 si es respuesta a la exponencial (teórica)
+#                     (se pueden agregar otras entradas con add_stimulus)
+#                     - 7 si es monte carlo (LTSpice)
+#                     - 8 si es un .raw binario de LTSpice (una vez leído queda como 0 o 7 según tenga una o varias corridas)
+#                     - 9 si es la envolvente estadística de un monte carlo (LTSpice)
 #    - Raw Data: Dependerá del tipo de curva, será el path del archivo si es simulada o datos si es teórica (mirar casos)
 #    - Nombre: Si no se especifica, se le asignará uno según el orden
 #    - Color: Se permitirá elegir el color de la curva, si no se especifica se tomará naranja
@@ -245,23 +279,51 @@ class Timecurve(Curve):
         self.t = []
         self.y = []
         self.x = []
+        self.offsets = []       # Sólo Monte Carlo: la corrida k va de offsets[k] a offsets[k + 1] en t, y, x
         self.t_unit = t_unit    # Unidad del tiempo, se asume s
         self.y_unit = y_unit    # Unidad de la señal de salida, se asume V
         self.x_unit = x_unit    # Unidad de la señal de entrada, se asume V
 
+    # is_valid: Devuelve True si la curva se pudo cargar
+    def is_valid(self):
+        return self.y is not None and len(self.t) != 0 and len(self.y) != 0
+
     # plot_timecurve: Grafica la curva en el tiempo
     # Próximamente: Si se especifica graphx = True, grafica la entrada superpuesta con la salida
     def plot_timecurve(self, ax, graphx=False):
         if graphx:
-            if self.x != []:
-                ax.plot(self.t, self.x, label="Entrada " + self.name, color="orange")
-        if self.type != 7:
-            ax.plot(self.t, self.y, self.color, label=self.name)       # Grafico la funcion en el tiempo
+            if len(self.x) != 0:
+                plot_lod(ax, self.t, self.x, label="Entrada " + self.name, color="orange")
+        if self.type == 9:
+            plot_envelope(ax, self.t, self.y, self.color, self.percentiles, label=self.name)     # Envolvente
+        elif self.type != 7:
+            plot_lod(ax, self.t, self.y, self.color, label=self.name)       # Grafico la funcion en el tiempo
         else:
-            for i in range(len(self.t)):
-                ax.plot(self.t[i], self.y[i], self.color, label=self.name)
+            plot_runs(ax, self.t, self.y, self.color, self.offsets, label=self.name)     # Todas las corridas juntas
         return True
 
+    # update_timecurve: Pasa los datos actuales a los artistas que graficó plot_timecurve sin volver a graficar
+    # Devuelve False si no se puede (Monte Carlo o envolvente)
+    def update_timecurve(self, artists, graphx=False):
+        values = [self.x] if graphx and len(self.x) != 0 else []
+        if self.type == 7 or self.type == 9 or len(artists) != len(values) + 1:
+            return False
+        for line, v in zip(artists, values + [self.y]):
+            if not set_lod_data(line, self.t, v):
+                return False
+        return True
+
+    # get_runs: Devuelve la cantidad de corridas (1 si no es Monte Carlo)
+    def get_runs(self):
+        return len(self.offsets) - 1 if len(self.offsets) != 0 else 1
+
+    # get_run: Devuelve t, y, x de la corrida k (vistas de los arreglos de la curva, no copia nada)
+    def get_run(self, k):
+        if len(self.offsets) == 0:
+            return self.t, self.y, self.x
+        i, j = self.offsets[k], self.offsets[k + 1]
+        return self.t[i:j], self.y[i:j], self.x[i:j]
+
     # change_t_unit: Cambia la unidad del tiempo de s a min o viceversa
     # Devuelve False en caso de error
     def change_t_unit(self, unit=""):
@@ -371,10 +433,14 @@ class tSim(Timecurve):
             r = True
         return r
 
-    # check_data: Parsea el txt de la simulación de LTSpice
+    # check_data: Parsea el txt de la simulación de LTSpice, o lo lee del cache si ya se leyó y no cambió
+    def check_data(self, path):
+        return cached("tsim", path, self.parse_file)
+
+    # parse_file: Parsea el txt de la simulación de LTSpice
     # Acepta 2 formatos: t|y o t|y|x
     # Devuelve t, y, x con x = zeros dependiendo del caso
-    def check_data(self, path):
+    def parse_file(self, path):
         file = open(path, "r")
         file.readline()
         aux = file.readline().split("\t")
@@ -428,7 +494,8 @@ class tSim(Timecurve):
 
 ########################################################################################################################
 # Clase tMC: Simulación de Monte Carlo, hija de la clase Timecurve
-# Tiene unos parámetros extra: - Mentira por ahora no tiene
+# Las corridas pueden tener distinta cantidad de puntos: t, y, x tienen todas las corridas una atrás de otra y offsets
+# marca dónde empieza cada una (ver Timecurve.get_run)
 # ----------------------------------------------------------------------------------------------------------------------
 class tMC(Timecurve):
     def __init__(self, c_type, data, name="", color="", t_unit="s", y_unit="V", x_unit="V"):
@@ -448,39 +515,11 @@ class tMC(Timecurve):
 
     # check_data: Parsea el txt de la simulación de Montecarlo de LTSpice
     # Acepta 2 formatos: t|y o t|y|x
-    # Devuelve t, y, x con x = zeros dependiendo del caso
+    # Indexa las corridas en una pasada sobre el archivo mapeado en memoria (ver ltspice.read_tran_mc), o las lee del
+    # cache si ya se leyó y no cambió
+    # Devuelve t, y, x con todas las corridas una atrás de otra (x vacío dependiendo del caso) y actualiza offsets
     def check_data(self, path):
-        file = open(path, "r")
-        file.readline()
-        aux = file.readline()
-        j1 = aux.find("/")
-        j2 = aux.find(")")
-        runs = int(aux[j1 + 1: j2])
-
-        aux = file.readline().split("\t")
-        n = len(aux)
-        file.close()
-
-        t = []
-        y = []
-        x = []
-
-        l = open(path, "r")
-
-        l.readline()
-        aux = l.readline()
-        for k in range(runs - 1):
-            t.append([])
-            y.append([])
-            x.append([])
-            aux = l.readline().split("\t")
-            while aux[0].find('Run') == -1:
-                t[k].append(float(aux[0]))
-                y[k].append(float(aux[1]))
-                if n == 3: x[k].append(float(aux[2]))
-                aux = l.readline().split("\t")
-        l.close()
-
+        t, y, x, self.offsets = cached("tran_mc", path, read_tran_mc)
         return t, y, x
 
     # check_file: Revisa que el archivo exista, que sea .txt y que tenga el formato adecuado
@@ -512,26 +551,151 @@ class tMC(Timecurve):
 
 
 
+########################################################################################################################
+# Clase tMCEnv: Envolvente estadística de una simulación de Monte Carlo, hija de la clase tMC
+# En data recibe el path al txt o un arreglo [path, percentiles] (por defecto los percentiles 5 y 95)
+# Las corridas se leen de a una, se interpolan sobre el tiempo de la primera y sólo se guardan las estadísticas
+# (ver stats.Envelope). t tiene un valor por punto, y es de (filas, puntos) con las filas: media, mínimo, máximo y los
+# percentiles en orden (ver get_stat) y x queda vacío
+# ----------------------------------------------------------------------------------------------------------------------
+class tMCEnv(tMC):
+    def __init__(self, c_type, data, name="", color="", t_unit="s", y_unit="V", x_unit="V"):
+        Timecurve.__init__(self, 9, data, name, color, t_unit, y_unit, x_unit)
+        self.percentiles = [5, 95]
+        if self.check_file(data):
+            self.t, self.y, self.x = self.check_data(data)
+
+    # check_data: Lee el Monte Carlo calculando la envolvente (ver ltspice.read_tran_mc_envelope), o la lee del cache
+    # si ya se calculó y el archivo no cambió
+    # Devuelve t, y, x
+    def check_data(self, data):
+        path, percentiles = (data[0], data[1]) if isinstance(data, (list, tuple)) else (data, [5, 95])
+        self.percentiles = sorted(percentiles)
+        t, y = cached("tran_mc_env" + str(self.percentiles), path, lambda p: read_tran_mc_envelope(p, self.percentiles))
+        return t, y, np.array([])
+
+    # check_file: Revisa el archivo igual que tMC
+    def check_file(self, data):
+        path = data[0] if isinstance(data, (list, tuple)) else data
+        return super().check_file(path)
+
+    # get_stat: Devuelve t, y de una estadística: "mean", "min", "max" o uno de los percentiles
+    def get_stat(self, stat):
+        i = {"mean": 0, "min": 1, "max": 2}.get(stat)
+        if i is None:
+            i = 3 + self.percentiles.index(stat)
+        return self.t, self.y[i]
+########################################################################################################################
+
+########################################################################################################################
+# Clase tRaw: Simulación transitoria leída directamente del .raw binario de LTSpice, hija de la clase Timecurve
+# En data recibe el path al .raw o un arreglo [path, traza de salida, traza de entrada]
+# Si no se especifica la salida se toma la primera traza, si no se especifica la entrada x queda vacío
+# Si el .raw tiene varias corridas (Monte Carlo o .step) queda como tipo 7 (con las corridas una atrás de otra, ver tMC),
+# si no como tipo 0
+# ----------------------------------------------------------------------------------------------------------------------
+class tRaw(Timecurve):
+    def __init__(self, c_type, data, name="", color="", t_unit="s", y_unit="V", x_unit="V"):
+        super().__init__(8, data, name, color, t_unit, y_unit, x_unit)
+        if self.check_file(data):
+            self.t, self.y, self.x = self.check_data(data)
+
+    # change_data: Revisa la validez de los datos nuevos.
+    # Devuelve False si hubo error.
+    def change_data(self, data):
+        r = False
+        if self.check_file(data):
+            self.rawdata = data
+            self.t, self.y, self.x = self.check_data(self.rawdata)
+            r = True
+        return r
+
+    # check_data: Lee las trazas del .raw (ver ltspice.read_raw), el archivo queda mapeado en memoria
+    # Devuelve t, y, x
+    def check_data(self, data):
+        path, y_trace, x_trace = split_raw_data(data, 2)
+        header, raw = read_raw(path)
+        if header is None:
+            return [], [], []
+        names = header["vars"]
+        if "complex" in header["flags"] or len(names) < 2 or names[0] != "time":
+            print("El archivo no es de una simulación transitoria")
+            return [], [], []
+        if y_trace == "":
+            y_trace = names[1]
+        for trace in (y_trace, x_trace):
+            if trace != "" and trace not in names:
+                print("La traza " + trace + " no está en el archivo")
+                return [], [], []
+
+        t = np.abs(raw["time"])         # LTSpice usa el signo del tiempo como marca interna
+        y = raw[y_trace]
+        x = raw[x_trace] if x_trace != "" else np.array([])
+        self.t_unit = "s"
+        self.y_unit = "V"
+        self.x_unit = "V"
+        if "stepped" not in header["flags"]:
+            self.type = 0
+            self.offsets = []
+            return t, y, x
+        self.type = 7
+        self.offsets = raw_steps(t)
+        return t, y, x
+
+    # check_file: Revisa que el archivo exista, que sea .raw y que sea legible
+    # Devuelve False en caso de error
+    def check_file(self, data):
+        r = True
+        path, y_trace, x_trace = split_raw_data(data, 2)
+        if not isinstance(path, str) or os.path.splitext(path)[1] != ".raw":
+            print("El archivo de la simulación no está en formato .raw")
+            r = False
+        elif not os.path.isfile(path):
+            print("El archivo no existe")
+            r = False
+        elif not os.access(path, os.R_OK):
+            print("El archivo no es legible")
+            r = False
+        return r
+########################################################################################################################
+
 ########################################################################################################################
 # Clase tTeo: Representa una curva de tiempo teórica, hija de la clase Timecurve
 # En data recibe un arreglo con: - curve: La curva a partir de la cual fue creada
-#                                - t: El intervalo de tiempo a graficar (si no se aclara asume de 0 a 10ms)
+#                                - t: El intervalo de tiempo a graficar (si no se aclara asume de 0 a 10ms), o una tupla
+#                                  (t0, tf, paso) para simular por partes (ver más abajo)
 #                                - param: Valores de A, f, dc, t0 necesarios para los cálculos (ver cada caso)
+# La salida se calcula con timeresp.time_response (FOH como ss.lsim por defecto, method = "zoh" para mantener la
+# entrada constante entre muestras). Para el escalón, el impulso y la rampa se usa la respuesta exacta a partir de los
+# residuos de H (timeresp.closed_response), que no depende del paso de tiempo
+# Para la senoide y el tren de pulsos se puede pedir directamente el régimen permanente (set_steady), que se calcula
+# para un período por FFT (timeresp.steady_response) y se repite en todo el intervalo o se muestra un solo período
+# Con t = (t0, tf, paso) la simulación se hace por partes de chunk muestras (timeresp.stream_response) y sólo se guarda
+# el mínimo y el máximo de y en bins intervalos (timeresp.stream_decimate), así se pueden simular intervalos que no
+# entran en memoria. En ese caso x se reduce por separado, así que sus puntos no coinciden exactamente con t
 # ----------------------------------------------------------------------------------------------------------------------
 class tTeo(Timecurve):
     def __init__(self, c_type, data, name="", color="", t_unit="s", y_unit="V", x_unit="V"):
         super().__init__(c_type, data, name, color, t_unit, y_unit, x_unit)
+        self.method = "foh"     # Discretización de H: "foh" o "zoh"
+        self.closed = True      # True para usar la respuesta exacta cuando la entrada la tiene
+        self.steady = False     # True para calcular sólo el régimen permanente de las entradas periódicas
+        self.tile = True        # En régimen permanente: True para repetir el período en todo el intervalo
+        self.window = []        # Intervalo de tiempo pedido (t puede ser un solo período en régimen permanente)
+        self.stream = None      # (t0, tf, paso) si se simula por partes
+        self.chunk = 65536      # Muestras por parte
+        self.bins = 4000        # Intervalos en los que se reduce la salida simulada por partes
 
         if self.check_data(data):
             curve = data[0]
-            if data[1].any(): self.t = data[1]
+            if isinstance(data[1], tuple): self.stream = data[1]
+            elif data[1].any(): self.t = data[1]
             else:
                 self.t = np.linspace(0.0, 10E-3, 1000)
                 self.t_unit = "s"
+            self.window = self.t
             self.params = data[2]
-
-            self.x = switch_rta_types.get(self.type)(self.t, self.params)
-            self.t, self.y, z = ss.lsim(curve.H, self.x, self.t)
+            self.evaluate(curve)
         else:
             print("Los datos ingresados no son válidos")
 
@@ -540,13 +704,58 @@ class tTeo(Timecurve):
     def change_data(self, data):
         r = True
         if self.check_data(self.rawdata):        # Revisa los datos nuevos
-            self.x = switch_rta_types.get(self.type)(self.t, self.params)
-            self.t, self.y, self.x = ss.lsim(data[0].H, self.x, self.t)
+            self.evaluate(data[0])
         else:
             print("Los datos ingresados no son válidos")
             r = False
         return r
 
+    # set_steady: Activa o desactiva el régimen permanente (sólo para entradas de switch_periods) y recalcula la curva
+    #   - tile: True para repetir el período en todo el intervalo, False para graficar un solo período
+    def set_steady(self, steady=True, tile=True):
+        self.steady = steady
+        self.tile = tile
+        self.evaluate(self.rawdata[0])
+        return
+
+    # evaluate: Calcula la entrada y la salida con la función transferencia de curve
+    # La respuesta exacta se usa si la entrada está en switch_closed_forms, el régimen permanente si está activado y la
+    # entrada está en switch_periods
+    def evaluate(self, curve):
+        fun = switch_rta_types.get(self.type)
+        if self.stream is not None:
+            t0, tf, h = self.stream
+            chunks = stream_response(curve.num, curve.den, lambda t: fun(t, self.params), t0, tf, h, self.chunk,
+                                     self.method)
+            self.t, self.x, self.y = stream_decimate(chunks, int(np.floor((tf - t0) / h + 1E-9)) + 1, self.bins)
+            return                  # Si H no es propia no hay partes y quedan vacíos (la curva no es válida)
+        self.t = self.window
+        i = switch_periods.get(self.type)
+        if self.steady and i is not None:
+            p = np.ravel(self.params)
+            T = 1 / (float(p[i]) if len(p) > i else 1.0)
+            if not self.tile:
+                h = (self.window[-1] - self.window[0]) / (len(self.window) - 1)
+                P = max(2, round(T / h))
+                self.t = self.window[0] + np.arange(P) * (T / P)
+            y = steady_response(curve.num, curve.den, lambda t: fun(t, self.params), T, self.t, self.method)
+            if y is not None:
+                self.x = fun(self.t, self.params)
+                self.y = y
+                return
+            self.t = self.window    # Sin régimen permanente (H inestable o no propia) se calcula el transitorio
+
+        self.x = fun(self.t, self.params)
+        k = switch_closed_forms.get(self.type)
+        if self.closed and k is not None:
+            A = float(np.ravel(self.params)[0]) if len(self.params) != 0 else 1.0
+            y = closed_response(curve.num, curve.den, self.t, k)
+            self.y = A * y if y is not None else np.array([])      # H no propia: la curva no es válida
+        else:
+            y = time_response(curve.num, curve.den, self.x, self.t, self.method)
+            self.y = y if y is not None else np.array([])          # H no propia: la curva no es válida
+        return
+
     # check_data: Revisa la validez los datos de la curva de tiempo teórica
     # Devuelve False si hubo error
     def check_data(self, data):
@@ -557,123 +766,121 @@ class tTeo(Timecurve):
             if not isinstance(data[0], Curve):
                 print("Acá va una curva de frecuencia existente")
                 r = False
-            if data[1].any() and not isinstance(data[1], (list, np.ndarray)):
+            if isinstance(data[1], tuple):
+                if len(data[1]) != 3 or data[1][2] <= 0 or data[1][1] < data[1][0]:
+                    print("Para simular por partes el intervalo tiene que ser (t0, tf, paso)")
+                    r = False
+            elif data[1].any() and not isinstance(data[1], (list, np.ndarray)):
                 print("Se ingresó el intervalo de tiempo en otro formato")
                 r = False
         return r
 ########################################################################################################################
 
 ########################################################################################################################
+# Estímulos de las curvas teóricas: Reciben los tiempos t (arreglo, no hace falta que sean uniformes) y la lista de
+# parámetros, y devuelven la entrada x con un valor por tiempo. Los parámetros que no se especifican toman el valor por
+# defecto (ver stimulus_params)
 # ----------------------------------------------------------------------------------------------------------------------
 # sine: Devuelve una senoide en el intervalo dado con la frecuencia y amplitud determinada
-# Parámetros: - t: intervalo de tiempo que se tomará en cuenta
-#             - A: amplitud de la senoide
+# Parámetros: - A: amplitud de la senoide
 #             - f: frecuencia de la senoide
-# ----------------------------------------------------------------------------------------------------------------------
 def sine(t, params):
-    if len(params) == 0:
-        A, f = (1.0, 1.0)
-    elif len(params) == 1:
-        A, f = (params, 1.0)
-    elif len(params) == 2:
-        A, f = params
-    else:
-        print("ERROR: El seno sólo acepta 2 parámetros: amplitud y frecuencia. Se tomarán los primeros 2 valores respectivamente")
-        A, f = params[0:2]
-    x = A * np.sin(2 * np.pi * f * t)
-    return x
+    A, f = stimulus_params(params, (1.0, 1.0), "ERROR: El seno sólo acepta 2 parámetros: amplitud y frecuencia. Se tomarán los primeros 2 valores respectivamente")
+    return A * np.sin(2 * np.pi * f * t)
 # ----------------------------------------------------------------------------------------------------------------------
-# heaviside: Devuelve la función escalón en el intervalo dado con la amplitud dada
-# Parámetros: - t: intervalo de tiempo que se tomará en cuenta
-#             - A: amplitud de la señal
+# heaviside: Devuelve la función escalón (A para t >= 0, 0 antes) en el intervalo dado con la amplitud dada
+# Parámetros: - A: amplitud de la señal
 def heaviside(t, params):
-    if len(params) == 0:
-        A = 1.0
-    elif len(params) == 1:
-        A = params
-    else:
-        print("ERROR: La función escalón sólo acepta 1 parámetro: amplitud. Se tomará el primer valor")
-        A = params[0]
-    x = A * (np.sign(t))
-    return x
+    A, = stimulus_params(params, (1.0,), "ERROR: La función escalón sólo acepta 1 parámetro: amplitud. Se tomará el primer valor")
+    return np.where(t >= 0, A, 0.0)
 # ----------------------------------------------------------------------------------------------------------------------
-# pulse_ train: Devuelve un tren de pulsos en el intervalo dado con la amplitud, frecuencia y DC dados
-# Parámetros: - t: intervalo de tiempo que se tomará en cuenta
-#             - A: amplitud de la señal
+# pulse_ train: Devuelve un tren de pulsos en el intervalo dado con la amplitud, frecuencia y DC dados (A durante la
+# fracción dc de cada período y -A el resto, como ss.square)
+# Parámetros: - A: amplitud de la señal
 #             - f: frecuencia del tren
 #             - Dc: duty cycle
 def pulse_train(t, params):
-    if len(params) == 0:
-        A, f, dc = (1.0, 1.0, 0.5)
-    elif len(params) == 1:
-        A, f, dc = (params, 1.0, 0.5)
-    elif len(params) == 2:
-        A, f = params
-        dc = 0.5
-    elif len(params) == 3:
-        A, f, dc = params
-    else:
-        print("ERROR: El tren de pulsos sólo acepta 3 parámetros: amplitud, frecuencia y Duty Cycle. Se tomarán los primeros 3 valores respectivamente")
-        A, f, dc = params[0:3]
-    x = A * ss.square(2 * np.pi * f * t, dc)
-    return x
+    A, f, dc = stimulus_params(params, (1.0, 1.0, 0.5), "ERROR: El tren de pulsos sólo acepta 3 parámetros: amplitud, frecuencia y Duty Cycle. Se tomarán los primeros 3 valores respectivamente")
+    return np.where(np.mod(f * t, 1.0) < dc, A, -A)
 # ----------------------------------------------------------------------------------------------------------------------
-# impulse: Devuelve un impulso en el intervalo dado en el instante t0 y con una la amplitud dada
+# impulse: Devuelve un impulso en el intervalo dado en t = 0 (en la muestra más cercana) y con la amplitud dada
+# Si t = 0 queda fuera del intervalo la entrada es nula
+# Parámetros: - A: amplitud del impulso
 def impulse(t, params):
-    if len(params) == 0:
-        A = 1.0
-    elif len(params) == 1:
-        A = params[0]
-    else:
-        print("ERROR: El impulso sólo acepta 1 parámetro: amplitud. Se tomará el primer valor")
-        A = params[0]
-    idx = t.index(0)
-    x = A * ss.unit_impulse(len(t), idx)
+    A, = stimulus_params(params, (1.0,), "ERROR: El impulso sólo acepta 1 parámetro: amplitud. Se tomará el primer valor")
+    x = np.zeros(len(t))
+    if len(t) != 0 and t[0] <= 0 <= t[-1]:
+        idx = np.searchsorted(t, 0.0)               # t es creciente, así que no hace falta recorrerlo
+        if idx > 0 and -t[idx - 1] < t[idx]:
+            idx -= 1
+        x[idx] = A
     return x
 # ----------------------------------------------------------------------------------------------------------------------
-# ramp: Devuelve una rampa en el intervalo dado con una pendiente m
+# ramp: Devuelve una rampa en el intervalo dado con una pendiente m (0 para t < 0)
+# Parámetros: - m: pendiente
 def ramp(t, params):
-    if len(params) == 0:
-        m = 1.0
-    elif len(params) == 1:
-        m = params[0]
-    else:
-        print("ERROR: El impulso sólo acepta 1 parámetro: pendiente. Se tomará el primer valor")
-        m = params[0]
-
-    x = []
-    for sample in t:
-        if sample < 0.0:
-            x.append(0)
-        else:
-            x.append(m * sample)
-    return x
+    m, = stimulus_params(params, (1.0,), "ERROR: La rampa sólo acepta 1 parámetro: pendiente. Se tomará el primer valor")
+    return m * np.maximum(t, 0.0)
 # ----------------------------------------------------------------------------------------------------------------------
-# exp: Devuelve una señal exponencial en el intervalo dado y con la amplitud y el exponente dado
+# exp: Devuelve una señal exponencial en el intervalo dado y con la amplitud y el exponente dado (A e^(a t))
+# Parámetros: - A: amplitud
+#             - a: exponente
 def exp(t, params):
-    if len(params) == 0:
-        A, a = (1.0, 1.0)
-    elif len(params) == 1:
-        A, a = (params, 1.0)
-    elif len(params) == 2:
-        A, a = params
-    else:
-        print("ERROR: La exponencial sólo acepta 2 parámetros: amplitud y exponente. Se tomarán los primeros 2 valores respectivamente")
-        A, a = params[0:2]
+    A, a = stimulus_params(params, (1.0, 1.0), "ERROR: La exponencial sólo acepta 2 parámetros: amplitud y exponente. Se tomarán los primeros 2 valores respectivamente")
+    return A * np.exp(a * t)
+# ----------------------------------------------------------------------------------------------------------------------
+# stimulus_params: Completa los parámetros de un estímulo con los valores por defecto
+# Si hay más parámetros que los que acepta imprime message y se queda con los primeros
+# Devuelve una tupla con un valor por parámetro
+def stimulus_params(params, defaults, message):
+    params = [float(p) for p in np.ravel(params)] if params is not None else []
+    if len(params) > len(defaults):
+        print(message)
+    return tuple(params[:len(defaults)]) + defaults[len(params):]
+########################################################################################################################
 
-    x =[]
-    for sample in t:
-        x.append(np.exp(a * sample))
-    x = A * x
-    return x
+########################################################################################################################
+# add_stimulus: Agrega (o reemplaza) un estímulo para las curvas teóricas. Recibe:
+#   - r_type: tipo de curva que va a usar el estímulo (no puede ser el de otra clase de curva: 0, 7, 8 o 9)
+#   - fun: función fun(t, params) que devuelve la entrada para los tiempos t (arreglo de numpy)
+#   - k: si la entrada es A t^(k-1) / (k-1)! para t >= 0 (A / s^k), la respuesta se calcula en forma exacta (ver
+#     timeresp.closed_response, el primer parámetro es A). None para calcularla con la entrada
+# Devuelve False en caso de error
 # ----------------------------------------------------------------------------------------------------------------------
+def add_stimulus(r_type, fun, k=None):
+    if r_type in (0, 7, 8, 9) or not callable(fun):
+        print("El tipo de curva ya se usa o la función no es válida")
+        return False
+    switch_rta_types[r_type] = fun
+    if k is not None:
+        switch_closed_forms[r_type] = k
+    else:
+        switch_closed_forms.pop(r_type, None)
+    return True
+########################################################################################################################
+
 # SWITCH
 switch_rta_types = {
     1: sine,
     2: heaviside,
     3: pulse_train,
     4: impulse,
-    6: ramp,
-    7: exp
+    5: ramp,
+    6: exp
+}
+
+# SWITCH DE RESPUESTAS EXACTAS: Potencia k de s en la transformada de las entradas que tienen respuesta exacta
+# (X(s) = A / s^k, ver timeresp.closed_response)
+switch_closed_forms = {
+    2: 1,       # Escalón
+    4: 0,       # Impulso
+    5: 2,       # Rampa
 }
-########################################################################################################################
\ No newline at end of file
+
+# SWITCH DE ENTRADAS PERIÓDICAS: Índice del parámetro con la frecuencia de las entradas que tienen régimen permanente
+# (ver tTeo.set_steady)
+switch_periods = {
+    1: 1,       # Senoide
+    3: 1,       # Tren de pulsos
+}
+########################################################################################################################
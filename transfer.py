@@ -0,0 +1,471 @@
+import hashlib
+import os
+import threading
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+########################################################################################################################
+# transfer: Evaluación directa de funciones transferencia H(s) = num(s) / den(s)
+# Los coeficientes van de mayor a menor potencia (como en scipy). En vez de armar un objeto LTI y llamar a ss.bode, se
+# evalúan num(jω) y den(jω) sobre toda la grilla con Horner en aritmética real: con x = ω² la parte real de P(jω) es un
+# polinomio en x con los coeficientes pares (con signos alternados) y la parte imaginaria es ω por otro polinomio en x
+# con los impares, así que no hace falta aritmética compleja ni dividir num por den.
+# Las respuestas calculadas con adaptive_response y grid_response se guardan en un cache LRU en memoria, así volver a
+# graficar, hacer zoom o actualizar una curva con los mismos coeficientes no vuelve a evaluar H.
+# ----------------------------------------------------------------------------------------------------------------------
+
+response_cache = OrderedDict()      # Cache de respuestas, el último es el usado más recientemente
+response_cache_size = 64            # Cantidad máxima de respuestas guardadas
+response_stats = {"hits": 0, "partial": 0, "misses": 0}
+response_lock = threading.Lock()
+batch_workers = 1                   # Procesos para evaluar familias grandes (ver batch_response)
+kernel_cache = {}                   # Kernels de expresiones simbólicas ya compilados (ver compile_kernel)
+
+
+# SWITCH DE DISTRIBUCIONES: Generan n valores de un componente con valor nominal x y tolerancia tol (relativa)
+#   - uniform: uniforme entre x (1 - tol) y x (1 + tol) (como mc() de LTSpice)
+#   - gauss: normal con media x y 3σ = x tol
+#   - worst: x (1 - tol) o x (1 + tol) con la misma probabilidad (peor caso)
+switch_distributions = {
+    "uniform": lambda rng, x, tol, n: x * (1 + tol * rng.uniform(-1.0, 1.0, n)),
+    "gauss": lambda rng, x, tol, n: x * (1 + tol / 3 * rng.standard_normal(n)),
+    "worst": lambda rng, x, tol, n: x * (1 + tol * rng.choice([-1.0, 1.0], n)),
+}
+
+
+########################################################################################################################
+# horner: Evalúa el polinomio de coeficientes coefs (de mayor a menor potencia) en todos los puntos de x
+# Cada coeficiente puede ser un número o un arreglo (ej: uno por parámetro de un barrido), shape es la dimensión del
+# resultado
+# ----------------------------------------------------------------------------------------------------------------------
+def horner(coefs, x, shape):
+    y = np.zeros(shape)
+    if len(coefs) != 0:
+        y[...] = coefs[0]
+    for c in coefs[1:]:
+        y *= x
+        y += c
+    return y
+########################################################################################################################
+
+########################################################################################################################
+# eval_jw: Evalúa el polinomio de coeficientes coefs en s = jω
+# coefs puede ser de (coeficientes,) o de (coeficientes, parámetros) para evaluar una familia de polinomios a la vez,
+# en ese caso el resultado es de (parámetros, frecuencias)
+# Devuelve la parte real y la imaginaria
+# ----------------------------------------------------------------------------------------------------------------------
+def eval_jw(coefs, w):
+    a = np.asarray(coefs, dtype=np.float64)[::-1]       # a[k]: coeficiente de s^k
+    if a.ndim == 2:
+        a = a[:, :, None]
+    signs = np.where(np.arange((len(a) + 1) // 2) % 2 == 0, 1.0, -1.0).reshape((-1,) + (1,) * (a.ndim - 1))
+    even = a[0::2] * signs[:len(a[0::2])]               # j^2m = (-1)^m
+    odd = a[1::2] * signs[:len(a[1::2])]                # j^(2m+1) = j(-1)^m
+    x = w * w
+    shape = np.broadcast_shapes(a.shape[1:], x.shape)
+    return horner(even[::-1], x, shape), w * horner(odd[::-1], x, shape)
+########################################################################################################################
+
+########################################################################################################################
+# freq_response: Calcula la respuesta en frecuencia de H(s) = num(s) / den(s) en una sola pasada. Recibe:
+#   - num, den: coeficientes del numerador y denominador (o de (coeficientes, parámetros), ver sweep_coefs)
+#   - w: frecuencias en rad/s (cualquier dimensión, se calcula sobre el último eje)
+# Devuelve el módulo en dB y la fase en ° continua (igual que ss.bode, la primera muestra queda en (-180°, 180°])
+# ----------------------------------------------------------------------------------------------------------------------
+def freq_response(num, den, w):
+    mod, ph = eval_response(num, den, w)
+    unwrap(ph)
+    ph *= 180 / np.pi
+    return mod, ph
+########################################################################################################################
+
+########################################################################################################################
+# eval_response: Calcula el módulo en dB y la fase en rad (entre -π y π, sin hacerla continua) de H(jω)
+# ----------------------------------------------------------------------------------------------------------------------
+def eval_response(num, den, w):
+    w = np.asarray(w, dtype=np.float64)
+    nr, ni = eval_jw(num, w)
+    dr, di = eval_jw(den, w)
+    # Módulo y fase de N y D por separado (con |N|² y |D|² se desborda a frecuencias altas mucho antes que N y D)
+    with np.errstate(divide="ignore"):
+        mod = np.log10(np.hypot(nr, ni))
+        mod -= np.log10(np.hypot(dr, di))
+    mod *= 20
+    ph = np.arctan2(ni, nr)
+    ph -= np.arctan2(di, dr)
+    ph = np.pi - np.mod(np.pi - ph, 2 * np.pi, out=ph)     # De vuelta a (-π, π]
+    return mod, ph
+########################################################################################################################
+
+########################################################################################################################
+# unwrap: Hace continua la fase ph (en rad) sobre el último eje sumando múltiplos de 2π donde salta más de π
+# Modifica ph (es como np.unwrap pero sin tantos arreglos intermedios)
+# ----------------------------------------------------------------------------------------------------------------------
+def unwrap(ph):
+    d = np.diff(ph, axis=-1)
+    d *= 1 / (2 * np.pi)
+    np.round(d, out=d)
+    if d.any():
+        np.cumsum(d, axis=-1, out=d)
+        d *= 2 * np.pi
+        ph[..., 1:] -= d
+    return ph
+########################################################################################################################
+
+########################################################################################################################
+# default_grid: Grilla de frecuencias (rad/s) que usa ss.bode cuando no se le pasan frecuencias: n puntos
+# logarítmicos que cubren los polos y ceros de H. Es la misma cuenta que ss.findfreqs, hecha acá para no tener que
+# importar scipy.signal (tarda más que todo el resto de la graficadora)
+# ----------------------------------------------------------------------------------------------------------------------
+def default_grid(num, den, n=100):
+    ep = np.atleast_1d(np.roots(den)) + 0j
+    tz = np.atleast_1d(np.roots(num)) + 0j
+    if len(ep) == 0:
+        ep = np.array([-1000.0 + 0j])
+    ez = np.concatenate((ep[ep.imag >= 0], tz[(np.abs(tz) < 1E5) & (tz.imag >= 0)]))
+    integ = np.abs(ez) < 1E-10
+    hfreq = np.round(np.log10(np.max(3 * np.abs(ez.real + integ) + 1.5 * ez.imag)) + 0.5)
+    lfreq = np.round(np.log10(0.1 * np.min(np.abs((ez + integ).real) + 2 * ez.imag)) - 0.5)
+    return np.logspace(lfreq, hfreq, n)
+########################################################################################################################
+
+########################################################################################################################
+# sweep_coefs: Calcula los coeficientes de una familia de funciones transferencia. Recibe:
+#   - fun: función que recibe los parámetros por nombre y devuelve num, den (listas de coeficientes). Tiene que
+#     funcionar con arreglos de numpy: cada coeficiente puede ser un número o un arreglo con un valor por parámetro
+#   - params: diccionario {nombre: valores} (todos los arreglos del mismo largo, o números)
+# En vez de la función se puede pasar una expresión de H(s) de sympy o string (ver symbolic_fun)
+# Devuelve num y den de (coeficientes, parámetros), o None, None si hubo error. Se evalúan todas juntas con
+# freq_response o batch_response, que devuelven el módulo y la fase de (parámetros, frecuencias)
+# ----------------------------------------------------------------------------------------------------------------------
+def sweep_coefs(fun, params):
+    try:
+        if not callable(fun):
+            fun = symbolic_fun(fun)
+        values = dict(zip(params.keys(), np.broadcast_arrays(*[np.asarray(v, dtype=np.float64) for v in params.values()])))
+        n = len(np.atleast_1d(next(iter(values.values())))) if len(values) != 0 else 1
+        num, den = fun(**values)
+        num = np.stack([np.broadcast_to(np.asarray(c, dtype=np.float64), (n,)) for c in num])
+        den = np.stack([np.broadcast_to(np.asarray(c, dtype=np.float64), (n,)) for c in den])
+    except (TypeError, ValueError, KeyError, AttributeError) as e:
+        print("La función del barrido no es válida: " + repr(e))
+        return None, None
+    return num, den
+########################################################################################################################
+
+########################################################################################################################
+# symbolic_fun: Convierte una expresión de sympy de H(s) en una función como las de sweep_coefs
+# Los parámetros son los demás símbolos de la expresión (por nombre), ej: con H = 1 / (R*C*s + 1) la función recibe
+# R y C y devuelve num = [1], den = [R*C, 1]. Los coeficientes se calculan con el kernel de compile_kernel
+# ----------------------------------------------------------------------------------------------------------------------
+def symbolic_fun(expr, var="s"):
+    params, kernel = compile_kernel(expr, var)
+
+    def fun(**values):
+        return kernel(*[values[p] for p in params])
+    return fun
+########################################################################################################################
+
+########################################################################################################################
+# compile_kernel: Compila una expresión de H(s) (de sympy o string) a una función de numpy que devuelve los
+# coeficientes [num, den] a partir de los parámetros (los demás símbolos, ordenados por nombre)
+# Los kernels se guardan en memoria por el hash de la expresión, así que sacar los polinomios y lambdify se hace una
+# sola vez por expresión. No se guardan en disco: el kernel es código de Python y ejecutar código leído del cache
+# permitiría correr cualquier cosa a quien pueda escribir en ese directorio
+# Devuelve la lista de nombres de los parámetros y el kernel
+# ----------------------------------------------------------------------------------------------------------------------
+def compile_kernel(expr, var="s"):
+    if isinstance(expr, str):
+        text = expr
+    else:
+        import sympy as sp
+        text = sp.srepr(expr)
+    key = hashlib.sha1((var + "|" + text).encode("utf-8")).hexdigest()
+    r = kernel_cache.get(key)
+    if r is None:
+        r = make_kernel(expr, var)
+        kernel_cache[key] = r
+    return r
+########################################################################################################################
+
+########################################################################################################################
+# make_kernel: Saca los coeficientes del numerador y denominador de la expresión y los compila con lambdify
+# Devuelve los nombres de los parámetros y el kernel (una función de numpy)
+# ----------------------------------------------------------------------------------------------------------------------
+def make_kernel(expr, var="s"):
+    import sympy as sp
+    expr = sp.sympify(expr)
+    s = sp.Symbol(var)
+    params = sorted(expr.free_symbols - {s}, key=str)
+    num, den = sp.fraction(sp.together(expr))
+    try:
+        num, den = sp.Poly(num, s).all_coeffs(), sp.Poly(den, s).all_coeffs()
+    except sp.PolynomialError:
+        raise ValueError("H no es un cociente de polinomios en " + var)
+    return [str(p) for p in params], sp.lambdify(params, [num, den], "numpy")
+########################################################################################################################
+
+########################################################################################################################
+# clear_kernels: Borra los kernels guardados en memoria
+# ----------------------------------------------------------------------------------------------------------------------
+def clear_kernels():
+    kernel_cache.clear()
+    return
+########################################################################################################################
+
+########################################################################################################################
+# sample_components: Genera los valores de los componentes para un Monte Carlo de tolerancias. Recibe:
+#   - components: diccionario {nombre: valor} para los fijos o {nombre: (nominal, tolerancia[, distribución])} con la
+#     tolerancia relativa (0.05 = 5%) y la distribución de switch_distributions (por defecto "uniform")
+#   - runs: cantidad de corridas
+#   - seed: semilla del generador (con la misma semilla se obtienen los mismos valores)
+# Devuelve un diccionario {nombre: valores} (None si hubo error)
+# ----------------------------------------------------------------------------------------------------------------------
+def sample_components(components, runs, seed=0):
+    rng = np.random.default_rng(seed)
+    samples = {}
+    for name, c in components.items():
+        if not isinstance(c, (list, tuple)):
+            c = (c,)
+        dist = c[2] if len(c) > 2 else "uniform"
+        sampler = switch_distributions.get(dist)
+        if sampler is None:
+            print("La distribución " + str(dist) + " no existe")
+            return None
+        samples[name] = sampler(rng, float(c[0]), float(c[1]) if len(c) > 1 else 0.0, runs)
+    return samples
+########################################################################################################################
+
+########################################################################################################################
+# batch_response: Calcula la respuesta en frecuencia de una familia grande de funciones transferencia por partes
+# Recibe num, den de (coeficientes, parámetros) (ver sweep_coefs), w (rad/s) y opcionalmente:
+#   - workers: procesos para repartir las partes (por defecto batch_workers, ver set_workers)
+#   - chunk: familias por parte (por defecto las necesarias para unos 10^6 puntos por parte)
+# Cada parte se calcula con freq_response y se copia en el resultado, así los intermedios no ocupan memoria de más
+# Devuelve el módulo en dB y la fase en ° de (parámetros, frecuencias)
+# ----------------------------------------------------------------------------------------------------------------------
+def batch_response(num, den, w, workers=None, chunk=None):
+    workers = batch_workers if workers is None else workers
+    w = np.asarray(w, dtype=np.float64)
+    n = num.shape[1]
+    chunk = chunk if chunk else max(1, int(1E6) // max(1, len(w)))
+    ranges = [(a, min(n, a + chunk)) for a in range(0, n, chunk)]
+    jobs = [(num[:, a:b], den[:, a:b], w) for a, b in ranges]
+    mod = np.empty((n, len(w)))
+    ph = np.empty((n, len(w)))
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for (a, b), (m, p) in zip(ranges, pool.map(response_chunk, jobs)):
+                mod[a:b], ph[a:b] = m, p
+    else:
+        for (a, b), job in zip(ranges, jobs):
+            mod[a:b], ph[a:b] = response_chunk(job)
+    return mod, ph
+########################################################################################################################
+
+########################################################################################################################
+# response_chunk: Calcula una parte de batch_response (corre en un proceso aparte si se usan varios)
+# ----------------------------------------------------------------------------------------------------------------------
+def response_chunk(job):
+    num, den, w = job
+    return freq_response(num, den, w)
+########################################################################################################################
+
+########################################################################################################################
+# set_workers: Configura cuántos procesos usa batch_response (0 o None para usar todos los núcleos)
+# En Windows el script tiene que estar protegido con if __name__ == "__main__"
+# ----------------------------------------------------------------------------------------------------------------------
+def set_workers(workers=1):
+    global batch_workers
+    batch_workers = workers if workers else os.cpu_count() or 1
+    return
+########################################################################################################################
+
+########################################################################################################################
+# adaptive_grid: Grilla de frecuencias logarítmica que se refina sólo donde hace falta. Recibe:
+#   - num, den: coeficientes del numerador y denominador
+#   - wi, wf: intervalo en rad/s (wi > 0)
+#   - tol: error máximo del módulo en dB entre la curva y el segmento que la une en el gráfico (eje x logarítmico)
+#   - ph_tol: lo mismo para la fase en °
+#   - points: puntos de la grilla inicial, a los que se agregan las frecuencias de los polos y ceros (ver get_seeds)
+#   - max_points: máximo de puntos de la grilla
+# Se evalúa H en el punto medio (en escala logarítmica) de cada intervalo y se parten sólo los intervalos en los que el
+# punto medio queda a más de tol de la recta entre los extremos, hasta que ninguno la supere. Así una muesca angosta se
+# resuelve con unos cientos de puntos en vez de tener que muestrear todo el intervalo con 10^5.
+# Devuelve las frecuencias en rad/s
+# ----------------------------------------------------------------------------------------------------------------------
+def adaptive_grid(num, den, wi, wf, tol=0.1, ph_tol=1.0, points=64, max_points=10000):
+    lo, hi = np.log10(wi), np.log10(wf)
+    seeds = get_seeds(num, den)
+    x = np.unique(np.concatenate((np.linspace(lo, hi, points), seeds[(seeds > lo) & (seeds < hi)])))
+    mod, ph = eval_response(num, den, np.power(10, x))
+
+    while len(x) < max_points:
+        xm = (x[:-1] + x[1:]) / 2
+        mm, pm = eval_response(num, den, np.power(10, xm))
+        d1 = np.angle(np.exp(1j * (pm - ph[:-1])))      # Saltos de fase (entre -π y π) a cada lado del punto medio
+        d2 = np.angle(np.exp(1j * (ph[1:] - pm)))
+        with np.errstate(invalid="ignore"):
+            err = np.maximum(np.abs(mm - (mod[:-1] + mod[1:]) / 2) / tol, np.degrees(np.abs(d1 - d2) / 2) / ph_tol)
+        err[~np.isfinite(err)] = 2.0                    # Ceros o polos sobre el eje jω (módulo infinito)
+        err[x[1:] - x[:-1] < 1E-6] = 0                  # Intervalos de menos de 10^-6 décadas no se parten
+        split = np.flatnonzero(err > 1)
+        if len(split) == 0:
+            break
+        if len(x) + len(split) > max_points:            # Se parten los de mayor error hasta llegar a max_points
+            split = np.sort(split[np.argsort(err[split])[::-1][:max_points - len(x)]])
+        x = np.insert(x, split + 1, xm[split])
+        mod = np.insert(mod, split + 1, mm[split])
+        ph = np.insert(ph, split + 1, pm[split])
+    w = np.power(10, x)
+    w[0], w[-1] = wi, wf            # Los extremos exactos (10^log10(w) puede no dar w)
+    return w
+########################################################################################################################
+
+########################################################################################################################
+# get_seeds: Frecuencias (log10 de rad/s) donde H puede tener detalles angostos: el módulo de cada polo y cero y los
+# extremos de su ancho de banda (ω0 (1 ± ζ), con ζ el amortiguamiento)
+# Los polos y ceros sobre el eje jω no se agregan justo en ω0 (ahí el módulo es infinito), el refinamiento se acerca
+# hasta el ancho mínimo de intervalo
+# ----------------------------------------------------------------------------------------------------------------------
+def get_seeds(num, den):
+    roots = np.concatenate((np.roots(np.asarray(num, dtype=np.float64)), np.roots(np.asarray(den, dtype=np.float64))))
+    w0 = np.abs(roots)
+    roots = roots[w0 > 0]
+    w0 = w0[w0 > 0]
+    zeta = np.abs(roots.real) / w0
+    w0, zeta = w0[zeta > 1E-9], zeta[zeta > 1E-9]
+    seeds = np.concatenate((w0, w0 * (1 + zeta), (w0 * (1 - zeta))[zeta < 1]))
+    return np.log10(seeds[seeds > 0])
+########################################################################################################################
+
+########################################################################################################################
+# adaptive_response: Respuesta en frecuencia de H en la grilla adaptiva del intervalo [wi, wf] (rad/s), con cache
+# Si ya se calculó la misma H con la misma tolerancia en un intervalo que se superpone (ej: antes de hacer zoom), se
+# reutiliza esa parte y sólo se calcula la grilla de lo que queda afuera
+# Devuelve w (rad/s), el módulo en dB y la fase en ° (arreglos de sólo lectura, compartidos con el cache)
+# ----------------------------------------------------------------------------------------------------------------------
+def adaptive_response(num, den, wi, wf, tol=0.1):
+    base = ("adaptive", coef_key(num), coef_key(den), tol)
+    r = cache_get(base + (wi, wf))
+    if r is not None:
+        return r
+
+    old = None                      # Respuesta guardada que más cubre [wi, wf] (en décadas)
+    overlap = 0
+    with response_lock:
+        for key, value in response_cache.items():
+            if key[:4] == base and key[4] < wf and key[5] > wi:
+                aux = np.log10(min(wf, key[5]) / max(wi, key[4]))
+                if aux > overlap:
+                    old, overlap = value, aux
+
+    if old is None:
+        w = adaptive_grid(num, den, wi, wf, tol)
+        mod, ph = freq_response(num, den, w)
+        with response_lock:
+            response_stats["misses"] += 1
+    else:
+        cw, cmod, cph = old
+        inside = (cw > wi) & (cw < wf)
+        left = adaptive_piece(num, den, wi, cw[0], tol)[:-1] if wi < cw[0] else np.array([wi])
+        right = adaptive_piece(num, den, cw[-1], wf, tol)[1:] if wf > cw[-1] else np.array([wf])
+        lmod, lph = freq_response(num, den, left)
+        rmod, rph = freq_response(num, den, right)
+        w = np.concatenate((left, cw[inside], right))
+        mod = np.concatenate((lmod, cmod[inside], rmod))
+        ph = np.degrees(unwrap(np.radians(np.concatenate((lph, cph[inside], rph)))))
+        with response_lock:
+            response_stats["partial"] += 1
+    return cache_put(base + (wi, wf), (w, mod, ph))
+########################################################################################################################
+
+########################################################################################################################
+# adaptive_piece: Grilla adaptiva de una parte de un intervalo, con la grilla inicial de la misma densidad (64 puntos
+# cada 7 décadas, como adaptive_grid en un intervalo típico) para no agregar puntos de más en los pedazos chicos
+# ----------------------------------------------------------------------------------------------------------------------
+def adaptive_piece(num, den, wi, wf, tol):
+    return adaptive_grid(num, den, wi, wf, tol, points=max(4, int(np.ceil(64 * np.log10(wf / wi) / 7))))
+########################################################################################################################
+
+########################################################################################################################
+# grid_response: Respuesta en frecuencia de H en la grilla w (rad/s), con cache
+# Devuelve el módulo en dB y la fase en ° (arreglos de sólo lectura, compartidos con el cache)
+# ----------------------------------------------------------------------------------------------------------------------
+def grid_response(num, den, w):
+    w = np.ascontiguousarray(w, dtype=np.float64)
+    key = ("grid", coef_key(num), coef_key(den), hashlib.sha1(w.tobytes()).hexdigest())
+    r = cache_get(key)
+    if r is not None:
+        return r
+    with response_lock:
+        response_stats["misses"] += 1
+    return cache_put(key, freq_response(num, den, w))
+########################################################################################################################
+
+########################################################################################################################
+# coef_key: Clave de los coeficientes de un polinomio para el cache
+# ----------------------------------------------------------------------------------------------------------------------
+def coef_key(coefs):
+    return np.asarray(coefs, dtype=np.float64).tobytes()
+########################################################################################################################
+
+########################################################################################################################
+# cache_get: Devuelve la respuesta guardada con la clave key (None si no está) y la marca como usada recién
+# ----------------------------------------------------------------------------------------------------------------------
+def cache_get(key):
+    with response_lock:
+        r = response_cache.get(key)
+        if r is not None:
+            response_cache.move_to_end(key)
+            response_stats["hits"] += 1
+    return r
+########################################################################################################################
+
+########################################################################################################################
+# cache_put: Guarda una respuesta (tupla de arreglos, quedan de sólo lectura) y borra las usadas hace más tiempo si se
+# supera response_cache_size
+# ----------------------------------------------------------------------------------------------------------------------
+def cache_put(key, value):
+    for a in value:
+        a.flags.writeable = False
+    with response_lock:
+        response_cache[key] = value
+        response_cache.move_to_end(key)
+        while len(response_cache) > response_cache_size:
+            response_cache.popitem(last=False)
+    return value
+########################################################################################################################
+
+########################################################################################################################
+# set_response_cache: Cambia la cantidad máxima de respuestas guardadas (0 para no guardar ninguna)
+# ----------------------------------------------------------------------------------------------------------------------
+def set_response_cache(size=64):
+    global response_cache_size
+    response_cache_size = size
+    with response_lock:
+        while len(response_cache) > response_cache_size:
+            response_cache.popitem(last=False)
+    return
+########################################################################################################################
+
+########################################################################################################################
+# clear_response_cache: Borra todas las respuestas guardadas y reinicia los contadores
+# ----------------------------------------------------------------------------------------------------------------------
+def clear_response_cache():
+    with response_lock:
+        response_cache.clear()
+        for k in response_stats:
+            response_stats[k] = 0
+    return
+########################################################################################################################
+
+########################################################################################################################
+# get_response_stats: Devuelve los contadores del cache: "hits" (ya estaba calculada), "partial" (se reutilizó parte de
+# otro intervalo), "misses" (se calculó entera) y "entries" (respuestas guardadas)
+# ----------------------------------------------------------------------------------------------------------------------
+def get_response_stats():
+    with response_lock:
+        return dict(response_stats, entries=len(response_cache))
+########################################################################################################################